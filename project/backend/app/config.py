@@ -60,6 +60,131 @@ SCENE_MIN_COUNT: int = _get_positive_int("SCENE_MIN_COUNT", 50)
 SCENE_MAX_COUNT: int = _get_positive_int("SCENE_MAX_COUNT", 100)
 if SCENE_MIN_COUNT > SCENE_MAX_COUNT:
     raise ValueError("SCENE_MIN_COUNT must be <= SCENE_MAX_COUNT")
+STEP5B_ACT_CONCURRENCY: int = _get_positive_int("STEP5B_ACT_CONCURRENCY", 4)
+
+
+def _get_positive_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0")
+    return value
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    lowered = raw.strip().lower()
+    if lowered in {"1", "true", "yes", "on"}:
+        return True
+    if lowered in {"0", "false", "no", "off"}:
+        return False
+    raise ValueError(f"{name} must be a boolean")
+
+
+TOPONE_MAX_CONNECTIONS: int = _get_positive_int("TOPONE_MAX_CONNECTIONS", 20)
+TOPONE_MAX_KEEPALIVE_CONNECTIONS: int = _get_positive_int(
+    "TOPONE_MAX_KEEPALIVE_CONNECTIONS", 10
+)
+if TOPONE_MAX_KEEPALIVE_CONNECTIONS > TOPONE_MAX_CONNECTIONS:
+    raise ValueError("TOPONE_MAX_KEEPALIVE_CONNECTIONS must be <= TOPONE_MAX_CONNECTIONS")
+TOPONE_KEEPALIVE_EXPIRY_SECONDS: float = _get_positive_float(
+    "TOPONE_KEEPALIVE_EXPIRY_SECONDS", 60.0
+)
+TOPONE_HTTP2: bool = _get_bool("TOPONE_HTTP2", True)
+TOPONE_REQUESTS_PER_MINUTE: int = _get_positive_int("TOPONE_REQUESTS_PER_MINUTE", 600)
+TOPONE_TOKENS_PER_MINUTE: int = _get_positive_int("TOPONE_TOKENS_PER_MINUTE", 2_000_000)
+TOPONE_MAX_CONCURRENCY: int = _get_positive_int("TOPONE_MAX_CONCURRENCY", 16)
+TOPONE_INITIAL_CONCURRENCY: int = _get_positive_int("TOPONE_INITIAL_CONCURRENCY", 8)
+if TOPONE_INITIAL_CONCURRENCY > TOPONE_MAX_CONCURRENCY:
+    raise ValueError("TOPONE_INITIAL_CONCURRENCY must be <= TOPONE_MAX_CONCURRENCY")
+LLM_RETRY_MAX_ATTEMPTS: int = _get_positive_int("LLM_RETRY_MAX_ATTEMPTS", 3)
+LLM_RETRY_BASE_DELAY_SECONDS: float = _get_positive_float("LLM_RETRY_BASE_DELAY_SECONDS", 0.5)
+LLM_RETRY_MAX_DELAY_SECONDS: float = _get_positive_float("LLM_RETRY_MAX_DELAY_SECONDS", 10.0)
+if LLM_RETRY_BASE_DELAY_SECONDS > LLM_RETRY_MAX_DELAY_SECONDS:
+    raise ValueError("LLM_RETRY_BASE_DELAY_SECONDS must be <= LLM_RETRY_MAX_DELAY_SECONDS")
+LLM_RETRY_TOTAL_TIMEOUT_SECONDS: float = _get_positive_float(
+    "LLM_RETRY_TOTAL_TIMEOUT_SECONDS", 600.0
+)
+LLM_HEDGE_ENABLED: bool = _get_bool("LLM_HEDGE_ENABLED", False)
+LLM_HEDGE_MIN_DELAY_SECONDS: float = _get_positive_float("LLM_HEDGE_MIN_DELAY_SECONDS", 5.0)
+SIMULATION_BATCH_AGENT_CALLS: bool = _get_bool("SIMULATION_BATCH_AGENT_CALLS", False)
+LLM_CONTEXT_CACHE_ENABLED: bool = _get_bool("LLM_CONTEXT_CACHE_ENABLED", False)
+LLM_CONTEXT_CACHE_TTL_SECONDS: float = _get_positive_float("LLM_CONTEXT_CACHE_TTL_SECONDS", 3600.0)
+LLM_CONTEXT_CACHE_MIN_PREFIX_CHARS: int = _get_positive_int(
+    "LLM_CONTEXT_CACHE_MIN_PREFIX_CHARS", 4096
+)
+
+
+def _get_non_negative_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number") from exc
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0")
+    return value
+
+
+_LLM_CACHE_BACKENDS = {"none", "memory", "sqlite"}
+LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "none").strip().lower()
+if LLM_CACHE_BACKEND not in _LLM_CACHE_BACKENDS:
+    raise ValueError("LLM_CACHE_BACKEND must be one of none/memory/sqlite")
+LLM_CACHE_MAX_ENTRIES: int = _get_positive_int("LLM_CACHE_MAX_ENTRIES", 512)
+LLM_CACHE_SQLITE_PATH: str = os.getenv(
+    "LLM_CACHE_SQLITE_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "llm_cache.sqlite3"),
+)
+# 按 LLMRole 配置 TTL（秒），0 表示该角色不缓存。
+# 创作类生成（logline、结构、角色、场景列表）重新生成应得到新结果，默认不缓存，需显式设置 TTL 开启。
+LLM_CACHE_TTL_SECONDS: dict[str, float] = {
+    role: _get_non_negative_float(f"LLM_CACHE_TTL_{role.upper()}_SECONDS", default)
+    for role, default in {
+        "architect": 0.0,
+        "reasoning": 3600.0,
+        "creative": 0.0,
+        "flash": 3600.0,
+    }.items()
+}
+# LLM 录制/回放：off 关闭；record 透传并追加到 LLM_REPLAY_PATH；replay 只读录制文件。
+_LLM_REPLAY_MODES = {"off", "record", "replay"}
+LLM_REPLAY_MODE: str = os.getenv("LLM_REPLAY_MODE", "off").strip().lower()
+if LLM_REPLAY_MODE not in _LLM_REPLAY_MODES:
+    raise ValueError("LLM_REPLAY_MODE must be one of off/record/replay")
+LLM_REPLAY_PATH: str = os.getenv(
+    "LLM_REPLAY_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "llm_replay.jsonl"),
+)
+
+SIMULATION_AGENT_CONCURRENCY: int = _get_positive_int("SIMULATION_AGENT_CONCURRENCY", 8)
+# 单个角色决策超时（秒），0 表示不限时。
+SIMULATION_AGENT_TIMEOUT_SECONDS: float = _get_non_negative_float(
+    "SIMULATION_AGENT_TIMEOUT_SECONDS", 0.0
+)
+_SIMULATION_AGENT_FAILURE_POLICIES = {"skip", "wait", "abort"}
+SIMULATION_AGENT_FAILURE_POLICY: str = (
+    os.getenv("SIMULATION_AGENT_FAILURE_POLICY", "abort").strip().lower()
+)
+if SIMULATION_AGENT_FAILURE_POLICY not in _SIMULATION_AGENT_FAILURE_POLICIES:
+    raise ValueError("SIMULATION_AGENT_FAILURE_POLICY must be one of skip/wait/abort")
+# 推演日志每 N 轮后台批量落库一次，场景结束时写入剩余轮次。
+SIMULATION_LOG_FLUSH_ROUNDS: int = _get_positive_int("SIMULATION_LOG_FLUSH_ROUNDS", 5)
+SIMULATION_LOG_PAGE_MAX: int = _get_positive_int("SIMULATION_LOG_PAGE_MAX", 500)
+# 批量推演：同时运行的场景数上限与内存中保留的任务数。
+SIMULATION_SCENE_CONCURRENCY: int = _get_positive_int("SIMULATION_SCENE_CONCURRENCY", 4)
+SIMULATION_JOB_RETENTION: int = _get_positive_int("SIMULATION_JOB_RETENTION", 100)
+# 推演控制循环：锚点条件已满足时提前结束场景；可选地在仲裁期间预取下一轮感知。
+SIMULATION_EARLY_TERMINATION: bool = _get_bool("SIMULATION_EARLY_TERMINATION", False)
+SIMULATION_SPECULATIVE_PERCEPTION: bool = _get_bool("SIMULATION_SPECULATIVE_PERCEPTION", False)
 
 
 
@@ -0,0 +1,94 @@
+"""Prompt 前缀缓存：把长且稳定的 system prompt + 共享上下文托管到 provider cachedContents。"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import httpx
+
+from app.llm.single_flight import SingleFlight
+
+
+@dataclass(frozen=True)
+class SharedContext:
+    """可缓存的静态前缀（system_prompt + prefix）与每次调用变化的 suffix。"""
+
+    system_prompt: str
+    prefix: str
+    suffix: str
+
+
+class ContextCache:
+    """按 (model, system_prompt, prefix) 哈希跟踪 cachedContents 名称与有效期。
+
+    创建失败（provider 不支持、前缀过短等）时记一条负缓存，退避期内直接走普通调用。
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        min_prefix_chars: int,
+        refresh_margin_seconds: float = 60.0,
+        failure_backoff_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl_seconds <= refresh_margin_seconds:
+            raise ValueError("ttl_seconds must be > refresh_margin_seconds")
+        self.ttl_seconds = ttl_seconds
+        self.min_prefix_chars = min_prefix_chars
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.failure_backoff_seconds = failure_backoff_seconds
+        self._clock = clock
+        self._entries: dict[str, tuple[str | None, float]] = {}
+        self._flights: SingleFlight[str | None] = SingleFlight()
+
+    @staticmethod
+    def _key(model: str, context: SharedContext) -> str:
+        canonical = json.dumps(
+            [model, context.system_prompt, context.prefix],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def resolve(self, client: Any, *, model: str, context: SharedContext) -> str | None:
+        """返回可用的 cachedContent 名称；不可用时返回 None，由调用方走完整 prompt。"""
+        if len(context.prefix) < self.min_prefix_chars:
+            return None
+        key = self._key(model, context)
+        entry = self._entries.get(key)
+        if entry is not None:
+            name, expires_at = entry
+            margin = self.refresh_margin_seconds if name is not None else 0.0
+            if expires_at - margin > self._clock():
+                return name
+
+        async def _create() -> str | None:
+            try:
+                created = await client.create_cached_content(
+                    model=model,
+                    system_instruction=context.system_prompt,
+                    text=context.prefix,
+                    ttl_seconds=self.ttl_seconds,
+                )
+                name = created["name"]
+            except (httpx.HTTPError, KeyError, TypeError):
+                self._entries[key] = (None, self._clock() + self.failure_backoff_seconds)
+                return None
+            self._entries[key] = (name, self._clock() + self.ttl_seconds)
+            return name
+
+        return await self._flights.run(key, _create)
+
+    def invalidate(self, *, model: str, context: SharedContext) -> None:
+        """使用缓存失败（已过期/被拒）时调用：退避期内不再尝试该前缀。"""
+        key = self._key(model, context)
+        self._entries[key] = (None, self._clock() + self.failure_backoff_seconds)
+
+    def __len__(self) -> int:
+        return sum(1 for name, _ in self._entries.values() if name is not None)
@@ -0,0 +1,89 @@
+"""增量 JSON 数组解析：模型流式输出时逐个切出顶层数组元素。"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from app.llm.resilience import InvalidModelOutputError
+
+
+class JsonArrayStreamParser:
+    """喂入文本增量，返回本次新完成的顶层元素。
+
+    只跟踪字符串/转义状态与括号深度，不回溯已扫描的文本；数组之前的代码块围栏
+    （```json）等前导内容会被跳过，数组闭合后的内容忽略。
+    """
+
+    def __init__(self) -> None:
+        self._buffer: list[str] = []
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._count = 0
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def feed(self, chunk: str) -> list[Any]:
+        items: list[Any] = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                elif char in "{\"":
+                    raise InvalidModelOutputError("invalid JSON model output: expected array")
+                continue
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                if self._depth == 0:
+                    if char == "}":
+                        raise InvalidModelOutputError("invalid JSON model output: unbalanced '}'")
+                    self._emit(items, final=True)
+                    self._finished = True
+                    continue
+                self._depth -= 1
+            elif char == "," and self._depth == 0:
+                self._emit(items, final=False)
+                continue
+            self._buffer.append(char)
+        return items
+
+    def close(self) -> None:
+        """流结束时调用：数组未闭合视为截断输出。"""
+        if not self._finished:
+            raise InvalidModelOutputError("invalid JSON model output: truncated array")
+
+    def _emit(self, items: list[Any], *, final: bool) -> None:
+        text = "".join(self._buffer).strip()
+        self._buffer.clear()
+        if not text:
+            if final and self._count == 0:
+                return
+            raise InvalidModelOutputError("invalid JSON model output: empty array element")
+        try:
+            items.append(json.loads(text))
+        except json.JSONDecodeError as exc:
+            raise InvalidModelOutputError(f"invalid JSON model output: {exc.msg}") from exc
+        self._count += 1
@@ -21,3 +21,18 @@ ACT_PROMPT = (
     '"action_target": string, "dialogue": string | null, "action_description": string}。'
     "不要输出多余字段，不要 Markdown，不要解释，不要代码块。"
 )
+
+BATCH_PERCEIVE_PROMPT = (
+    "你是多角色代理的感知模块。同一场景下为每个角色分别生成信念补丁。"
+    "必须只输出 JSON 对象，键为输入中的 agent_id，值为对象，字段严格为："
+    '{"beliefs_patch": object}。'
+    "每个输入角色都必须出现且只出现一次，不要输出多余字段，不要 Markdown，不要解释，不要代码块。"
+)
+
+BATCH_ACT_PROMPT = (
+    "你是多角色代理的行动模块。同一场景下基于每个角色的意图分别生成具体行动。"
+    "必须只输出 JSON 对象，键为输入中的 agent_id，值为对象，字段严格为："
+    '{"agent_id": string, "internal_thought": string, "action_type": string, '
+    '"action_target": string, "dialogue": string | null, "action_description": string}。'
+    "每个输入角色都必须出现且只出现一次，不要输出多余字段，不要 Markdown，不要解释，不要代码块。"
+)
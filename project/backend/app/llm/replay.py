@@ -0,0 +1,236 @@
+"""LLM 录制/回放：在业务层与 LLM 引擎的边界按调用点 + 请求内容哈希存取响应。
+
+录制模式透传真实调用并把请求/响应追加到 JSONL 文件；回放模式只从文件读取，
+请求与录制不一致时记录分歧并抛出 ReplayDivergenceError，不会访问网络。
+流式方法（异步生成器）按完整的块列表录制与回放。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import threading
+import typing
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Mapping
+
+from pydantic import BaseModel, TypeAdapter
+
+REPLAY_MODES = frozenset({"record", "replay"})
+
+
+class ReplayDivergenceError(RuntimeError):
+    """回放时请求在录制文件中找不到对应响应。"""
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Mapping):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_jsonable(item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def replay_request_key(call_site: str, request: Mapping[str, Any]) -> str:
+    canonical = json.dumps(
+        {"call_site": call_site, "request": request},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _return_adapter(method: Callable[..., Any]) -> TypeAdapter[Any]:
+    try:
+        return_type = typing.get_type_hints(method).get("return", Any)
+    except Exception:  # noqa: BLE001 - 无法解析注解时按原始 JSON 存取
+        return_type = Any
+    return TypeAdapter(return_type)
+
+
+@lru_cache(maxsize=None)
+def _chunks_adapter(method: Callable[..., Any]) -> TypeAdapter[Any]:
+    """AsyncIterator[X] 注解的流式方法按 list[X] 存取。"""
+    try:
+        return_type = typing.get_type_hints(method).get("return", Any)
+    except Exception:  # noqa: BLE001 - 无法解析注解时按原始 JSON 存取
+        return_type = Any
+    args = typing.get_args(return_type)
+    return TypeAdapter(list[args[0] if args else Any])  # type: ignore[misc]
+
+
+class LLMCassette:
+    """录制文件：同一请求重复出现时按录制顺序依次返回，用尽后重复最后一次响应。"""
+
+    def __init__(self, path: str | Path, *, mode: str) -> None:
+        if mode not in REPLAY_MODES:
+            raise ValueError("replay mode must be one of record/replay")
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._responses: dict[str, list[Any]] = {}
+        self._cursor: dict[str, int] = {}
+        self._site_requests: dict[str, list[dict[str, Any]]] = {}
+        self.recorded = 0
+        self.served = 0
+        self.divergences: list[dict[str, Any]] = []
+        if mode == "replay":
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise ValueError(f"replay cassette not found: {self.path}")
+        with self.path.open(encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._responses.setdefault(entry["key"], []).append(entry["response"])
+                self._site_requests.setdefault(entry["call_site"], []).append(entry["request"])
+
+    def record(
+        self, call_site: str, key: str, request: Mapping[str, Any], response: Any
+    ) -> None:
+        line = json.dumps(
+            {"call_site": call_site, "key": key, "request": request, "response": response},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            self.recorded += 1
+
+    def lookup(self, call_site: str, key: str, request: Mapping[str, Any]) -> Any:
+        with self._lock:
+            responses = self._responses.get(key)
+            if responses:
+                index = self._cursor.get(key, 0)
+                self._cursor[key] = index + 1
+                self.served += 1
+                return responses[min(index, len(responses) - 1)]
+            recorded = self._site_requests.get(call_site, [])
+            divergence = {
+                "call_site": call_site,
+                "key": key,
+                "request": dict(request),
+                "recorded_requests": len(recorded),
+                "changed_fields": _changed_fields(request, recorded),
+            }
+            self.divergences.append(divergence)
+        raise ReplayDivergenceError(
+            f"no recorded response for {call_site} "
+            f"(changed fields: {divergence['changed_fields'] or 'unknown'})"
+        )
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": str(self.path),
+                "recorded": self.recorded,
+                "served": self.served,
+                "divergences": list(self.divergences),
+            }
+
+
+def _changed_fields(
+    request: Mapping[str, Any], recorded: list[dict[str, Any]]
+) -> list[str]:
+    """与同一调用点最相近的录制请求相比，哪些参数发生了变化。"""
+    best: list[str] | None = None
+    for candidate in recorded:
+        changed = sorted(
+            name
+            for name in set(request) | set(candidate)
+            if request.get(name) != candidate.get(name)
+        )
+        if best is None or len(changed) < len(best):
+            best = changed
+    return best or []
+
+
+class ReplayingLLM:
+    """包装 LLM 引擎：异步方法与流式方法经由 cassette 录制或回放，私有属性透传。
+
+    回放模式下其余无法录制的公开方法一经调用即抛 ReplayDivergenceError。
+    """
+
+    def __init__(self, inner: Any, cassette: LLMCassette) -> None:
+        self._inner = inner
+        self._cassette = cassette
+
+    @property
+    def cassette(self) -> LLMCassette:
+        return self._cassette
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        call_site = f"{type(self._inner).__name__}.{name}"
+        method = getattr(type(self._inner), name, None)
+        cassette = self._cassette
+        if inspect.isasyncgenfunction(method):
+            return self._wrap_stream(call_site, attr, _chunks_adapter(method))
+        if not inspect.iscoroutinefunction(method):
+            if cassette.mode == "record":
+                return attr
+
+            def _unsupported(*args: Any, **kwargs: Any) -> Any:
+                raise ReplayDivergenceError(f"{call_site} cannot be replayed")
+
+            return _unsupported
+        signature = inspect.signature(attr)
+        adapter = _return_adapter(method)
+
+        async def _call(*args: Any, **kwargs: Any) -> Any:
+            request = _bind_request(signature, args, kwargs)
+            key = replay_request_key(call_site, request)
+            if cassette.mode == "replay":
+                return adapter.validate_python(cassette.lookup(call_site, key, request))
+            result = await attr(*args, **kwargs)
+            cassette.record(call_site, key, request, adapter.dump_python(result, mode="json"))
+            return result
+
+        return _call
+
+    def _wrap_stream(
+        self, call_site: str, attr: Callable[..., Any], adapter: TypeAdapter[Any]
+    ) -> Callable[..., AsyncIterator[Any]]:
+        signature = inspect.signature(attr)
+        cassette = self._cassette
+
+        async def _stream(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            request = _bind_request(signature, args, kwargs)
+            key = replay_request_key(call_site, request)
+            if cassette.mode == "replay":
+                for chunk in adapter.validate_python(cassette.lookup(call_site, key, request)):
+                    yield chunk
+                return
+            chunks: list[Any] = []
+            async for chunk in attr(*args, **kwargs):
+                chunks.append(chunk)
+                yield chunk
+            # 只录制完整消费的流；中途取消或出错的流不会写入 cassette。
+            cassette.record(call_site, key, request, adapter.dump_python(chunks, mode="json"))
+
+        return _stream
+
+
+def _bind_request(
+    signature: inspect.Signature, args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> dict[str, Any]:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return {key: _jsonable(value) for key, value in bound.arguments.items()}
@@ -0,0 +1,159 @@
+"""结构化 LLM 调用的韧性层：去相关抖动重试 + 基于 p95 的对冲请求。"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class InvalidModelOutputError(ValueError):
+    """模型输出无法解析或不符合 schema；与配置/参数类 ValueError 区分以便重试。"""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay_seconds: float = 0.5
+    max_delay_seconds: float = 10.0
+    retry_invalid_output: bool = True
+    hedge: bool = False
+    hedge_min_delay_seconds: float = 5.0
+    # 全部 attempt 与退避共享的总时限；None 表示不限制。
+    total_timeout_seconds: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        if not 0 < self.base_delay_seconds <= self.max_delay_seconds:
+            raise ValueError("retry delays must satisfy 0 < base <= max")
+        if self.total_timeout_seconds is not None and self.total_timeout_seconds <= 0:
+            raise ValueError("total_timeout_seconds must be > 0")
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def decorrelated_jitter(
+    previous_delay: float,
+    policy: RetryPolicy,
+    rng: Callable[[float, float], float] = random.uniform,
+) -> float:
+    """AWS 去相关抖动：sleep = min(cap, uniform(base, prev * 3))。"""
+    upper = max(policy.base_delay_seconds, previous_delay * 3)
+    return min(policy.max_delay_seconds, rng(policy.base_delay_seconds, upper))
+
+
+class LatencyTracker:
+    """滑动窗口记录成功调用耗时，样本不足时不给出 p95。"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = max(0, math.ceil(len(ordered) * 0.95) - 1)
+        return ordered[index]
+
+
+async def hedged_call(factory: Callable[[], Awaitable[T]], delay: float) -> T:
+    """先发一次请求；delay 秒内未完成则再发一次，取先成功者并取消另一个。"""
+    tasks = [asyncio.ensure_future(factory())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.append(asyncio.ensure_future(factory()))
+        pending = set(tasks)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                first_error = first_error or task.exception()
+        assert first_error is not None
+        raise first_error
+    finally:
+        outstanding = [task for task in tasks if not task.done()]
+        for task in outstanding:
+            task.cancel()
+        if outstanding:
+            await asyncio.gather(*outstanding, return_exceptions=True)
+
+
+class ResilientCaller:
+    """按 RetryPolicy 执行 attempt；attempt 自身负责取数与校验。"""
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        *,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        rng: Callable[[float, float], float] = random.uniform,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.policy = policy
+        self.latency = LatencyTracker()
+        self._sleep = sleep
+        self._rng = rng
+        self._clock = clock
+
+    async def fetch(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """单次上游取数：启用对冲且有足够样本时按 max(p95, 下限) 触发第二个请求。"""
+        started = self._clock()
+        p95 = self.latency.p95() if self.policy.hedge else None
+        if p95 is None:
+            result = await factory()
+        else:
+            result = await hedged_call(
+                factory, max(p95, self.policy.hedge_min_delay_seconds)
+            )
+        self.latency.record(self._clock() - started)
+        return result
+
+    async def run(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """重试直至成功；设置总时限时超时抛 TimeoutError，剩余预算不够退避时直接抛出原错误。"""
+        budget = self.policy.total_timeout_seconds
+        if budget is None:
+            return await self._run_attempts(attempt, None)
+        deadline = self._clock() + budget
+        async with asyncio.timeout(budget):
+            return await self._run_attempts(attempt, deadline)
+
+    async def _run_attempts(
+        self, attempt: Callable[[], Awaitable[T]], deadline: float | None
+    ) -> T:
+        delay = self.policy.base_delay_seconds
+        for attempt_index in range(1, self.policy.max_attempts + 1):
+            try:
+                return await attempt()
+            except InvalidModelOutputError:
+                if not self.policy.retry_invalid_output or attempt_index == self.policy.max_attempts:
+                    raise
+            except Exception as exc:
+                if not is_retryable_error(exc) or attempt_index == self.policy.max_attempts:
+                    raise
+                delay = decorrelated_jitter(delay, self.policy, self._rng)
+                if deadline is not None and self._clock() + delay >= deadline:
+                    raise
+                await self._sleep(delay)
+        raise RuntimeError("unreachable")
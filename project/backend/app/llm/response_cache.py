@@ -0,0 +1,174 @@
+"""LLM 响应缓存：按 (model, system prompt, user text, generation config) 内容寻址。"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping, Protocol
+
+_BYPASS_CACHE: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+class ResponseCache(Protocol):
+    """缓存后端契约：只存模型原始文本，命中后仍走统一的解析与 Pydantic 校验。"""
+
+    def get(self, key: str) -> str | None: ...
+
+    def set(self, key: str, value: str, *, ttl_seconds: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+def response_cache_key(
+    *,
+    model: str,
+    system_prompt: str | None,
+    user_text: str,
+    generation_config: Mapping[str, Any] | None,
+) -> str:
+    canonical = json.dumps(
+        {
+            "model": model,
+            "system_prompt": system_prompt or "",
+            "user_text": user_text,
+            "generation_config": generation_config or {},
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cache_bypassed() -> bool:
+    return _BYPASS_CACHE.get()
+
+
+@contextmanager
+def bypass_response_cache(enabled: bool = True) -> Iterator[None]:
+    """在当前上下文内跳过缓存读取（仍会写入新结果）。"""
+    token = _BYPASS_CACHE.set(enabled)
+    try:
+        yield
+    finally:
+        _BYPASS_CACHE.reset(token)
+
+
+class InMemoryLRUCache:
+    """进程内 LRU，超过 max_entries 时淘汰最久未访问的条目。"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, *, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteResponseCache:
+    """磁盘缓存，跨进程重启保留；过期条目在读取时惰性清理。"""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_response_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= self._clock():
+                self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key: str, value: str, *, ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, self._clock() + ttl_seconds),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_response_cache(
+    backend: str,
+    *,
+    max_entries: int,
+    sqlite_path: str | Path,
+) -> ResponseCache | None:
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryLRUCache(max_entries)
+    if backend == "sqlite":
+        return SQLiteResponseCache(sqlite_path)
+    raise ValueError(f"unsupported llm cache backend: {backend}")
@@ -3,12 +3,21 @@
 from __future__ import annotations
 
 import json
+from contextlib import aclosing
 from enum import Enum
-from typing import Any, Mapping, Sequence, TypeVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Mapping, Sequence, TypeVar
 
+import httpx
 from pydantic import TypeAdapter, ValidationError
 
+from app.config import LLM_CACHE_TTL_SECONDS
 from app.llm import prompts
+from app.llm.context_cache import ContextCache, SharedContext
+from app.llm.json_stream import JsonArrayStreamParser
+from app.llm.response_cache import ResponseCache, is_cache_bypassed, response_cache_key
+from app.llm.resilience import InvalidModelOutputError, ResilientCaller, RetryPolicy
+from app.llm.single_flight import SingleFlight
 from app.llm.schemas import (
     LogicCheckPayload,
     LogicCheckResult,
@@ -21,6 +30,8 @@ from app.services.topone_client import ToponeClient
 
 T = TypeVar("T")
 
+_CONTEXT_CACHE_REJECTED_STATUSES = frozenset({400, 403, 404})
+
 
 class LLMRole(str, Enum):
     ARCHITECT = "architect"
@@ -54,12 +65,23 @@ def _strip_code_fence(text: str) -> str:
     return "\n".join(lines[1:-1]).strip()
 
 
-def _parse_json_payload(text: str) -> Any:
+@lru_cache(maxsize=None)
+def _type_adapter(output_type: Any) -> TypeAdapter[Any]:
+    """按输出类型缓存 TypeAdapter，避免每次调用重建 pydantic-core schema。"""
+    return TypeAdapter(output_type)
+
+
+def _validate_structured_output(text: str, output_type: Any) -> T:
+    """直接对模型文本 validate_json，省去 json.loads → Python 对象 → 校验的二次遍历。"""
     candidate = _strip_code_fence(text)
     try:
-        return json.loads(candidate)
-    except json.JSONDecodeError as exc:
-        raise ValueError(f"invalid JSON model output: {exc.msg}") from exc
+        return _type_adapter(output_type).validate_json(candidate)
+    except ValidationError as exc:
+        json_errors = [error for error in exc.errors() if error["type"] == "json_invalid"]
+        if json_errors:
+            detail = json_errors[0].get("ctx", {}).get("error", json_errors[0]["msg"])
+            raise InvalidModelOutputError(f"invalid JSON model output: {detail}") from exc
+        raise InvalidModelOutputError(f"invalid structured output schema: {exc}") from exc
 
 
 async def _generate_structured_output(
@@ -70,30 +92,145 @@ async def _generate_structured_output(
     user_text: str,
     output_type: Any,
     generation_config: Mapping[str, Any] | None = None,
+    cache: ResponseCache | None = None,
+    cache_ttl_seconds: float = 0.0,
+    single_flight: SingleFlight[str] | None = None,
+    resilience: ResilientCaller | None = None,
+    shared_context: SharedContext | None = None,
+    context_cache: ContextCache | None = None,
 ) -> T:
-    response = await client.generate_content(
-        messages=[{"role": "user", "text": user_text}],
-        system_instruction=system_prompt,
-        generation_config=generation_config,
-        model=_model_for_role(client, role),
+    model = _model_for_role(client, role)
+    use_cache = cache is not None and cache_ttl_seconds > 0
+    request_key: str | None = None
+    if use_cache or single_flight is not None:
+        request_key = response_cache_key(
+            model=model,
+            system_prompt=system_prompt,
+            user_text=user_text,
+            generation_config=generation_config,
+        )
+    if use_cache:
+        cached = None if is_cache_bypassed() else cache.get(request_key)
+        if cached is not None:
+            try:
+                return _validate_structured_output(cached, output_type)
+            except ValueError:
+                # schema 变更后旧条目不再合法：丢弃并回源。
+                cache.delete(request_key)
+
+    async def _fetch_text() -> str:
+        if shared_context is not None and context_cache is not None:
+            cached_name = await context_cache.resolve(client, model=model, context=shared_context)
+            if cached_name is not None:
+                try:
+                    response = await client.generate_content(
+                        messages=[{"role": "user", "text": shared_context.suffix}],
+                        generation_config=generation_config,
+                        model=model,
+                        cached_content=cached_name,
+                    )
+                    return _extract_text(response).strip()
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code not in _CONTEXT_CACHE_REJECTED_STATUSES:
+                        raise
+                    # 缓存过期或被拒：标记退避后透明回退为完整 prompt。
+                    context_cache.invalidate(model=model, context=shared_context)
+        response = await client.generate_content(
+            messages=[{"role": "user", "text": user_text}],
+            system_instruction=system_prompt,
+            generation_config=generation_config,
+            model=model,
+        )
+        return _extract_text(response).strip()
+
+    async def _upstream_text() -> str:
+        if resilience is None:
+            return await _fetch_text()
+        return await resilience.fetch(_fetch_text)
+
+    async def _attempt() -> tuple[str, T]:
+        if single_flight is None:
+            text = await _upstream_text()
+        else:
+            text = await single_flight.run(request_key, _upstream_text)
+        return text, _validate_structured_output(text, output_type)
+
+    if resilience is None:
+        text, result = await _attempt()
+    else:
+        text, result = await resilience.run(_attempt)
+    if use_cache:
+        cache.set(request_key, text, ttl_seconds=cache_ttl_seconds)
+    return result
+
+
+def _story_prefix(root: SnowflakeRoot, characters: Sequence[CharacterSheet]) -> str:
+    """step5/锚点共享的静态上下文：同一 root 下多次调用完全一致，可托管为缓存前缀。"""
+    return (
+        f"logline: {root.logline}\n"
+        f"characters: {[c.model_dump() for c in characters]}"
     )
-    text = _extract_text(response).strip()
-    parsed = _parse_json_payload(text)
-    try:
-        return TypeAdapter(output_type).validate_python(parsed)
-    except ValidationError as exc:
-        raise ValueError(f"invalid structured output schema: {exc}") from exc
+
+
+def _render_scene_request(
+    client: ToponeClient, payload: SceneRenderPayload
+) -> dict[str, Any]:
+    user_text = json.dumps(payload.model_dump(exclude_none=True), ensure_ascii=False)
+    system_prompt = prompts.RENDER_SCENE_SYSTEM_PROMPT
+    if payload.logic_exception or payload.force_reason:
+        system_prompt = f"{system_prompt}\n戏剧性优先。"
+    return {
+        "messages": [{"role": "user", "text": user_text}],
+        "system_instruction": system_prompt,
+        "model": _model_for_role(client, LLMRole.CREATIVE),
+    }
 
 
 class ToponeGateway:
     """对业务层暴露的 TopOne 单一入口。"""
 
-    def __init__(self, client: ToponeClient) -> None:
+    def __init__(
+        self,
+        client: ToponeClient,
+        *,
+        cache: ResponseCache | None = None,
+        cache_ttl_seconds: Mapping[LLMRole | str, float] | None = None,
+        retry_policy: RetryPolicy | None = None,
+        context_cache: ContextCache | None = None,
+    ) -> None:
         self._client = client
-
-    async def generate_logline_options(self, raw_idea: str) -> list[str]:
+        self._cache = cache
+        ttls = LLM_CACHE_TTL_SECONDS if cache_ttl_seconds is None else cache_ttl_seconds
+        self._cache_ttl_seconds = {LLMRole(role): float(ttl) for role, ttl in ttls.items()}
+        self._single_flight: SingleFlight[str] = SingleFlight()
+        self._resilience = ResilientCaller(retry_policy) if retry_policy else None
+        self._context_cache = context_cache
+
+    async def _structured(
+        self,
+        *,
+        role: LLMRole,
+        system_prompt: str,
+        user_text: str,
+        output_type: Any,
+        shared_context: SharedContext | None = None,
+    ) -> Any:
         return await _generate_structured_output(
             client=self._client,
+            role=role,
+            system_prompt=system_prompt,
+            user_text=user_text,
+            output_type=output_type,
+            cache=self._cache,
+            cache_ttl_seconds=self._cache_ttl_seconds.get(role, 0.0),
+            single_flight=self._single_flight,
+            resilience=self._resilience,
+            shared_context=shared_context,
+            context_cache=self._context_cache,
+        )
+
+    async def generate_logline_options(self, raw_idea: str) -> list[str]:
+        return await self._structured(
             role=LLMRole.CREATIVE,
             system_prompt=prompts.SNOWFLAKE_STEP1_SYSTEM_PROMPT,
             user_text=raw_idea,
@@ -101,8 +238,7 @@ class ToponeGateway:
         )
 
     async def generate_root_structure(self, idea: str) -> SnowflakeRoot:
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.ARCHITECT,
             system_prompt=prompts.SNOWFLAKE_STEP2_SYSTEM_PROMPT,
             user_text=idea,
@@ -114,8 +250,7 @@ class ToponeGateway:
             f'logline: {root.logline}\nthree_disasters: {root.three_disasters}\n'
             f"ending: {root.ending}\ntheme: {root.theme}"
         )
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.CREATIVE,
             system_prompt=prompts.SNOWFLAKE_STEP3_SYSTEM_PROMPT,
             user_text=user_text,
@@ -126,8 +261,7 @@ class ToponeGateway:
         self, root: SnowflakeRoot, characters: Sequence[CharacterSheet]
     ) -> CharacterValidationResult:
         user_text = f"logline: {root.logline}\ncharacters: {[c.model_dump() for c in characters]}"
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.REASONING,
             system_prompt=prompts.SNOWFLAKE_VALIDATE_CHARACTERS_SYSTEM_PROMPT,
             user_text=user_text,
@@ -141,14 +275,41 @@ class ToponeGateway:
             f"logline: {root.logline}\nthree_disasters: {root.three_disasters}\n"
             f"characters: {[c.model_dump() for c in characters]}"
         )
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.CREATIVE,
             system_prompt=prompts.SNOWFLAKE_STEP4_SYSTEM_PROMPT,
             user_text=user_text,
             output_type=list[SceneNode],
         )
 
+    async def generate_scene_list_stream(
+        self, root: SnowflakeRoot, characters: Sequence[CharacterSheet]
+    ) -> AsyncIterator[SceneNode]:
+        """流式 step4：数组元素一闭合即校验并产出，首个非法元素立即失败。"""
+        user_text = (
+            f"logline: {root.logline}\nthree_disasters: {root.three_disasters}\n"
+            f"characters: {[c.model_dump() for c in characters]}"
+        )
+        adapter = _type_adapter(SceneNode)
+        parser = JsonArrayStreamParser()
+        chunks = self._client.stream_generate_content(
+            messages=[{"role": "user", "text": user_text}],
+            system_instruction=prompts.SNOWFLAKE_STEP4_SYSTEM_PROMPT,
+            model=_model_for_role(self._client, LLMRole.CREATIVE),
+        )
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    try:
+                        yield adapter.validate_python(item)
+                    except ValidationError as exc:
+                        raise InvalidModelOutputError(
+                            f"invalid structured output schema at scene {parser.count}: {exc}"
+                        ) from exc
+                if parser.finished:
+                    break
+        parser.close()
+
     async def generate_act_list(
         self, root: SnowflakeRoot, characters: Sequence[CharacterSheet]
     ) -> list[dict[str, object]]:
@@ -159,12 +320,20 @@ class ToponeGateway:
             f"theme: {root.theme}\n"
             f"characters: {[c.model_dump() for c in characters]}"
         )
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.ARCHITECT,
             system_prompt=prompts.SNOWFLAKE_STEP5A_SYSTEM_PROMPT,
             user_text=user_text,
             output_type=list[dict[str, object]],
+            shared_context=SharedContext(
+                system_prompt=prompts.SNOWFLAKE_STEP5A_SYSTEM_PROMPT,
+                prefix=_story_prefix(root, characters),
+                suffix=(
+                    f"three_disasters: {root.three_disasters}\n"
+                    f"ending: {root.ending}\n"
+                    f"theme: {root.theme}"
+                ),
+            ),
         )
 
     async def generate_chapter_list(
@@ -184,12 +353,19 @@ class ToponeGateway:
             f"act: {act}\n"
             f"characters: {[c.model_dump() for c in characters]}"
         )
-        return await _generate_structured_output(
-            client=self._client,
+        suffix = f"act: {act}"
+        if prompt_constraint:
+            suffix = f"{suffix}\n必须严格遵守 prompt_constraint: {prompt_constraint}"
+        return await self._structured(
             role=LLMRole.ARCHITECT,
             system_prompt=system_prompt,
             user_text=user_text,
             output_type=list[dict[str, object]],
+            shared_context=SharedContext(
+                system_prompt=prompts.SNOWFLAKE_STEP5B_SYSTEM_PROMPT,
+                prefix=_story_prefix(root, characters),
+                suffix=suffix,
+            ),
         )
 
     async def generate_story_anchors(
@@ -203,28 +379,38 @@ class ToponeGateway:
             f"acts: {list(acts)}\n"
             f"characters: {[c.model_dump() for c in characters]}"
         )
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.ARCHITECT,
             system_prompt=prompts.STORY_ANCHORS_SYSTEM_PROMPT,
             user_text=user_text,
             output_type=list[dict[str, object]],
+            shared_context=SharedContext(
+                system_prompt=prompts.STORY_ANCHORS_SYSTEM_PROMPT,
+                prefix=_story_prefix(root, characters),
+                suffix=f"acts: {list(acts)}",
+            ),
         )
 
     async def logic_check(self, payload: LogicCheckPayload) -> LogicCheckResult:
-        user_text = json.dumps(payload.model_dump(exclude_none=True), ensure_ascii=False)
-        return await _generate_structured_output(
-            client=self._client,
+        data = payload.model_dump(exclude_none=True)
+        user_text = json.dumps(data, ensure_ascii=False)
+        world_state = data.pop("world_state", {})
+        return await self._structured(
             role=LLMRole.REASONING,
             system_prompt=prompts.LOGIC_CHECK_SYSTEM_PROMPT,
             user_text=user_text,
             output_type=LogicCheckResult,
+            shared_context=SharedContext(
+                system_prompt=prompts.LOGIC_CHECK_SYSTEM_PROMPT,
+                prefix="world_state: "
+                + json.dumps(world_state, ensure_ascii=False, sort_keys=True),
+                suffix=json.dumps(data, ensure_ascii=False),
+            ),
         )
 
     async def state_extract(self, payload: StateExtractPayload) -> list[StateProposal]:
         user_text = json.dumps(payload.model_dump(exclude_none=True), ensure_ascii=False)
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.FLASH,
             system_prompt=prompts.STATE_EXTRACT_SYSTEM_PROMPT,
             user_text=user_text,
@@ -235,8 +421,7 @@ class ToponeGateway:
         self, payload: Mapping[str, Any]
     ) -> dict[str, str]:
         user_text = json.dumps(payload, ensure_ascii=False)
-        return await _generate_structured_output(
-            client=self._client,
+        return await self._structured(
             role=LLMRole.FLASH,
             system_prompt=prompts.ENTITY_RESOLUTION_SYSTEM_PROMPT,
             user_text=user_text,
@@ -244,17 +429,18 @@ class ToponeGateway:
         )
 
     async def render_scene(self, payload: SceneRenderPayload) -> str:
-        user_text = json.dumps(payload.model_dump(exclude_none=True), ensure_ascii=False)
-        system_prompt = prompts.RENDER_SCENE_SYSTEM_PROMPT
-        if payload.logic_exception or payload.force_reason:
-            system_prompt = f"{system_prompt}\n戏剧性优先。"
         response = await self._client.generate_content(
-            messages=[{"role": "user", "text": user_text}],
-            system_instruction=system_prompt,
-            model=_model_for_role(self._client, LLMRole.CREATIVE),
+            **_render_scene_request(self._client, payload)
         )
         return _extract_text(response).strip()
 
+    async def render_scene_stream(self, payload: SceneRenderPayload) -> AsyncIterator[str]:
+        """流式渲染：逐块产出正文增量，调用方负责拼接与落库。"""
+        async for chunk in self._client.stream_generate_content(
+            **_render_scene_request(self._client, payload)
+        ):
+            yield chunk
+
     async def generate_prose(
         self,
         *,
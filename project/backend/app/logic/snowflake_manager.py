@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import List, Protocol, Sequence
+from typing import AsyncIterator, List, Protocol, Sequence
 
 from app.models import CharacterSheet, CharacterValidationResult, SceneNode, SnowflakeRoot
 from app.storage.ports import GraphStoragePort
@@ -69,21 +69,14 @@ class SnowflakeManager:
     ) -> List[SceneNode]:
         scenes = await self.engine.generate_scene_list(root, characters)
 
-        if not self.min_scenes <= len(scenes) <= self.max_scenes:
-            raise ValueError(
-                f"Scene count {len(scenes)} outside required range "
-                f"{self.min_scenes}-{self.max_scenes}"
-            )
+        self._check_scene_count(len(scenes), final=True)
 
         ids = [str(scene.id) for scene in scenes]
         if len(ids) != len(set(ids)):
             raise ValueError("Scene IDs must be unique")
 
         for scene in scenes:
-            if not scene.expected_outcome or not scene.expected_outcome.strip():
-                raise ValueError("Scene expected_outcome is required")
-            if not scene.conflict_type or not scene.conflict_type.strip():
-                raise ValueError("Scene conflict_type is required")
+            self._check_scene_fields(scene)
 
         if characters:
             pov_cycle = [c.entity_id for c in characters]
@@ -93,9 +86,71 @@ class SnowflakeManager:
         elif self.storage:
             raise ValueError("characters is required for scene persistence")
 
+        self._persist_step_4(root, characters, scenes)
+        return scenes
+
+    async def stream_step_4_scenes(
+        self, root: SnowflakeRoot, characters: Sequence[CharacterSheet]
+    ) -> AsyncIterator[SceneNode]:
+        """流式 step4：逐个校验并产出场景，全部到齐且数量合规后一次性落库。
+
+        引擎未实现 generate_scene_list_stream 时退化为整批生成后逐个产出。
+        """
+        self.last_persisted_root_id = None
+        if not characters and self.storage:
+            raise ValueError("characters is required for scene persistence")
+        pov_cycle = [c.entity_id for c in characters]
+        streamer = getattr(self.engine, "generate_scene_list_stream", None)
+        source = (
+            streamer(root, characters)
+            if callable(streamer)
+            else _iterate(await self.engine.generate_scene_list(root, characters))
+        )
+
+        scenes: list[SceneNode] = []
+        seen_ids: set[str] = set()
+        async for scene in source:
+            scene_id = str(scene.id)
+            if scene_id in seen_ids:
+                raise ValueError("Scene IDs must be unique")
+            seen_ids.add(scene_id)
+            self._check_scene_fields(scene)
+            if pov_cycle and scene.pov_character_id is None:
+                scene.pov_character_id = pov_cycle[len(scenes) % len(pov_cycle)]
+            scenes.append(scene)
+            self._check_scene_count(len(scenes), final=False)
+            yield scene
+
+        self._check_scene_count(len(scenes), final=True)
+        self._persist_step_4(root, characters, scenes)
+
+    def _check_scene_count(self, count: int, *, final: bool) -> None:
+        too_many = count > self.max_scenes
+        if too_many or (final and count < self.min_scenes):
+            raise ValueError(
+                f"Scene count {count} outside required range "
+                f"{self.min_scenes}-{self.max_scenes}"
+            )
+
+    @staticmethod
+    def _check_scene_fields(scene: SceneNode) -> None:
+        if not scene.expected_outcome or not scene.expected_outcome.strip():
+            raise ValueError("Scene expected_outcome is required")
+        if not scene.conflict_type or not scene.conflict_type.strip():
+            raise ValueError("Scene conflict_type is required")
+
+    def _persist_step_4(
+        self,
+        root: SnowflakeRoot,
+        characters: Sequence[CharacterSheet],
+        scenes: Sequence[SceneNode],
+    ) -> None:
         if self.storage:
             self.last_persisted_root_id = self.storage.save_snowflake(
-                root=root, characters=characters, scenes=scenes
+                root=root, characters=characters, scenes=list(scenes)
             )
 
-        return scenes
+
+async def _iterate(scenes: Sequence[SceneNode]) -> AsyncIterator[SceneNode]:
+    for scene in scenes:
+        yield scene
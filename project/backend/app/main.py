@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
@@ -10,17 +11,46 @@ from datetime import datetime, timezone
 from uuid import uuid4
 from types import SimpleNamespace
 from functools import lru_cache
-from typing import Any, List, Mapping
+from typing import Any, AsyncIterator, List, Mapping
 
 import httpx
 from fastapi import BackgroundTasks, Body, Depends, FastAPI, HTTPException, Query, Path, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import ValidationError
 from app.llm.topone_gateway import ToponeGateway
 from app.llm import prompts as snowflake_prompts
+from app.llm.context_cache import ContextCache
+from app.llm.replay import LLMCassette, ReplayingLLM
+from app.llm.resilience import RetryPolicy
+from app.llm.response_cache import ResponseCache, build_response_cache, bypass_response_cache
 from app.config import (
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_SQLITE_PATH,
+    LLM_CONTEXT_CACHE_ENABLED,
+    LLM_CONTEXT_CACHE_MIN_PREFIX_CHARS,
+    LLM_CONTEXT_CACHE_TTL_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_REPLAY_MODE,
+    LLM_REPLAY_PATH,
+    LLM_RETRY_BASE_DELAY_SECONDS,
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_MAX_DELAY_SECONDS,
+    LLM_RETRY_TOTAL_TIMEOUT_SECONDS,
     SCENE_MAX_COUNT,
     SCENE_MIN_COUNT,
+    SIMULATION_AGENT_CONCURRENCY,
+    SIMULATION_AGENT_FAILURE_POLICY,
+    SIMULATION_AGENT_TIMEOUT_SECONDS,
+    SIMULATION_BATCH_AGENT_CALLS,
+    SIMULATION_EARLY_TERMINATION,
+    SIMULATION_LOG_FLUSH_ROUNDS,
+    SIMULATION_LOG_PAGE_MAX,
+    SIMULATION_JOB_RETENTION,
+    SIMULATION_SCENE_CONCURRENCY,
+    SIMULATION_SPECULATIVE_PERCEPTION,
+    STEP5B_ACT_CONCURRENCY,
     TOPONE_DEFAULT_MODEL,
     TOPONE_TIMEOUT_SECONDS,
     require_memgraph_host,
@@ -48,11 +78,6 @@ from app.models import (
     CreateEntityPayload,
     Entity,
     Root,
-    SceneOrigin,
-    SceneVersion,
-    Act,
-    Chapter,
-    StoryAnchor,
     UpdateEntityPayload,
     CreateSceneOriginPayload,
     CreateSceneOriginResult,
@@ -71,6 +96,7 @@ from app.models import (
     GcResult,
     IdeaPayload,
     ImpactLevel,
+    ImpactReport,
     LoglinePayload,
     LogicCheckPayload,
     LogicCheckResult,
@@ -95,6 +121,7 @@ from app.models import (
     SimulationRoundPayload,
     SimulationRoundResult,
     SimulationScenePayload,
+    SimulationBatchPayload,
     SnowflakeRoot,
     SnowflakePromptSet,
     StateExtractPayload,
@@ -111,13 +138,17 @@ from app.models import (
 )
 from app.services.character_agent import CharacterAgentEngine
 from app.services.llm_engine import LLMEngine, LocalStoryEngine
-from app.services.simulation_engine import SimulationEngine
+from app.services.rule_engine import RuleSetError
+from app.services.simulation_engine import SimulationEngine, SimulationMetrics
+from app.services.simulation_scheduler import SimulationScheduler
 from app.services.feedback_detector import FeedbackDetector
 from app.services.smart_renderer import SmartRenderer
 from app.services.subplot_manager import SubplotManager
 from app.services.topone_client import ToponeClient
+from app.services.upstream_limiter import LLMPriority, llm_priority
 from app.services.world_master import WorldMasterEngine
 from app.constants import DEFAULT_BRANCH_ID
+from app.utils.node_diff import build_patch_rows
 from app.storage.ports import GraphStoragePort
 from app.storage.schema import SimulationLog, Subplot
 
@@ -126,6 +157,33 @@ app = FastAPI(title="Snowflake Engine API", version="0.1.0")
 logger = logging.getLogger(__name__)
 
 
+@app.middleware("http")
+async def _llm_cache_bypass_middleware(request: Request, call_next):
+    """请求头 Cache-Control: no-cache 时本次请求内跳过 LLM 响应缓存读取。"""
+    no_cache = "no-cache" in request.headers.get("cache-control", "").lower()
+    with bypass_response_cache(no_cache):
+        return await call_next(request)
+
+
+_LLM_INTERACTIVE_PATH_SUFFIXES = ("/render", "/render/stream")
+_LLM_BACKGROUND_PATH_PREFIXES = ("/api/v1/simulation/", "/api/v1/feedback/")
+
+
+def _llm_priority_for_path(path: str) -> LLMPriority:
+    if path.endswith(_LLM_INTERACTIVE_PATH_SUFFIXES) or path == "/api/v1/render/scene":
+        return LLMPriority.INTERACTIVE
+    if path.startswith(_LLM_BACKGROUND_PATH_PREFIXES):
+        return LLMPriority.BACKGROUND
+    return LLMPriority.DEFAULT
+
+
+@app.middleware("http")
+async def _llm_priority_middleware(request: Request, call_next):
+    """渲染类交互请求优先出队，模拟/反馈等后台批处理让路。"""
+    with llm_priority(_llm_priority_for_path(request.url.path)):
+        return await call_next(request)
+
+
 # Global exception mapping to avoid leaking 500 for validation/infrastructure issues.
 
 def _normalize_unhandled_exception(exc: Exception) -> tuple[int, str]:
@@ -237,18 +295,30 @@ def _raise_upstream_http_error(exc: httpx.HTTPError) -> None:
 @app.on_event("startup")
 async def _validate_snowflake_engine_config() -> None:  # pragma: no cover
     try:
-        _require_snowflake_engine_mode()
+        engine_mode = _require_snowflake_engine_mode()
     except RuntimeError as exc:
         logger.error("snowflake engine config invalid: %s", exc)
+        return
+    if engine_mode == "gemini":
+        get_topone_client().open()
 
 
+@app.on_event("shutdown")
+async def _close_topone_client() -> None:  # pragma: no cover
+    if get_topone_client.cache_info().currsize:
+        await get_topone_client().aclose()
 
-def get_llm_engine() -> LLMEngine | LocalStoryEngine | ToponeGateway:  # pragma: no cover
-    """默认依赖注入，可在测试中 override。"""
-    try:
-        engine_mode = _require_snowflake_engine_mode()
-    except RuntimeError as exc:
-        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+
+@lru_cache(maxsize=1)
+def get_llm_cassette() -> LLMCassette | None:  # pragma: no cover
+    """LLM 录制/回放文件单例，LLM_REPLAY_MODE=off 时为 None。"""
+    if LLM_REPLAY_MODE == "off":
+        return None
+    return LLMCassette(LLM_REPLAY_PATH, mode=LLM_REPLAY_MODE)
+
+
+def _build_llm_engine(engine_mode: str) -> LLMEngine | LocalStoryEngine | ToponeGateway:
     if engine_mode == "local":
         return LocalStoryEngine()
     if engine_mode == "llm":
@@ -258,6 +328,25 @@ def get_llm_engine() -> LLMEngine | LocalStoryEngine | ToponeGateway:  # pragma:
     raise RuntimeError("unreachable")
 
 
+def get_llm_engine() -> LLMEngine | LocalStoryEngine | ToponeGateway:  # pragma: no cover
+    """默认依赖注入，可在测试中 override。"""
+    try:
+        engine_mode = _require_snowflake_engine_mode()
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return _build_llm_engine(engine_mode)
+
+
+def get_simulation_llm_engine(
+    engine: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_llm_engine),
+) -> LLMEngine | LocalStoryEngine | ToponeGateway:  # pragma: no cover
+    """推演链路（角色/世界主控/渲染/推演引擎）使用的 LLM；开启录制/回放时包一层 ReplayingLLM。"""
+    cassette = get_llm_cassette()
+    if cassette is None:
+        return engine
+    return ReplayingLLM(engine, cassette)  # type: ignore[return-value]
+
+
 @lru_cache(maxsize=1)
 def get_graph_storage() -> GraphStoragePort:  # pragma: no cover
     """Graph storage 单例，避免重复建立连接。"""
@@ -291,27 +380,56 @@ def get_topone_client() -> ToponeClient:  # pragma: no cover
     return ToponeClient()
 
 
+@lru_cache(maxsize=1)
+def get_llm_response_cache() -> ResponseCache | None:  # pragma: no cover
+    """LLM 响应缓存单例，后端由 LLM_CACHE_BACKEND 决定（none/memory/sqlite）。"""
+    return build_response_cache(
+        LLM_CACHE_BACKEND,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        sqlite_path=LLM_CACHE_SQLITE_PATH,
+    )
+
+
 @lru_cache(maxsize=1)
 def get_topone_gateway() -> ToponeGateway:  # pragma: no cover
     """TopOne 统一网关单例：结构化输出校验入口。"""
-    return ToponeGateway(get_topone_client())
+    return ToponeGateway(
+        get_topone_client(),
+        cache=get_llm_response_cache(),
+        retry_policy=RetryPolicy(
+            max_attempts=LLM_RETRY_MAX_ATTEMPTS,
+            base_delay_seconds=LLM_RETRY_BASE_DELAY_SECONDS,
+            max_delay_seconds=LLM_RETRY_MAX_DELAY_SECONDS,
+            total_timeout_seconds=LLM_RETRY_TOTAL_TIMEOUT_SECONDS,
+            hedge=LLM_HEDGE_ENABLED,
+            hedge_min_delay_seconds=LLM_HEDGE_MIN_DELAY_SECONDS,
+        ),
+        context_cache=(
+            ContextCache(
+                ttl_seconds=LLM_CONTEXT_CACHE_TTL_SECONDS,
+                min_prefix_chars=LLM_CONTEXT_CACHE_MIN_PREFIX_CHARS,
+            )
+            if LLM_CONTEXT_CACHE_ENABLED
+            else None
+        ),
+    )
 
 
 def get_character_agent_engine(
     storage: GraphStoragePort = Depends(get_graph_storage),
-    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_llm_engine),
+    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_simulation_llm_engine),
 ) -> CharacterAgentEngine:  # pragma: no cover
     return CharacterAgentEngine(storage=storage, llm=llm)
 
 
 def get_world_master_engine(
-    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_llm_engine),
+    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_simulation_llm_engine),
 ) -> WorldMasterEngine:  # pragma: no cover
     return WorldMasterEngine(llm=llm)
 
 
 def get_smart_renderer(
-    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_llm_engine),
+    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_simulation_llm_engine),
 ) -> SmartRenderer:  # pragma: no cover
     return SmartRenderer(llm=llm)
 
@@ -322,11 +440,17 @@ def get_subplot_manager(
     return SubplotManager(storage)
 
 
+@lru_cache(maxsize=1)
+def get_simulation_metrics() -> SimulationMetrics:  # pragma: no cover
+    """推演轮次统计单例：跨请求累计每个场景的实际/浪费/节省轮次。"""
+    return SimulationMetrics()
+
+
 def get_simulation_engine(
     character_engine: CharacterAgentEngine = Depends(get_character_agent_engine),
     world_master: WorldMasterEngine = Depends(get_world_master_engine),
     storage: GraphStoragePort = Depends(get_graph_storage),
-    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_llm_engine),
+    llm: LLMEngine | LocalStoryEngine | ToponeGateway = Depends(get_simulation_llm_engine),
     smart_renderer: SmartRenderer = Depends(get_smart_renderer),
 ) -> SimulationEngine:  # pragma: no cover
     return SimulationEngine(
@@ -335,6 +459,24 @@ def get_simulation_engine(
         storage=storage,
         llm=llm,
         smart_renderer=smart_renderer,
+        batch_agent_decisions=SIMULATION_BATCH_AGENT_CALLS,
+        max_concurrent_agents=SIMULATION_AGENT_CONCURRENCY,
+        agent_timeout_seconds=SIMULATION_AGENT_TIMEOUT_SECONDS or None,
+        agent_failure_policy=SIMULATION_AGENT_FAILURE_POLICY,
+        log_flush_rounds=SIMULATION_LOG_FLUSH_ROUNDS,
+        early_termination=SIMULATION_EARLY_TERMINATION,
+        speculative_perception=SIMULATION_SPECULATIVE_PERCEPTION,
+        metrics=get_simulation_metrics(),
+        feedback_detector=get_feedback_detector(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_simulation_scheduler() -> SimulationScheduler:  # pragma: no cover
+    """批量推演调度器单例：任务状态保存在进程内存中。"""
+    return SimulationScheduler(
+        max_concurrent_scenes=SIMULATION_SCENE_CONCURRENCY,
+        max_jobs=SIMULATION_JOB_RETENTION,
     )
 
 
@@ -399,6 +541,37 @@ async def generate_scene_endpoint(  # pragma: no cover
     )
 
 
+@app.post("/api/v1/snowflake/step4/stream")
+async def generate_scene_stream_endpoint(  # pragma: no cover
+    payload: ScenePayload, manager: SnowflakeManager = Depends(get_snowflake_manager)
+) -> StreamingResponse:
+    """SSE 版 step4：每个场景校验通过即推送 scene 事件，全部落库后推送 done。"""
+
+    async def _events() -> AsyncIterator[str]:
+        count = 0
+        try:
+            async for scene in manager.stream_step_4_scenes(payload.root, payload.characters):
+                yield _sse_event(
+                    "scene", {"index": count, "scene": scene.model_dump(mode="json")}
+                )
+                count += 1
+            if manager.storage is not None and not manager.last_persisted_root_id:
+                raise HTTPException(status_code=500, detail="step4 did not persist root_id")
+        except Exception as exc:
+            yield _sse_error(exc)
+            return
+        yield _sse_event(
+            "done",
+            {
+                "root_id": manager.last_persisted_root_id,
+                "branch_id": DEFAULT_BRANCH_ID,
+                "count": count,
+            },
+        )
+
+    return _sse_response(_events())
+
+
 @app.post("/api/v1/roots/{root_id}/snowflake/steps")
 async def save_snowflake_step_endpoint(  # pragma: no cover
     root_id: str = Path(..., min_length=1),
@@ -496,7 +669,8 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                 for entity in existing_entities
                 if entity.get("entity_id")
             }
-            update_entity = require_storage_method("update_entity")
+            new_characters: list[dict[str, Any]] = []
+            desired_entities: dict[str, dict[str, Any]] = {}
             for item in characters:
                 record = require_mapping(item, "character")
                 entity_id = record.get("id") or record.get("entity_id")
@@ -521,42 +695,35 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                     "epiphany": epiphany,
                     "voice_dna": voice_dna,
                 }
-                existing = existing_by_id.get(entity_id)
-                if existing is None:
-                    storage.create_entity(
-                        root_id=root_id,
-                        branch_id=DEFAULT_BRANCH_ID,
-                        name=name,
-                        entity_type="Character",
-                        tags=[],
-                        arc_status="active",
-                        semantic_states=semantic_states,
+                if entity_id not in existing_by_id:
+                    new_characters.append(
+                        {"name": name, "semantic_states": semantic_states}
                     )
                     continue
-                entity = Entity(
-                    id=entity_id,
+                desired_entities[entity_id] = {
+                    "name": name,
+                    "semantic_states": semantic_states,
+                }
+            entity_rows = build_patch_rows(
+                existing_by_id, desired_entities, kind="entity"
+            )
+            storage.apply_node_patches(patches={"Entity": entity_rows})
+            for character in new_characters:
+                storage.create_entity(
                     root_id=root_id,
                     branch_id=DEFAULT_BRANCH_ID,
-                    entity_type=existing.get("entity_type") or "Character",
-                    name=name,
-                    tags=existing.get("tags") or [],
-                    semantic_states=semantic_states,
-                    arc_status=existing.get("arc_status") or "active",
-                    has_agent=bool(existing.get("has_agent", False)),
-                    agent_state_id=existing.get("agent_state_id"),
+                    name=character["name"],
+                    entity_type="Character",
+                    tags=[],
+                    arc_status="active",
+                    semantic_states=character["semantic_states"],
                 )
-                update_entity(entity)
             return {"ok": True}
 
         if payload.step == "step4":
             scenes = require_list(data.get("scenes"), "scenes")
-            update_scene_origin = require_storage_method("update_scene_origin")
-            update_scene_version = require_storage_method("update_scene_version")
-            latest_version_fn = getattr(storage, "_get_latest_scene_version", None)
-            if latest_version_fn is None:
-                raise HTTPException(
-                    status_code=500, detail="storage missing latest scene version lookup"
-                )
+            desired_origins: dict[str, dict[str, Any]] = {}
+            desired_versions: dict[str, dict[str, Any]] = {}
             for item in scenes:
                 record = require_mapping(item, "scene")
                 scene_id = require_nonempty_str(record.get("id"), "scene.id")
@@ -577,70 +744,54 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                 pov_character_id = require_nonempty_str(
                     record.get("pov_character_id"), "scene.pov_character_id"
                 )
-                origin = storage.get_scene_origin(scene_id)
-                if origin is None:
-                    raise KeyError(f"scene origin not found: {scene_id}")
-                updated_origin = SceneOrigin(
-                    id=origin.id,
-                    root_id=origin.root_id,
-                    title=title,
-                    initial_commit_id=origin.initial_commit_id,
-                    sequence_index=sequence_index,
-                    parent_act_id=record.get("parent_act_id") or origin.parent_act_id,
-                    chapter_id=origin.chapter_id,
-                    is_skeleton=origin.is_skeleton,
-                )
-                update_scene_origin(updated_origin)
-                latest_version = latest_version_fn(scene_id)
-                if latest_version is None:
-                    raise KeyError(f"scene version not found: {scene_id}")
-                updated_version = SceneVersion(
-                    id=latest_version.id,
-                    scene_origin_id=latest_version.scene_origin_id,
-                    commit_id=latest_version.commit_id,
-                    pov_character_id=pov_character_id,
-                    status=latest_version.status,
-                    expected_outcome=expected_outcome,
-                    conflict_type=conflict_type,
-                    actual_outcome=actual_outcome,
-                    summary=latest_version.summary,
-                    rendered_content=latest_version.rendered_content,
-                    logic_exception=latest_version.logic_exception,
-                    logic_exception_reason=latest_version.logic_exception_reason,
-                    dirty=latest_version.dirty,
-                    simulation_log_id=latest_version.simulation_log_id,
-                    is_simulated=latest_version.is_simulated,
-                )
-                update_scene_version(updated_version)
+                desired_origins[scene_id] = {
+                    "title": title,
+                    "sequence_index": sequence_index,
+                    "parent_act_id": record.get("parent_act_id") or None,
+                }
+                desired_versions[scene_id] = {
+                    "pov_character_id": pov_character_id,
+                    "expected_outcome": expected_outcome,
+                    "conflict_type": conflict_type,
+                    "actual_outcome": actual_outcome,
+                }
+            scene_ids = list(desired_origins)
+            current_origins = storage.get_node_props_by_ids(
+                label="SceneOrigin", ids=scene_ids
+            )
+            origin_rows = build_patch_rows(
+                current_origins, desired_origins, kind="scene origin"
+            )
+            latest_versions = storage.get_latest_scene_version_props(
+                scene_origin_ids=scene_ids
+            )
+            version_rows = build_patch_rows(
+                latest_versions, desired_versions, kind="scene version"
+            )
+            for row in version_rows:
+                row["id"] = latest_versions[row["id"]]["id"]
+            storage.apply_node_patches(
+                patches={"SceneOrigin": origin_rows, "SceneVersion": version_rows}
+            )
             return {"ok": True}
 
         if payload.step == "step5":
             acts = require_list(data.get("acts"), "acts")
             chapters = require_list(data.get("chapters"), "chapters")
-            update_act = require_storage_method("update_act")
-            update_chapter = require_storage_method("update_chapter")
+            desired_acts: dict[str, dict[str, Any]] = {}
             for item in acts:
                 record = require_mapping(item, "act")
                 act_id = require_nonempty_str(record.get("id"), "act.id")
                 sequence = record.get("sequence")
                 if not isinstance(sequence, int):
                     raise ValueError("act.sequence is required")
-                title = require_nonempty_str(record.get("title"), "act.title")
-                purpose = require_nonempty_str(record.get("purpose"), "act.purpose")
-                tone = require_nonempty_str(record.get("tone"), "act.tone")
-                existing_act = storage.get_act(act_id)
-                if existing_act is None:
-                    raise KeyError(f"act not found: {act_id}")
-                update_act(
-                    Act(
-                        id=act_id,
-                        root_id=existing_act.root_id,
-                        sequence=sequence,
-                        title=title,
-                        purpose=purpose,
-                        tone=tone,
-                    )
-                )
+                desired_acts[act_id] = {
+                    "sequence": sequence,
+                    "title": require_nonempty_str(record.get("title"), "act.title"),
+                    "purpose": require_nonempty_str(record.get("purpose"), "act.purpose"),
+                    "tone": require_nonempty_str(record.get("tone"), "act.tone"),
+                }
+            desired_chapters: dict[str, dict[str, Any]] = {}
             for item in chapters:
                 record = require_mapping(item, "chapter")
                 chapter_id = require_nonempty_str(record.get("id"), "chapter.id")
@@ -652,30 +803,37 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                 pov_character_id = record.get("pov_character_id")
                 if pov_character_id is not None and not isinstance(pov_character_id, str):
                     raise ValueError("chapter.pov_character_id is required")
-                existing_chapter = storage.get_chapter(chapter_id)
-                if existing_chapter is None:
-                    raise KeyError(f"chapter not found: {chapter_id}")
-                update_chapter(
-                    Chapter(
-                        id=chapter_id,
-                        act_id=existing_chapter.act_id,
-                        sequence=sequence,
-                        title=title,
-                        focus=focus,
-                        pov_character_id=pov_character_id,
-                        rendered_content=existing_chapter.rendered_content,
-                        review_status=existing_chapter.review_status,
-                    )
-                )
+                desired_chapters[chapter_id] = {
+                    "sequence": sequence,
+                    "title": title,
+                    "focus": focus,
+                    "pov_character_id": pov_character_id,
+                }
+            act_rows = build_patch_rows(
+                storage.get_node_props_by_ids(label="Act", ids=list(desired_acts)),
+                desired_acts,
+                kind="act",
+            )
+            chapter_rows = build_patch_rows(
+                storage.get_node_props_by_ids(label="Chapter", ids=list(desired_chapters)),
+                desired_chapters,
+                kind="chapter",
+            )
+            storage.apply_node_patches(patches={"Act": act_rows, "Chapter": chapter_rows})
             return {"ok": True}
 
         if payload.step == "step6":
             anchors = require_list(data.get("anchors"), "anchors")
-            update_anchor = require_storage_method("update_anchor")
-            for item in anchors:
-                record = require_mapping(item, "anchor")
-                anchor_id = require_nonempty_str(record.get("id"), "anchor.id")
-                existing_anchor = storage.get_anchor(anchor_id)
+            records = [require_mapping(item, "anchor") for item in anchors]
+            anchor_ids = [
+                require_nonempty_str(record.get("id"), "anchor.id") for record in records
+            ]
+            current_anchors = storage.get_node_props_by_ids(
+                label="StoryAnchor", ids=anchor_ids
+            )
+            desired_anchors: dict[str, dict[str, Any]] = {}
+            for anchor_id, record in zip(anchor_ids, records):
+                existing_anchor = current_anchors.get(anchor_id)
                 if existing_anchor is None:
                     raise KeyError(f"anchor not found: {anchor_id}")
                 description = require_nonempty_str(
@@ -684,7 +842,7 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                 constraint_type = require_nonempty_str(
                     record.get("constraint_type"), "anchor.constraint_type"
                 )
-                anchor_type = record.get("anchor_type") or existing_anchor.anchor_type
+                anchor_type = record.get("anchor_type") or existing_anchor.get("anchor_type")
                 if not isinstance(anchor_type, str) or not anchor_type.strip():
                     raise ValueError("anchor.anchor_type is required")
                 required_conditions = record.get("required_conditions")
@@ -695,26 +853,19 @@ async def save_snowflake_step_endpoint(  # pragma: no cover
                 else:
                     raise ValueError("anchor.required_conditions is required")
                 achieved = record.get("achieved")
-                if achieved is None:
-                    achieved_value = bool(existing_anchor.achieved)
-                elif isinstance(achieved, bool):
-                    achieved_value = achieved
-                else:
+                if achieved is not None and not isinstance(achieved, bool):
                     raise ValueError("anchor.achieved is required")
-                update_anchor(
-                    StoryAnchor(
-                        id=existing_anchor.id,
-                        root_id=existing_anchor.root_id,
-                        branch_id=existing_anchor.branch_id,
-                        sequence=existing_anchor.sequence,
-                        anchor_type=anchor_type,
-                        description=description,
-                        constraint_type=constraint_type,
-                        required_conditions=required_conditions_payload,
-                        deadline_scene=existing_anchor.deadline_scene,
-                        achieved=achieved_value,
-                    )
-                )
+                desired_anchors[anchor_id] = {
+                    "anchor_type": anchor_type,
+                    "description": description,
+                    "constraint_type": constraint_type,
+                    "required_conditions": required_conditions_payload,
+                    "achieved": achieved,
+                }
+            anchor_rows = build_patch_rows(
+                current_anchors, desired_anchors, kind="anchor"
+            )
+            storage.apply_node_patches(patches={"StoryAnchor": anchor_rows})
             return {"ok": True}
 
         raise ValueError("unsupported snowflake step")
@@ -840,21 +991,33 @@ async def generate_chapter_list_endpoint(  # pragma: no cover
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     if not acts:
         raise HTTPException(status_code=404, detail="acts not found")
-    chapters: list[dict[str, Any]] = []
-    planned: list[tuple[str, list[dict[str, Any]]]] = []
-    total_count = 0
+    act_ids: list[str] = []
     for act in acts:
         if not isinstance(act, Mapping):
             raise HTTPException(status_code=422, detail="step5b act item must be object")
         act_id = act.get("id")
         if not act_id:
             raise HTTPException(status_code=422, detail="act id is required")
-        try:
-            generated = await engine.generate_chapter_list(payload.root, act, payload.characters)
-        except ValueError as exc:
-            raise HTTPException(status_code=422, detail=str(exc)) from exc
-        except httpx.HTTPError as exc:
-            _raise_upstream_http_error(exc)
+        act_ids.append(act_id)
+
+    semaphore = asyncio.Semaphore(STEP5B_ACT_CONCURRENCY)
+
+    async def generate_for_act(act: Mapping[str, Any]) -> list[dict[str, Any]]:
+        async with semaphore:
+            return await engine.generate_chapter_list(payload.root, act, payload.characters)
+
+    results = await asyncio.gather(
+        *(generate_for_act(act) for act in acts), return_exceptions=True
+    )
+    planned: list[tuple[str, list[dict[str, Any]]]] = []
+    total_count = 0
+    for act_id, generated in zip(act_ids, results):
+        if isinstance(generated, ValueError):
+            raise HTTPException(status_code=422, detail=str(generated)) from generated
+        if isinstance(generated, httpx.HTTPError):
+            _raise_upstream_http_error(generated)
+        if isinstance(generated, BaseException):
+            raise generated
         if not generated:
             raise HTTPException(status_code=422, detail="step5b returned empty chapters")
         for chapter in generated:
@@ -864,28 +1027,28 @@ async def generate_chapter_list_endpoint(  # pragma: no cover
         planned.append((act_id, generated))
     if total_count != 10:
         raise HTTPException(status_code=422, detail="chapter count must be 10")
+    chapter_rows: list[dict[str, Any]] = []
     for act_id, generated in planned:
         for idx, chapter in enumerate(generated, start=1):
             title = chapter.get("title")
             focus = chapter.get("focus")
-            pov_character_id = chapter.get("pov_character_id")
             if not title or not focus:
                 raise HTTPException(status_code=422, detail="chapter fields are required")
-            try:
-                chapters.append(
-                    storage.create_chapter(
-                        act_id=act_id,
-                        seq=idx,
-                        title=title,
-                        focus=focus,
-                        pov_character_id=pov_character_id,
-                    )
-                )
-            except KeyError as exc:
-                raise HTTPException(status_code=404, detail=str(exc)) from exc
-            except ValueError as exc:
-                raise HTTPException(status_code=422, detail=str(exc)) from exc
-    return chapters
+            chapter_rows.append(
+                {
+                    "act_id": act_id,
+                    "seq": idx,
+                    "title": title,
+                    "focus": focus,
+                    "pov_character_id": chapter.get("pov_character_id"),
+                }
+            )
+    try:
+        return storage.create_chapters(chapters=chapter_rows)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
 
 
 @app.post("/api/v1/roots/{root_id}/anchors")
@@ -1148,21 +1311,17 @@ async def list_chapters_endpoint(  # pragma: no cover
     return storage.list_chapters(act_id=act_id)
 
 
-@app.post("/api/v1/chapters/{chapter_id}/render")
-async def render_chapter_endpoint(  # pragma: no cover
-    chapter_id: str,
-    gateway: ToponeGateway = Depends(get_topone_gateway),
-    storage: GraphStoragePort = Depends(get_graph_storage),
-) -> dict[str, str]:
-    chapter = storage.get_chapter(chapter_id)
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="chapter not found")
+_CHAPTER_RENDER_MIN_CHARS = 1800
+_CHAPTER_RENDER_MAX_CHARS = 2200
+
+
+def _chapter_render_payload(chapter: Any) -> SceneRenderPayload:
     outline_requirement = (
         f"章节标题: {chapter.title}\n"
         f"章节焦点: {chapter.focus}\n"
         "请写约2000字的章节正文，严格控制在 1800-2200 字（不含标点空白）。"
     )
-    payload = SceneRenderPayload(
+    return SceneRenderPayload(
         voice_dna="neutral",
         conflict_type="internal",
         outline_requirement=outline_requirement,
@@ -1170,22 +1329,19 @@ async def render_chapter_endpoint(  # pragma: no cover
         expected_outcome=chapter.focus,
         world_state={},
     )
-    try:
-        content = await gateway.render_scene(payload)
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    suggested_min = 1800
-    suggested_max = 2200
-    content_length = _count_rendered_chars(content)
-    if content_length < suggested_min or content_length > suggested_max:
-        detail_prefix = "字数不足" if content_length < suggested_min else "字数超限"
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                f"{detail_prefix}: 当前 {content_length}，"
-                f"要求 {suggested_min}-{suggested_max}（不含标点空白）"
-            ),
-        )
+
+
+def _chapter_length_error(content_length: int) -> str | None:
+    if _CHAPTER_RENDER_MIN_CHARS <= content_length <= _CHAPTER_RENDER_MAX_CHARS:
+        return None
+    detail_prefix = "字数不足" if content_length < _CHAPTER_RENDER_MIN_CHARS else "字数超限"
+    return (
+        f"{detail_prefix}: 当前 {content_length}，"
+        f"要求 {_CHAPTER_RENDER_MIN_CHARS}-{_CHAPTER_RENDER_MAX_CHARS}（不含标点空白）"
+    )
+
+
+def _save_rendered_chapter(storage: GraphStoragePort, chapter: Any, content: str) -> None:
     chapter.rendered_content = content
     try:
         storage.update_chapter(chapter)
@@ -1193,9 +1349,86 @@ async def render_chapter_endpoint(  # pragma: no cover
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _sse_event(event: str, data: Mapping[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_error(exc: Exception) -> str:
+    if isinstance(exc, HTTPException):
+        return _sse_event("error", {"status_code": exc.status_code, "detail": exc.detail})
+    status_code, detail = _normalize_unhandled_exception(exc)
+    if isinstance(exc, httpx.HTTPError):
+        status_code, detail = 503, "upstream llm service unavailable"
+    return _sse_event("error", {"status_code": status_code, "detail": detail})
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/v1/chapters/{chapter_id}/render")
+async def render_chapter_endpoint(  # pragma: no cover
+    chapter_id: str,
+    gateway: ToponeGateway = Depends(get_topone_gateway),
+    storage: GraphStoragePort = Depends(get_graph_storage),
+) -> dict[str, str]:
+    chapter = storage.get_chapter(chapter_id)
+    if chapter is None:
+        raise HTTPException(status_code=404, detail="chapter not found")
+    try:
+        content = await gateway.render_scene(_chapter_render_payload(chapter))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    length_error = _chapter_length_error(_count_rendered_chars(content))
+    if length_error is not None:
+        raise HTTPException(status_code=400, detail=length_error)
+    _save_rendered_chapter(storage, chapter, content)
     return {"rendered_content": content}
 
 
+@app.post("/api/v1/chapters/{chapter_id}/render/stream")
+async def render_chapter_stream_endpoint(  # pragma: no cover
+    chapter_id: str,
+    gateway: ToponeGateway = Depends(get_topone_gateway),
+    storage: GraphStoragePort = Depends(get_graph_storage),
+) -> StreamingResponse:
+    """SSE 版章节渲染：delta 事件逐块推送，字数超限立即中止，完成后落库。"""
+    chapter = storage.get_chapter(chapter_id)
+    if chapter is None:
+        raise HTTPException(status_code=404, detail="chapter not found")
+    payload = _chapter_render_payload(chapter)
+
+    async def _events() -> AsyncIterator[str]:
+        chunks: list[str] = []
+        content_length = 0
+        try:
+            async for chunk in gateway.render_scene_stream(payload):
+                content_length += _count_rendered_chars(chunk)
+                if content_length > _CHAPTER_RENDER_MAX_CHARS:
+                    raise HTTPException(
+                        status_code=400, detail=_chapter_length_error(content_length)
+                    )
+                chunks.append(chunk)
+                yield _sse_event("delta", {"text": chunk, "char_count": content_length})
+            content = "".join(chunks).strip()
+            length_error = _chapter_length_error(_count_rendered_chars(content))
+            if length_error is not None:
+                raise HTTPException(status_code=400, detail=length_error)
+            _save_rendered_chapter(storage, chapter, content)
+        except Exception as exc:
+            yield _sse_error(exc)
+            return
+        yield _sse_event("done", {"chapter_id": chapter_id, "char_count": content_length})
+
+    return _sse_response(_events())
+
+
 @app.post("/api/v1/chapters/{chapter_id}/review")
 async def review_chapter_endpoint(  # pragma: no cover
     chapter_id: str,
@@ -1313,12 +1546,15 @@ async def dm_arbitrate_endpoint(  # pragma: no cover
     payload: DMArbitratePayload,
     engine: WorldMasterEngine = Depends(get_world_master_engine),
 ) -> dict[str, Any]:
-    arbitration = await engine.arbitrate(
-        payload.round_id,
-        payload.actions,
-        payload.world_state,
-        [],
-    )
+    try:
+        arbitration = await engine.arbitrate(
+            payload.round_id,
+            payload.actions,
+            payload.world_state,
+            payload.rules,
+        )
+    except RuleSetError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
     return arbitration.model_dump()
 
 
@@ -1420,6 +1656,57 @@ async def simulation_scene_endpoint(  # pragma: no cover
     return {"content": content}
 
 
+@app.post("/api/v1/simulation/jobs", status_code=202)
+async def simulation_job_create_endpoint(  # pragma: no cover
+    payload: SimulationBatchPayload,
+    engine: SimulationEngine = Depends(get_simulation_engine),
+    scheduler: SimulationScheduler = Depends(get_simulation_scheduler),
+) -> dict[str, Any]:
+    try:
+        job = scheduler.submit(engine, payload.scenes)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return job.snapshot()
+
+
+def _require_simulation_job(scheduler: SimulationScheduler, job_id: str):
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="simulation job not found")
+    return job
+
+
+@app.get("/api/v1/simulation/jobs/{job_id}")
+async def simulation_job_status_endpoint(  # pragma: no cover
+    job_id: str,
+    scheduler: SimulationScheduler = Depends(get_simulation_scheduler),
+) -> dict[str, Any]:
+    return _require_simulation_job(scheduler, job_id).snapshot()
+
+
+@app.get("/api/v1/simulation/jobs/{job_id}/events")
+async def simulation_job_events_endpoint(  # pragma: no cover
+    job_id: str,
+    scheduler: SimulationScheduler = Depends(get_simulation_scheduler),
+) -> StreamingResponse:
+    """SSE：回放已发生的进度事件并持续推送，任务结束后以 job_finished 收尾。"""
+    job = _require_simulation_job(scheduler, job_id)
+
+    async def _events() -> AsyncIterator[str]:
+        async for item in job.stream():
+            yield _sse_event(item["event"], item["data"])
+
+    return _sse_response(_events())
+
+
+@app.get("/api/v1/simulation/metrics")
+async def simulation_metrics_endpoint(  # pragma: no cover
+    metrics: SimulationMetrics = Depends(get_simulation_metrics),
+) -> dict[str, Any]:
+    """累计推演轮次统计：wasted_rounds 为未产生新信息的轮次，rounds_saved 为提前结束省下的轮次。"""
+    return metrics.snapshot()
+
+
 @app.post("/api/v1/feedback/loop")
 @app.post("/api/v1/simulation/feedback")
 async def feedback_loop_endpoint(  # pragma: no cover
@@ -1463,15 +1750,49 @@ def _normalize_simulation_log(log: SimulationLog) -> dict[str, Any]:
     return payload
 
 
+_SIMULATION_LOG_JSON_FIELDS = ("agent_actions", "dm_arbitration", "narrative_events", "sensory_seeds")
+
+
+def _parse_simulation_log_fields(fields: str) -> list[str]:
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in SimulationLog.model_fields]
+    if not selected or unknown:
+        raise HTTPException(status_code=422, detail=f"unknown simulation log fields: {unknown}")
+    return selected
+
+
+def _decode_simulation_log_fields(row: Mapping[str, Any]) -> dict[str, Any]:
+    payload = dict(row)
+    for name in _SIMULATION_LOG_JSON_FIELDS:
+        if isinstance(payload.get(name), str):
+            payload[name] = json.loads(payload[name])
+    return payload
+
+
 @app.get("/api/v1/simulation/logs/{scene_id}")
 async def simulation_log_endpoint(  # pragma: no cover
     scene_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=SIMULATION_LOG_PAGE_MAX),
+    fields: str | None = Query(None, min_length=1),
     storage: GraphStoragePort = Depends(get_graph_storage),
 ) -> list[dict[str, Any]]:
-    logs = storage.list_simulation_logs(scene_id)
-    if not logs:
+    if fields is None:
+        rows = [
+            _normalize_simulation_log(log)
+            for log in storage.list_simulation_logs(scene_id, offset=offset, limit=limit)
+        ]
+    else:
+        selected = _parse_simulation_log_fields(fields)
+        rows = [
+            _decode_simulation_log_fields(row)
+            for row in storage.list_simulation_log_fields(
+                scene_id, fields=selected, offset=offset, limit=limit
+            )
+        ]
+    if not rows and offset == 0:
         raise HTTPException(status_code=404, detail="simulation log not found")
-    return [_normalize_simulation_log(log) for log in logs]
+    return rows
 
 
 @app.post("/api/v1/render/scene")
@@ -1976,6 +2297,21 @@ async def delete_scene_origin_endpoint(  # pragma: no cover
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+def _save_scene_render(
+    storage: GraphStoragePort, *, scene_id: str, branch_id: str, content: str
+) -> None:
+    try:
+        storage.save_scene_render(
+            scene_id=scene_id,
+            branch_id=branch_id,
+            content=content,
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @app.post("/api/v1/scenes/{scene_id}/render", response_model=SceneRenderResult)
 async def render_scene_endpoint(  # pragma: no cover
     scene_id: str,
@@ -1991,16 +2327,7 @@ async def render_scene_endpoint(  # pragma: no cover
         )
 
     content = await gateway.render_scene(payload)
-    try:
-        storage.save_scene_render(
-            scene_id=scene_id,
-            branch_id=branch_id,
-            content=content,
-        )
-    except KeyError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _save_scene_render(storage, scene_id=scene_id, branch_id=branch_id, content=content)
     return SceneRenderResult(
         ok=True,
         scene_id=scene_id,
@@ -2009,6 +2336,44 @@ async def render_scene_endpoint(  # pragma: no cover
     )
 
 
+@app.post("/api/v1/scenes/{scene_id}/render/stream")
+async def render_scene_stream_endpoint(  # pragma: no cover
+    scene_id: str,
+    payload: SceneRenderPayload,
+    branch_id: str = Query(..., min_length=1),
+    gateway: ToponeGateway = Depends(get_topone_gateway),
+    storage: GraphStoragePort = Depends(get_graph_storage),
+) -> StreamingResponse:
+    """SSE 版场景渲染：delta 事件逐块推送正文，完成后一次性 save_scene_render。"""
+    if _require_snowflake_engine_mode() != "gemini":
+        raise HTTPException(
+            status_code=400,
+            detail="scene render 仅支持 gemini 模式，请设置 SNOWFLAKE_ENGINE=gemini。",
+        )
+
+    async def _events() -> AsyncIterator[str]:
+        chunks: list[str] = []
+        content_length = 0
+        try:
+            async for chunk in gateway.render_scene_stream(payload):
+                content_length += _count_rendered_chars(chunk)
+                chunks.append(chunk)
+                yield _sse_event("delta", {"text": chunk, "char_count": content_length})
+            content = "".join(chunks).strip()
+            _save_scene_render(
+                storage, scene_id=scene_id, branch_id=branch_id, content=content
+            )
+        except Exception as exc:
+            yield _sse_error(exc)
+            return
+        yield _sse_event(
+            "done",
+            {"scene_id": scene_id, "branch_id": branch_id, "char_count": content_length},
+        )
+
+    return _sse_response(_events())
+
+
 @app.post("/api/v1/scenes/{scene_id}/complete")
 async def complete_scene_endpoint(  # pragma: no cover
     scene_id: str,
@@ -2097,71 +2462,55 @@ async def complete_scene_orchestrated_endpoint(  # pragma: no cover
         scene_id=scene_id,
         force_reason=payload.force_reason,
     )
-    logic_result = await gateway.logic_check(logic_payload)
-    if mode != "force_execute" and not logic_result.ok and not is_logic_exception:
-        raise HTTPException(
-            status_code=400, detail=f"logic_check rejected: decision={logic_result.decision}"
-        )
-    if mode != "force_execute" and not is_logic_exception:
-        background_tasks.add_task(
-            _apply_impact_level,
-            storage=storage,
-            root_id=payload.root_id,
-            branch_id=payload.branch_id,
-            scene_id=scene_id,
-            impact_level=logic_result.impact_level,
-        )
-
     extract_payload = StateExtractPayload(
         content=payload.content,
         entity_ids=payload.entity_ids,
         root_id=payload.root_id,
         branch_id=payload.branch_id,
     )
-    proposals = await gateway.state_extract(extract_payload)
+    # logic_check 与 state_extract 互不依赖，并发发起；logic_check 拒绝时取消抽取。
+    logic_task = asyncio.create_task(gateway.logic_check(logic_payload))
+    extract_task = asyncio.create_task(gateway.state_extract(extract_payload))
+    try:
+        logic_result = await logic_task
+    except BaseException:
+        await _cancel_task(extract_task)
+        raise
+    if mode != "force_execute" and not logic_result.ok and not is_logic_exception:
+        await _cancel_task(extract_task)
+        raise HTTPException(
+            status_code=400, detail=f"logic_check rejected: decision={logic_result.decision}"
+        )
+    proposals = await extract_task
     if not proposals:
         raise HTTPException(status_code=400, detail="state_extract returned empty proposals.")
     try:
-        proposals = _enrich_state_proposals(
+        proposals, updated_entities = _finalize_scene_completion(
             storage=storage,
             root_id=payload.root_id,
             branch_id=payload.branch_id,
+            scene_id=scene_id,
             proposals=proposals,
+            confirmed_proposals=payload.confirmed_proposals,
+            actual_outcome=payload.actual_outcome,
+            summary=payload.summary,
         )
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    try:
-        updated_entities: list[dict[str, Any]] = []
-        if payload.confirmed_proposals:
-            extracted_entity_ids = {proposal.entity_id for proposal in proposals}
-            for confirmed in payload.confirmed_proposals:
-                if confirmed.entity_id not in extracted_entity_ids:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=(
-                            "confirmed_proposals entity_id not found in extracted proposals: "
-                            f"{confirmed.entity_id}"
-                        ),
-                    )
-            updated_entities = _apply_state_proposals(
-                storage=storage,
-                root_id=payload.root_id,
-                branch_id=payload.branch_id,
-                proposals=payload.confirmed_proposals,
-            )
-        storage.complete_scene(
-            scene_id=scene_id,
+    if mode != "force_execute" and not is_logic_exception:
+        # 场景已提交：影响级联放到响应之后执行，失败只记日志，避免客户端重试非幂等提交。
+        background_tasks.add_task(
+            _apply_impact_level_in_background,
+            storage=storage,
+            root_id=payload.root_id,
             branch_id=payload.branch_id,
-            actual_outcome=payload.actual_outcome,
-            summary=payload.summary,
+            scene_id=scene_id,
+            impact_level=logic_result.impact_level,
+            entity_ids=payload.entity_ids,
         )
-    except KeyError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     return SceneCompletionResult(
         ok=True,
@@ -2216,6 +2565,24 @@ async def generate_topone_content(  # pragma: no cover
     )
 
 
+@app.get("/api/v1/llm/topone/metrics")
+async def topone_metrics_endpoint(  # pragma: no cover
+    client: ToponeClient = Depends(get_topone_client),
+) -> dict[str, Any]:
+    """按模型输出上游限流状态与各优先级排队等待时间。"""
+    return {"models": client.limiter.snapshot()}
+
+
+@app.get("/api/v1/llm/replay/report")
+async def llm_replay_report_endpoint(  # pragma: no cover
+    cassette: LLMCassette | None = Depends(get_llm_cassette),
+) -> dict[str, Any]:
+    """录制/回放统计与回放分歧明细。"""
+    if cassette is None:
+        return {"mode": "off"}
+    return cassette.report()
+
+
 @app.post("/api/v1/logic/check", response_model=LogicCheckResult)
 async def logic_check_endpoint(  # pragma: no cover
     payload: LogicCheckPayload,
@@ -2354,6 +2721,21 @@ def _enrich_state_proposals(  # pragma: no cover
     proposals: List[StateProposal],
 ) -> List[StateProposal]:
     storage.require_root(root_id=root_id, branch_id=branch_id)
+    return _collect_enriched_proposals(
+        storage=storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        proposals=proposals,
+    )
+
+
+def _collect_enriched_proposals(  # pragma: no cover
+    *,
+    storage: GraphStoragePort,
+    root_id: str,
+    branch_id: str,
+    proposals: List[StateProposal],
+) -> List[StateProposal]:
     enriched: list[StateProposal] = []
     for proposal in proposals:
         before = storage.get_entity_semantic_states(
@@ -2384,6 +2766,21 @@ def _apply_state_proposals(  # pragma: no cover
     if not proposals:
         raise ValueError("proposals must not be empty.")
     storage.require_root(root_id=root_id, branch_id=branch_id)
+    return _patch_entity_states(
+        storage=storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        proposals=proposals,
+    )
+
+
+def _patch_entity_states(  # pragma: no cover
+    *,
+    storage: GraphStoragePort,
+    root_id: str,
+    branch_id: str,
+    proposals: List[StateProposal],
+) -> list[dict[str, Any]]:
     updated_entities: list[dict[str, Any]] = []
     for proposal in proposals:
         updated = storage.apply_semantic_states_patch(
@@ -2396,6 +2793,57 @@ def _apply_state_proposals(  # pragma: no cover
     return updated_entities
 
 
+async def _cancel_task(task: asyncio.Task[Any]) -> None:  # pragma: no cover
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def _finalize_scene_completion(  # pragma: no cover
+    *,
+    storage: GraphStoragePort,
+    root_id: str,
+    branch_id: str,
+    scene_id: str,
+    proposals: List[StateProposal],
+    confirmed_proposals: List[StateProposal],
+    actual_outcome: str,
+    summary: str,
+) -> tuple[List[StateProposal], list[dict[str, Any]]]:
+    """场景完成的存储收尾：一次 root 校验后依次完成状态补全、确认写入与场景提交。"""
+    storage.require_root(root_id=root_id, branch_id=branch_id)
+    enriched = _collect_enriched_proposals(
+        storage=storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        proposals=proposals,
+    )
+    extracted_entity_ids = {proposal.entity_id for proposal in enriched}
+    for confirmed in confirmed_proposals:
+        if confirmed.entity_id not in extracted_entity_ids:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    "confirmed_proposals entity_id not found in extracted proposals: "
+                    f"{confirmed.entity_id}"
+                ),
+            )
+    updated_entities: list[dict[str, Any]] = []
+    if confirmed_proposals:
+        updated_entities = _patch_entity_states(
+            storage=storage,
+            root_id=root_id,
+            branch_id=branch_id,
+            proposals=confirmed_proposals,
+        )
+    storage.complete_scene(
+        scene_id=scene_id,
+        branch_id=branch_id,
+        actual_outcome=actual_outcome,
+        summary=summary,
+    )
+    return enriched, updated_entities
+
+
 def _apply_impact_level(  # pragma: no cover
     *,
     storage: GraphStoragePort,
@@ -2403,21 +2851,82 @@ def _apply_impact_level(  # pragma: no cover
     branch_id: str,
     scene_id: str,
     impact_level: ImpactLevel,
+    entity_ids: List[str] | None = None,
 ) -> list[str]:
+    report = _apply_impact_level_report(
+        storage=storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        scene_id=scene_id,
+        impact_level=impact_level,
+        entity_ids=entity_ids,
+    )
+    return report.scene_ids
+
+
+def _apply_impact_level_in_background(  # pragma: no cover
+    *,
+    storage: GraphStoragePort,
+    root_id: str,
+    branch_id: str,
+    scene_id: str,
+    impact_level: ImpactLevel,
+    entity_ids: List[str] | None = None,
+) -> None:
+    try:
+        _apply_impact_level_report(
+            storage=storage,
+            root_id=root_id,
+            branch_id=branch_id,
+            scene_id=scene_id,
+            impact_level=impact_level,
+            entity_ids=entity_ids,
+        )
+    except Exception:
+        logger.exception(
+            "impact level %s failed after scene commit scene=%s",
+            impact_level.value,
+            scene_id,
+        )
+
+
+def _apply_impact_level_report(  # pragma: no cover
+    *,
+    storage: GraphStoragePort,
+    root_id: str,
+    branch_id: str,
+    scene_id: str,
+    impact_level: ImpactLevel,
+    entity_ids: List[str] | None = None,
+) -> ImpactReport:
     if impact_level == ImpactLevel.NEGLIGIBLE:
-        return []
+        return ImpactReport(impact_level=impact_level)
     if impact_level == ImpactLevel.LOCAL:
-        return storage.apply_local_scene_fix(
+        scene_ids = storage.apply_local_scene_fix(
             root_id=root_id,
             branch_id=branch_id,
             scene_id=scene_id,
             limit=3,
         )
+        return ImpactReport(impact_level=impact_level, scene_ids=scene_ids, writes=len(scene_ids))
     if impact_level == ImpactLevel.CASCADING:
-        return storage.mark_future_scenes_dirty(
+        result = storage.mark_future_scenes_dirty(
             root_id=root_id,
             branch_id=branch_id,
             scene_id=scene_id,
+            entity_ids=entity_ids,
+        )
+        logger.info(
+            "cascading dirty scene=%s writes=%s writes_avoided=%s",
+            scene_id,
+            result["writes"],
+            result["writes_avoided"],
+        )
+        return ImpactReport(
+            impact_level=impact_level,
+            scene_ids=result["scene_ids"],
+            writes=result["writes"],
+            writes_avoided=result["writes_avoided"],
         )
     raise ValueError(f"ImpactLevel {impact_level.value!r} is not supported in Phase1")
 
@@ -234,6 +234,7 @@ class SimulationLog(BaseModel):
     drama_score: float
     info_gain: float
     stagnation_count: int = 0
+    scene_id: str | None = None
 
 
 class Subplot(BaseModel):
@@ -669,6 +670,13 @@ class SceneCompletionOrchestratePayload(BaseModel):
     summary: str = Field(..., min_length=1)
 
 
+class ImpactReport(BaseModel):
+    impact_level: ImpactLevel
+    scene_ids: List[str] = Field(default_factory=list)
+    writes: int = 0
+    writes_avoided: int = 0
+
+
 class SceneCompletionResult(BaseModel):
     ok: bool
     scene_id: str
@@ -805,6 +813,7 @@ class DMArbitratePayload(BaseModel):
     round_id: str = Field(..., min_length=1)
     actions: List[dict[str, Any]]
     world_state: dict[str, Any]
+    rules: List[dict[str, Any]] = Field(default_factory=list)
 
 
 class DMConvergePayload(BaseModel):
@@ -834,6 +843,17 @@ class SimulationScenePayload(BaseModel):
     max_rounds: int = Field(..., ge=1)
 
 
+class SimulationBatchScene(BaseModel):
+    scene_context: dict[str, Any]
+    max_rounds: int = Field(..., ge=1)
+    key: str | None = Field(default=None, min_length=1)
+    depends_on: List[str] = Field(default_factory=list)
+
+
+class SimulationBatchPayload(BaseModel):
+    scenes: List[SimulationBatchScene] = Field(..., min_length=1)
+
+
 class RenderScenePayload(BaseModel):
     rounds: List[dict[str, Any]]
     scene: dict[str, Any]
@@ -2,14 +2,101 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import json
-from typing import Dict, List, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Sequence
+
+from pydantic import ValidationError
 
 from app.models import AgentAction, Intention
+from app.utils.node_diff import deep_merge_dict
 
 _TOP_DESIRE_LIMIT = 3
 
 
+@dataclass
+class AgentRoundContext:
+    """单轮决策上下文：角色状态只加载一次，意图按轮记忆，轮末一次性写回。"""
+
+    agent_id: str
+    state: Any | None = None
+    beliefs: dict[str, object] | None = None
+    intentions: list[Intention] | None = None
+    dirty: bool = False
+
+
+class PerceptionPrefetcher:
+    """单个场景的投机感知预取：预取任务与命中/未命中计数只属于该场景。
+
+    下一轮 perceive 时上下文与预取时一致才采用结果，否则丢弃并计为未命中。
+    """
+
+    def __init__(self, llm) -> None:
+        self.llm = llm
+        self._pending: dict[str, tuple[str, asyncio.Task[dict]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, agent_id: str, scene_context: Dict[str, object]) -> None:
+        prompt = str(scene_context)
+        previous = self._pending.pop(agent_id, None)
+        if previous is not None:
+            previous[1].cancel()
+            self.misses += 1
+        self._pending[agent_id] = (
+            prompt,
+            asyncio.ensure_future(
+                self.llm.generate_agent_perception({"agent_id": agent_id}, prompt)
+            ),
+        )
+
+    def discard(self) -> int:
+        """场景结束时取消未被消费的预取，返回丢弃数量。"""
+        discarded = len(self._pending)
+        for _, task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        self.misses += discarded
+        return discarded
+
+    async def take(self, agent_id: str, prompt: str) -> dict | None:
+        entry = self._pending.pop(agent_id, None)
+        if entry is None:
+            return None
+        prefetched_prompt, task = entry
+        if prefetched_prompt != prompt:
+            task.cancel()
+            self.misses += 1
+            return None
+        try:
+            payload = await task
+        except Exception:  # noqa: BLE001 - 预取失败时退回正常调用
+            payload = None
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload
+
+
+# 当前决策所属场景的预取器；asyncio 任务创建时复制上下文，并发场景互不可见。
+_active_prefetcher: ContextVar[PerceptionPrefetcher | None] = ContextVar(
+    "active_prefetcher", default=None
+)
+
+
+@contextlib.contextmanager
+def use_prefetcher(prefetcher: PerceptionPrefetcher | None) -> Iterator[None]:
+    token = _active_prefetcher.set(prefetcher)
+    try:
+        yield
+    finally:
+        _active_prefetcher.reset(token)
+
+
 class CharacterAgentEngine:
     """BDI 角色代理引擎。"""
 
@@ -17,6 +104,9 @@ class CharacterAgentEngine:
         self.storage = storage
         self.llm = llm
 
+    def perception_prefetcher(self) -> PerceptionPrefetcher:
+        return PerceptionPrefetcher(self.llm)
+
     @staticmethod
     def _serialize_intentions(intentions: Sequence[object]) -> list[dict[str, object]]:
         serialized: list[dict[str, object]] = []
@@ -69,50 +159,133 @@ class CharacterAgentEngine:
                 active.append(desire)
         return active
 
-    async def perceive(self, agent_id: str, scene_context: Dict[str, object]) -> dict:
-        payload = await self.llm.generate_agent_perception(
-            {"agent_id": agent_id}, str(scene_context)
+    @staticmethod
+    def _validate_scene_context(scene_context: object) -> None:
+        if not isinstance(scene_context, dict):
+            raise ValueError("scene_context must be dict")
+        if "scene" not in scene_context:
+            raise ValueError("scene_context requires scene")
+
+    @staticmethod
+    def _wait_action(agent_id: str) -> AgentAction:
+        return AgentAction(
+            agent_id=agent_id,
+            internal_thought="wait",
+            action_type="wait",
+            action_target="",
+            dialogue=None,
+            action_description="wait",
         )
-        beliefs_patch = self._extract_beliefs_patch(payload)
+
+    def _apply_beliefs(self, agent_id: str, beliefs_patch: dict[str, object]) -> dict:
         if hasattr(self.storage, "update_agent_beliefs"):
             return self.storage.update_agent_beliefs(
                 agent_id=agent_id, beliefs_patch=beliefs_patch
             )
         return {"beliefs": beliefs_patch}
 
-    async def deliberate(self, agent_id: str) -> List[Intention]:
-        if not hasattr(self.storage, "get_agent_state"):
-            return await self.llm.generate_agent_intentions(
-                {"agent_id": agent_id}, f"agent_id: {agent_id}"
+    def _open_round(self, agent_id: str) -> AgentRoundContext:
+        context = AgentRoundContext(agent_id=agent_id)
+        if hasattr(self.storage, "save_agent_round_state"):
+            context.state = self.storage.get_agent_state(agent_id)
+            if context.state is None:
+                raise KeyError(f"agent state not found: {agent_id}")
+        return context
+
+    @staticmethod
+    def _load_beliefs(agent_state: object) -> dict[str, object]:
+        raw = getattr(agent_state, "beliefs", None)
+        if raw is None:
+            raise ValueError("agent beliefs is required")
+        if isinstance(raw, str):
+            raw = json.loads(raw)
+        if not isinstance(raw, dict):
+            raise ValueError("agent beliefs must be json object")
+        return raw
+
+    def _commit_round(self, context: AgentRoundContext) -> None:
+        if context.state is None or not context.dirty:
+            return
+        beliefs = context.beliefs
+        if beliefs is None:
+            beliefs = self._load_beliefs(context.state)
+        self.storage.save_agent_round_state(
+            agent_id=context.agent_id,
+            expected_version=getattr(context.state, "version", None),
+            beliefs=beliefs,
+            intentions=self._serialize_intentions(context.intentions or []),
+        )
+        context.dirty = False
+
+    async def perceive(
+        self,
+        agent_id: str,
+        scene_context: Dict[str, object],
+        context: AgentRoundContext | None = None,
+    ) -> dict:
+        prompt = str(scene_context)
+        prefetcher = _active_prefetcher.get()
+        payload = None if prefetcher is None else await prefetcher.take(agent_id, prompt)
+        if payload is None:
+            payload = await self.llm.generate_agent_perception({"agent_id": agent_id}, prompt)
+        beliefs_patch = self._extract_beliefs_patch(payload)
+        if context is None or context.state is None:
+            return self._apply_beliefs(agent_id, beliefs_patch)
+        current = context.beliefs
+        if current is None:
+            current = self._load_beliefs(context.state)
+        context.beliefs = deep_merge_dict(current, beliefs_patch)
+        context.dirty = True
+        return {"id": agent_id, "beliefs": context.beliefs}
+
+    async def deliberate(
+        self, agent_id: str, context: AgentRoundContext | None = None
+    ) -> List[Intention]:
+        if context is not None and context.intentions is not None:
+            return context.intentions
+        if context is not None and context.state is not None:
+            agent_state = context.state
+        elif not hasattr(self.storage, "get_agent_state"):
+            return self._remember_intentions(
+                context,
+                await self.llm.generate_agent_intentions(
+                    {"agent_id": agent_id}, f"agent_id: {agent_id}"
+                ),
             )
-        agent_state = self.storage.get_agent_state(agent_id)
-        if agent_state is None:
-            raise KeyError(f"agent state not found: {agent_id}")
+        else:
+            agent_state = self.storage.get_agent_state(agent_id)
+            if agent_state is None:
+                raise KeyError(f"agent state not found: {agent_id}")
         desires = self._load_desires(getattr(agent_state, "desires", None))
         last_updated = getattr(agent_state, "last_updated_scene", 0) or 0
         active = self._filter_active_desires(desires, last_updated)
         active.sort(key=lambda item: item.get("priority", 0), reverse=True)
         top_desires = active[:_TOP_DESIRE_LIMIT]
         profile = {"agent_id": agent_id, "desires": top_desires}
-        return await self.llm.generate_agent_intentions(
-            profile, f"agent_id: {agent_id}"
+        return self._remember_intentions(
+            context,
+            await self.llm.generate_agent_intentions(profile, f"agent_id: {agent_id}"),
         )
 
-    async def act(self, agent_id: str, scene_context: Dict[str, object]) -> AgentAction:
-        if not isinstance(scene_context, dict):
-            raise ValueError("scene_context must be dict")
-        if "scene" not in scene_context:
-            raise ValueError("scene_context requires scene")
-        intentions = await self.deliberate(agent_id)
+    @staticmethod
+    def _remember_intentions(
+        context: AgentRoundContext | None, intentions: List[Intention]
+    ) -> List[Intention]:
+        if context is not None:
+            context.intentions = intentions
+            context.dirty = True
+        return intentions
+
+    async def act(
+        self,
+        agent_id: str,
+        scene_context: Dict[str, object],
+        context: AgentRoundContext | None = None,
+    ) -> AgentAction:
+        self._validate_scene_context(scene_context)
+        intentions = await self.deliberate(agent_id, context=context)
         if not intentions:
-            return AgentAction(
-                agent_id=agent_id,
-                internal_thought="wait",
-                action_type="wait",
-                action_target="",
-                dialogue=None,
-                action_description="wait",
-            )
+            return self._wait_action(agent_id)
         return await self.llm.generate_agent_action(
             {"agent_id": agent_id},
             str(scene_context),
@@ -120,6 +293,99 @@ class CharacterAgentEngine:
         )
 
     async def decide(self, agent_id: str, scene_context: Dict[str, object]) -> AgentAction:
-        await self.perceive(agent_id, scene_context)
-        await self.deliberate(agent_id)
-        return await self.act(agent_id, scene_context)
+        """perceive → deliberate → act 共用一个轮上下文：意图只生成一次，状态只读写各一次。"""
+        context = self._open_round(agent_id)
+        await self.perceive(agent_id, scene_context, context=context)
+        await self.deliberate(agent_id, context=context)
+        action = await self.act(agent_id, scene_context, context=context)
+        self._commit_round(context)
+        return action
+
+    def supports_batch(self) -> bool:
+        return hasattr(self.llm, "generate_agent_perceptions_batch") and hasattr(
+            self.llm, "generate_agent_actions_batch"
+        )
+
+    async def decide_batch(
+        self, agent_ids: Sequence[str], scene_context: Dict[str, object]
+    ) -> List[AgentAction]:
+        """多角色合并感知与行动调用；单个角色结果非法时回退为该角色的单独调用。"""
+        if not self.supports_batch():
+            return [await self.decide(agent_id, scene_context) for agent_id in agent_ids]
+        self._validate_scene_context(scene_context)
+        if len(set(agent_ids)) != len(agent_ids):
+            raise ValueError("duplicate agent_id in batch")
+        if not agent_ids:
+            return []
+        await self._perceive_batch(agent_ids, scene_context)
+        intentions_by_agent = {
+            agent_id: self._serialize_intentions(await self.deliberate(agent_id))
+            for agent_id in agent_ids
+        }
+        return await self._act_batch(agent_ids, scene_context, intentions_by_agent)
+
+    @staticmethod
+    def _batch_item(raw: object, agent_id: str) -> object:
+        if not isinstance(raw, Mapping):
+            return None
+        return raw.get(agent_id)
+
+    async def _perceive_batch(
+        self, agent_ids: Sequence[str], scene_context: Dict[str, object]
+    ) -> None:
+        try:
+            raw = await self.llm.generate_agent_perceptions_batch(
+                [{"agent_id": agent_id} for agent_id in agent_ids], str(scene_context)
+            )
+        except ValueError:
+            raw = None
+        for agent_id in agent_ids:
+            item = self._batch_item(raw, agent_id)
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("beliefs_patch must be object")
+                beliefs_patch = self._extract_beliefs_patch(item)
+            except ValueError:
+                await self.perceive(agent_id, scene_context)
+                continue
+            self._apply_beliefs(agent_id, beliefs_patch)
+
+    async def _act_batch(
+        self,
+        agent_ids: Sequence[str],
+        scene_context: Dict[str, object],
+        intentions_by_agent: Mapping[str, list[dict[str, object]]],
+    ) -> List[AgentAction]:
+        acting = [agent_id for agent_id in agent_ids if intentions_by_agent[agent_id]]
+        raw: object = None
+        if acting:
+            try:
+                raw = await self.llm.generate_agent_actions_batch(
+                    [
+                        {
+                            "profile": {"agent_id": agent_id},
+                            "intentions": intentions_by_agent[agent_id],
+                        }
+                        for agent_id in acting
+                    ],
+                    str(scene_context),
+                )
+            except ValueError:
+                raw = None
+        actions: list[AgentAction] = []
+        for agent_id in agent_ids:
+            intentions = intentions_by_agent[agent_id]
+            if not intentions:
+                actions.append(self._wait_action(agent_id))
+                continue
+            item = self._batch_item(raw, agent_id)
+            try:
+                action = AgentAction.model_validate(item)
+                if action.agent_id != agent_id:
+                    raise ValueError("agent_id mismatch in batch action")
+            except (ValidationError, ValueError):
+                action = await self.llm.generate_agent_action(
+                    {"agent_id": agent_id}, str(scene_context), intentions
+                )
+            actions.append(action)
+        return actions
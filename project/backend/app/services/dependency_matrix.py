@@ -4,22 +4,55 @@ from __future__ import annotations
 
 import asyncio
 import inspect
+from bisect import bisect_right
 from typing import Awaitable, Callable, Mapping, Sequence
 
 from app.utils.graph_algorithms import (
+    build_entity_scene_bitsets,
     build_entity_scene_index,
-    collect_impacted_scenes,
+    build_scene_order,
+    collect_impacted_scene_mask,
+    iter_mask_positions,
 )
 
 
 class DependencyMatrix:
+    """Entity -> scene index stored as per-entity scene bitsets.
+
+    Scene ids are interned to bit positions ordered by ``scene_seq``, so the
+    scenes after a given sequence form one contiguous high-bit mask.
+    """
+
     def __init__(
         self,
-        entity_to_scenes: dict[str, set[str]],
+        entity_to_scenes: Mapping[str, set[str]],
         scene_sequences: Mapping[str, int] | None = None,
     ) -> None:
-        self._entity_to_scenes = entity_to_scenes
+        scene_ids = [
+            scene_id for scenes in entity_to_scenes.values() for scene_id in scenes
+        ]
+        if scene_sequences is not None:
+            scene_ids.extend(scene_sequences)
+        self._scene_order = build_scene_order(scene_ids, scene_sequences)
+        self._scene_positions = {
+            scene_id: position for position, scene_id in enumerate(self._scene_order)
+        }
+        self._entity_bits = build_entity_scene_bitsets(
+            entity_to_scenes, self._scene_positions
+        )
         self._scene_sequences = scene_sequences
+        self._sorted_sequences = (
+            [
+                scene_sequences[scene_id]
+                for scene_id in self._scene_order
+                if scene_id in scene_sequences
+            ]
+            if scene_sequences is not None
+            else []
+        )
+        sequenced_count = len(self._sorted_sequences)
+        self._sequenced_mask = (1 << sequenced_count) - 1
+        self._unsequenced_mask = ((1 << len(self._scene_order)) - 1) ^ self._sequenced_mask
 
     @classmethod
     def from_scene_entities(
@@ -33,8 +66,23 @@ class DependencyMatrix:
             scene_sequences=scene_sequences,
         )
 
+    @property
+    def scene_count(self) -> int:
+        return len(self._scene_order)
+
+    @property
+    def entity_count(self) -> int:
+        return len(self._entity_bits)
+
+    def get_impacted_scene_mask(self, entity_ids: Sequence[str]) -> int:
+        return collect_impacted_scene_mask(self._entity_bits, entity_ids)
+
     def get_impacted_scenes(self, entity_ids: Sequence[str]) -> list[str]:
-        return collect_impacted_scenes(self._entity_to_scenes, entity_ids)
+        return self._decode_mask(self.get_impacted_scene_mask(entity_ids))
+
+    def scenes_after_mask(self, min_scene_seq: int) -> int:
+        cutoff = bisect_right(self._sorted_sequences, min_scene_seq)
+        return self._sequenced_mask & ~((1 << cutoff) - 1)
 
     def filter_scenes_after(
         self,
@@ -42,11 +90,30 @@ class DependencyMatrix:
         *,
         min_scene_seq: int,
     ) -> list[str]:
-        return [
-            scene_id
-            for scene_id in scene_ids
-            if self._scene_sequences[scene_id] > min_scene_seq
-        ]
+        mask = 0
+        for scene_id in scene_ids:
+            mask |= 1 << self._scene_positions[scene_id]
+        return self._decode_mask(self._mask_after(mask, min_scene_seq))
+
+    def get_impacted_scenes_after(
+        self,
+        entity_ids: Sequence[str],
+        *,
+        min_scene_seq: int,
+    ) -> list[str]:
+        mask = self.get_impacted_scene_mask(entity_ids)
+        return self._decode_mask(self._mask_after(mask, min_scene_seq))
+
+    def _mask_after(self, mask: int, min_scene_seq: int) -> int:
+        unsequenced = mask & self._unsequenced_mask
+        if unsequenced:
+            position = next(iter_mask_positions(unsequenced))
+            raise KeyError(self._scene_order[position])
+        return mask & self.scenes_after_mask(min_scene_seq)
+
+    def _decode_mask(self, mask: int) -> list[str]:
+        order = self._scene_order
+        return [order[position] for position in iter_mask_positions(mask)]
 
 
 class DependencyMatrixCache:
@@ -5,15 +5,20 @@ from __future__ import annotations
 from typing import Sequence
 
 from app.models import FeedbackReport, SimulationRoundResult
+from app.services.round_metrics import RoundMetrics
 
 
 class FeedbackDetector:
     """递归反馈检测与修正处理。"""
 
     async def detect_feedback(
-        self, rounds: Sequence[SimulationRoundResult]
+        self,
+        rounds: Sequence[SimulationRoundResult],
+        *,
+        metrics: RoundMetrics | None = None,
     ) -> FeedbackReport | None:
-        latest = rounds[-1]
+        """按最新一轮判断停滞/偏离；传入 metrics 时重复检测改看滚动窗口均值。"""
+        latest = metrics.latest if metrics is not None and metrics.rounds else rounds[-1]
         if latest.stagnation_count >= 3:
             severity = min(1.0, 0.5 + 0.1 * latest.stagnation_count)
             return FeedbackReport(
@@ -38,13 +43,16 @@ class FeedbackDetector:
                 corrections=[{"action": "recenter_objective"}],
                 severity=severity,
             )
-        if latest.info_gain <= 0.05 and latest.drama_score <= 0.2:
-            severity = min(1.0, 0.4 + (0.05 - latest.info_gain) * 6)
+        info_gain, drama_score = latest.info_gain, latest.drama_score
+        if metrics is not None and metrics.rounds:
+            info_gain, drama_score = metrics.mean_info_gain(), metrics.mean_drama()
+        if info_gain <= 0.05 and drama_score <= 0.2:
+            severity = min(1.0, 0.4 + (0.05 - info_gain) * 6)
             return FeedbackReport(
                 trigger="repetition",
                 feedback={
-                    "info_gain": latest.info_gain,
-                    "drama_score": latest.drama_score,
+                    "info_gain": info_gain,
+                    "drama_score": drama_score,
                 },
                 corrections=[{"action": "introduce_twist"}],
                 severity=severity,
@@ -55,8 +63,10 @@ class FeedbackDetector:
         self,
         scene_context: dict[str, object],
         rounds: Sequence[SimulationRoundResult],
+        *,
+        metrics: RoundMetrics | None = None,
     ) -> tuple[FeedbackReport | None, dict[str, object]]:
-        report = await self.detect_feedback(rounds)
+        report = await self.detect_feedback(rounds, metrics=metrics)
         updated_context = dict(scene_context)
         if report is None:
             return None, updated_context
@@ -89,11 +89,10 @@ class ImpactAnalyzer:
                 builder=lambda: self._build_dependency_matrix(root_id),
             )
             matrix = await matrix if inspect.isawaitable(matrix) else matrix
-            impacted_scene_ids = matrix.get_impacted_scenes(entity_ids)
             impacted_scene_ids = (
-                matrix.filter_scenes_after(impacted_scene_ids, min_scene_seq=scene_seq)
+                matrix.get_impacted_scenes_after(entity_ids, min_scene_seq=scene_seq)
                 if isinstance(matrix, DependencyMatrix)
-                else impacted_scene_ids
+                else matrix.get_impacted_scenes(entity_ids)
             )
 
         severity = self._calculate_severity(state_changes)
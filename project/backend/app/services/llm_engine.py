@@ -267,6 +267,52 @@ class LLMEngine:
             messages=messages,
         )
 
+    async def generate_agent_perceptions_batch(
+        self,
+        profiles: Sequence[Dict[str, object]],
+        scene_context: str,
+    ) -> Dict[str, object]:
+        """多角色感知合并为一次调用，返回以 agent_id 为键的原始结果，由调用方逐个校验。"""
+        messages = [
+            {"role": ROLE_SYSTEM, "content": prompts.character_agent.BATCH_PERCEIVE_PROMPT},
+            {
+                "role": ROLE_USER,
+                "content": "\n".join(
+                    [
+                        f"agents: {list(profiles)}",
+                        f"scene: {scene_context}",
+                    ]
+                ),
+            },
+        ]
+        return await self._call_model(
+            response_model=Dict[str, object],
+            messages=messages,
+        )
+
+    async def generate_agent_actions_batch(
+        self,
+        requests: Sequence[Dict[str, object]],
+        scene_context: str,
+    ) -> Dict[str, object]:
+        """多角色行动合并为一次调用；requests 每项含 profile 与 intentions。"""
+        messages = [
+            {"role": ROLE_SYSTEM, "content": prompts.character_agent.BATCH_ACT_PROMPT},
+            {
+                "role": ROLE_USER,
+                "content": "\n".join(
+                    [
+                        f"agents: {list(requests)}",
+                        f"scene: {scene_context}",
+                    ]
+                ),
+            },
+        ]
+        return await self._call_model(
+            response_model=Dict[str, object],
+            messages=messages,
+        )
+
     async def generate_dm_arbitration(
         self,
         round_id: str,
@@ -0,0 +1,121 @@
+"""推演轮次滚动指标：信息增益、节奏与反馈检测共用的增量累加器。"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Iterable
+
+KNOWLEDGE_FIELDS = ("facts", "relations", "secrets")
+
+
+def _state_value(state: object, key: str, default: object) -> object:
+    if isinstance(state, dict):
+        return state.get(key, default)
+    return getattr(state, key, default)
+
+
+def _as_items(value: object) -> Iterable[object]:
+    if value is None:
+        return ()
+    if isinstance(value, (list, set, tuple, frozenset)):
+        return value
+    return (value,)
+
+
+class _RingBuffer:
+    """定长 double 环形缓冲，维护窗口内的滚动和。"""
+
+    def __init__(self, size: int) -> None:
+        self._values = array("d", [0.0] * size)
+        self._size = size
+        self._count = 0
+        self._sum = 0.0
+
+    def push(self, value: float) -> None:
+        index = self._count % self._size
+        if self._count >= self._size:
+            self._sum -= self._values[index]
+        self._values[index] = value
+        self._sum += value
+        self._count += 1
+
+    def __len__(self) -> int:
+        return min(self._count, self._size)
+
+    def mean(self) -> float:
+        filled = len(self)
+        return self._sum / filled if filled else 0.0
+
+    def last(self, n: int) -> list[float]:
+        """最近 n 个值，按时间先后排列。"""
+        n = min(n, len(self))
+        return [self._values[(self._count - n + i) % self._size] for i in range(n)]
+
+
+class RoundMetrics:
+    """单个场景的滚动指标，每轮 O(1) 更新。
+
+    - facts/relations/secrets 累计为已知集合，增量判断新信息，不再每轮重建；
+    - info_gain / drama / conflict_escalation 保存在最近 window 轮的环形缓冲中。
+    """
+
+    def __init__(self, window: int = 3) -> None:
+        if window < 3:
+            raise ValueError("window must be >= 3")
+        self.window = window
+        self._known: dict[str, set[object]] = {field: set() for field in KNOWLEDGE_FIELDS}
+        self._seeded = False
+        self._info_gain = _RingBuffer(window)
+        self._drama = _RingBuffer(window)
+        self._conflict = _RingBuffer(window)
+        self.rounds = 0
+        self.latest: object | None = None
+
+    @property
+    def seeded(self) -> bool:
+        return self._seeded
+
+    def seed(self, state: object) -> None:
+        """以推演前的场景状态初始化已知集合。"""
+        for field in KNOWLEDGE_FIELDS:
+            self._known[field].update(_as_items(_state_value(state, field, None)))
+        self._seeded = True
+
+    def absorb(self, state: object) -> tuple[int, int]:
+        """并入新状态，返回 (新增条目数, 本状态条目总数)。"""
+        new_info = 0
+        total = 0
+        for field in KNOWLEDGE_FIELDS:
+            known = self._known[field]
+            items = set(_as_items(_state_value(state, field, None)))
+            total += len(items)
+            new_info += len(items - known)
+            known |= items
+        return new_info, total
+
+    def known_count(self, field: str) -> int:
+        return len(self._known[field])
+
+    def record_round(self, result: object, *, conflict_escalation: float | None = None) -> None:
+        if conflict_escalation is None:
+            conflict_escalation = getattr(result, "conflict_escalation", None)
+        self._info_gain.push(float(result.info_gain))
+        self._drama.push(float(getattr(result, "drama_score", 0.0) or 0.0))
+        # 缺少冲突值时记 NaN，趋势判断不会把它当作下降。
+        self._conflict.push(math.nan if conflict_escalation is None else float(conflict_escalation))
+        self.rounds += 1
+        self.latest = result
+
+    def mean_info_gain(self) -> float:
+        return self._info_gain.mean()
+
+    def mean_drama(self) -> float:
+        return self._drama.mean()
+
+    def is_deescalating(self) -> bool:
+        """最近 3 轮冲突烈度严格递减。"""
+        values = self._conflict.last(3)
+        if len(values) < 3 or any(math.isnan(value) for value in values):
+            return False
+        return values[0] > values[1] > values[2]
@@ -0,0 +1,271 @@
+"""声明式行动规则：JSON 条件一次编译为按 action_type 分组的求值器。
+
+规则格式::
+
+    {
+        "id": "no_attack_on_allies",
+        "action_type": "attack",            # 可为字符串、列表或省略（匹配全部）
+        "require": [                         # 全部满足才算合法
+            {"field": "action.action_target", "op": "not_in",
+             "ref": "world_state.allies.{action.agent_id}"}
+        ],
+        "outcome": "failure",               # 违反时的结果：failure / partial
+        "reason": "rule_violation"
+    }
+
+字段路径以 action. 或 world_state. 开头，用点分隔；花括号内的路径先求值再作为键。
+路径缺失或值无法比较时视为违反该规则（exists 运算符除外）；strict=True 编译的规则
+改为直接抛 KeyError，用于复刻原先硬编码检查的内置规则。is / is_not 只接受 null/true/false。
+"""
+
+from __future__ import annotations
+
+import json
+import operator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Sequence
+
+Resolver = Callable[[object, Mapping[str, Any]], Any]
+
+_MISSING = object()
+RULE_ROOTS = frozenset({"action", "world_state"})
+RULE_OUTCOMES = frozenset({"failure", "partial"})
+BINARY_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "in": lambda left, right: left in right,
+    "not_in": lambda left, right: left not in right,
+    "is": operator.is_,
+    "is_not": operator.is_not,
+}
+# 只对单例值开放身份比较，避免依赖字符串驻留等实现细节。
+IDENTITY_VALUES = (None, True, False)
+UNARY_OPERATORS: Dict[str, Callable[[Any], bool]] = {
+    "truthy": bool,
+    "falsy": operator.not_,
+}
+
+
+class RuleSetError(ValueError):
+    """规则定义不合法。"""
+
+
+def _lookup(container: object, key: str) -> Any:
+    if isinstance(container, Mapping):
+        return container[key]
+    try:
+        return getattr(container, key)
+    except AttributeError as exc:
+        raise KeyError(key) from exc
+
+
+def _split_path(path: str) -> list[str]:
+    segments: list[str] = []
+    depth = 0
+    current: list[str] = []
+    for char in path:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth < 0:
+                raise RuleSetError(f"unbalanced braces in path: {path}")
+        if char == "." and depth == 0:
+            segments.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if depth != 0:
+        raise RuleSetError(f"unbalanced braces in path: {path}")
+    segments.append("".join(current))
+    if any(not segment for segment in segments):
+        raise RuleSetError(f"empty segment in path: {path}")
+    return segments
+
+
+def compile_path(path: str) -> Resolver:
+    if not isinstance(path, str) or not path:
+        raise RuleSetError("rule field path must be a non-empty string")
+    root, *segments = _split_path(path)
+    if root not in RULE_ROOTS:
+        raise RuleSetError(f"rule path must start with action or world_state: {path}")
+    steps: list[str | Resolver] = [
+        compile_path(segment[1:-1]) if segment.startswith("{") and segment.endswith("}") else segment
+        for segment in segments
+    ]
+    from_action = root == "action"
+
+    def resolve(action: object, world_state: Mapping[str, Any]) -> Any:
+        value: Any = action if from_action else world_state
+        for step in steps:
+            key = step if isinstance(step, str) else step(action, world_state)
+            value = _lookup(value, key)
+        return value
+
+    return resolve
+
+
+def _compile_condition(condition: Mapping[str, Any]) -> Callable[[object, Mapping[str, Any]], bool]:
+    if not isinstance(condition, Mapping):
+        raise RuleSetError("rule condition must be an object")
+    field = compile_path(condition.get("field"))
+    op = condition.get("op", "eq")
+    if op == "exists":
+
+        def exists(action: object, world_state: Mapping[str, Any]) -> bool:
+            try:
+                field(action, world_state)
+            except KeyError:
+                return False
+            return True
+
+        return exists
+    if op in UNARY_OPERATORS:
+        unary = UNARY_OPERATORS[op]
+        return lambda action, world_state: unary(field(action, world_state))
+    if op not in BINARY_OPERATORS:
+        raise RuleSetError(f"unknown rule operator: {op}")
+    binary = BINARY_OPERATORS[op]
+    if op in {"is", "is_not"} and (
+        "ref" in condition
+        or not any(condition.get("value", _MISSING) is value for value in IDENTITY_VALUES)
+    ):
+        raise RuleSetError(f"rule operator {op} only accepts null/true/false values")
+    if "ref" in condition:
+        ref = compile_path(condition["ref"])
+        return lambda action, world_state: binary(
+            field(action, world_state), ref(action, world_state)
+        )
+    if "value" not in condition:
+        raise RuleSetError(f"rule operator {op} requires value or ref")
+    value = condition["value"]
+    if op in {"in", "not_in"} and isinstance(value, list):
+        try:
+            value = frozenset(value)
+        except TypeError:
+            pass
+    return lambda action, world_state: binary(field(action, world_state), value)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    rule_id: str
+    action_types: frozenset[str] | None
+    outcome: str
+    reason: str
+    conditions: tuple[Callable[[object, Mapping[str, Any]], bool], ...]
+    strict: bool = False
+
+    def violated(self, action: object, world_state: Mapping[str, Any]) -> bool:
+        if self.strict:
+            return not all(check(action, world_state) for check in self.conditions)
+        try:
+            return not all(check(action, world_state) for check in self.conditions)
+        except (KeyError, TypeError):
+            return True
+
+
+def _compile_rule(index: int, rule: Mapping[str, Any], strict: bool) -> CompiledRule:
+    if not isinstance(rule, Mapping):
+        raise RuleSetError("rule must be an object")
+    action_type = rule.get("action_type")
+    if action_type is None:
+        action_types = None
+    elif isinstance(action_type, str):
+        action_types = frozenset({action_type})
+    elif isinstance(action_type, list) and all(isinstance(item, str) for item in action_type):
+        action_types = frozenset(action_type)
+    else:
+        raise RuleSetError("rule action_type must be a string or list of strings")
+    outcome = rule.get("outcome", "failure")
+    if outcome not in RULE_OUTCOMES:
+        raise RuleSetError(f"rule outcome must be one of {sorted(RULE_OUTCOMES)}")
+    conditions = rule.get("require")
+    if not isinstance(conditions, list) or not conditions:
+        raise RuleSetError("rule require must be a non-empty list")
+    return CompiledRule(
+        rule_id=str(rule.get("id") or f"rule-{index + 1}"),
+        action_types=action_types,
+        outcome=outcome,
+        reason=str(rule.get("reason") or "rule_violation"),
+        conditions=tuple(_compile_condition(condition) for condition in conditions),
+        strict=strict,
+    )
+
+
+class CompiledRuleSet:
+    """按 action_type 预先分组的规则表；组内保持声明顺序，返回第一条违反的规则。"""
+
+    def __init__(self, rules: Sequence[CompiledRule]) -> None:
+        self.rules = tuple(rules)
+        self._wildcard = tuple(rule for rule in self.rules if rule.action_types is None)
+        action_types = {
+            action_type
+            for rule in self.rules
+            if rule.action_types is not None
+            for action_type in rule.action_types
+        }
+        self._by_type = {
+            action_type: tuple(
+                rule
+                for rule in self.rules
+                if rule.action_types is None or action_type in rule.action_types
+            )
+            for action_type in action_types
+        }
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def rules_for(self, action_type: object) -> tuple[CompiledRule, ...]:
+        return self._by_type.get(action_type, self._wildcard)  # type: ignore[arg-type]
+
+    def first_violation(
+        self,
+        action: object,
+        world_state: Mapping[str, Any],
+        action_type: object = _MISSING,
+    ) -> CompiledRule | None:
+        if action_type is _MISSING:
+            if isinstance(action, Mapping):
+                action_type = action.get("action_type")
+            else:
+                action_type = getattr(action, "action_type", None)
+        for rule in self.rules_for(action_type):
+            if rule.violated(action, world_state):
+                return rule
+        return None
+
+
+@lru_cache(maxsize=128)
+def _compile_canonical(canonical: str, strict: bool) -> CompiledRuleSet:
+    rules = json.loads(canonical)
+    return CompiledRuleSet(
+        [_compile_rule(index, rule, strict) for index, rule in enumerate(rules)]
+    )
+
+
+def compile_rule_set(
+    rules: Sequence[Mapping[str, Any]], *, strict: bool = False
+) -> CompiledRuleSet:
+    """编译声明式规则；按内容缓存，同一 root 的规则在多轮仲裁中只编译一次。"""
+    if not isinstance(rules, (list, tuple)):
+        raise RuleSetError("rules must be a list")
+    try:
+        canonical = json.dumps(list(rules), sort_keys=True, separators=(",", ":"))
+    except TypeError as exc:
+        raise RuleSetError(f"rules must be JSON serializable: {exc}") from exc
+    return _compile_canonical(canonical, strict)
+
+
+def load_rule_set(text: str) -> CompiledRuleSet:
+    try:
+        rules = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise RuleSetError(f"invalid rule JSON: {exc.msg}") from exc
+    return compile_rule_set(rules)
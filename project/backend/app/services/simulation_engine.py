@@ -2,32 +2,215 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import json
-
+import logging
+from dataclasses import dataclass
+from enum import Enum
 from types import SimpleNamespace
 from typing import Dict, List, Sequence
 
 from app.models import AgentAction, DMArbitration, SimulationRoundResult
-from app.storage.schema import SimulationLog
+from app.services.character_agent import PerceptionPrefetcher, use_prefetcher
+from app.services.round_metrics import RoundMetrics
+from app.services.simulation_log_writer import SimulationLogWriter
+
+logger = logging.getLogger(__name__)
+
+
+class AgentFailurePolicy(str, Enum):
+    """单个角色决策失败/超时时的处理方式。"""
+
+    SKIP = "skip"
+    WAIT = "wait"
+    ABORT = "abort"
+
+
+def _wait_action(agent_id: str) -> AgentAction:
+    return AgentAction(
+        agent_id=agent_id,
+        internal_thought="wait",
+        action_type="wait",
+        action_target="",
+        dialogue=None,
+        action_description="wait",
+    )
+
+
+def _config_value(config, name: str, default=None):
+    if isinstance(config, dict):
+        return config.get(name, default)
+    return getattr(config, name, default)
+
+
+def _anchor_conditions_met(world_state: Dict[str, object], anchor: Dict[str, object]) -> bool:
+    return all(world_state.get(condition) for condition in anchor["required_conditions"])
+
+
+@dataclass
+class SceneRunStats:
+    """单个场景的控制循环统计；wasted_rounds 为没有新增信息（info_gain < 0.1）的轮次。"""
+
+    scene_id: str | None
+    max_rounds: int
+    rounds_run: int = 0
+    wasted_rounds: int = 0
+    end_reason: str = "max_rounds"
+    speculative_hits: int = 0
+    speculative_misses: int = 0
+
+    @property
+    def rounds_saved(self) -> int:
+        return self.max_rounds - self.rounds_run
+
+
+class SimulationMetrics:
+    """跨场景累计推演轮次统计，供 /api/v1/simulation/metrics 输出。"""
+
+    def __init__(self) -> None:
+        self.scenes = 0
+        self.rounds_run = 0
+        self.wasted_rounds = 0
+        self.rounds_saved = 0
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+        self.end_reasons: dict[str, int] = {}
+
+    def record(self, stats: SceneRunStats) -> None:
+        self.scenes += 1
+        self.rounds_run += stats.rounds_run
+        self.wasted_rounds += stats.wasted_rounds
+        self.rounds_saved += stats.rounds_saved
+        self.speculative_hits += stats.speculative_hits
+        self.speculative_misses += stats.speculative_misses
+        self.end_reasons[stats.end_reason] = self.end_reasons.get(stats.end_reason, 0) + 1
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "scenes": self.scenes,
+            "rounds_run": self.rounds_run,
+            "wasted_rounds": self.wasted_rounds,
+            "wasted_rounds_per_scene": self.wasted_rounds / self.scenes if self.scenes else 0.0,
+            "rounds_saved": self.rounds_saved,
+            "speculative_hits": self.speculative_hits,
+            "speculative_misses": self.speculative_misses,
+            "end_reasons": dict(self.end_reasons),
+        }
 
 
 class SimulationEngine:
     """推演引擎。"""
 
-    def __init__(self, character_engine, world_master, storage, llm, smart_renderer=None):
+    def __init__(
+        self,
+        character_engine,
+        world_master,
+        storage,
+        llm,
+        smart_renderer=None,
+        batch_agent_decisions: bool = False,
+        max_concurrent_agents: int = 8,
+        agent_timeout_seconds: float | None = None,
+        agent_failure_policy: AgentFailurePolicy | str = AgentFailurePolicy.ABORT,
+        log_flush_rounds: int = 0,
+        early_termination: bool = False,
+        speculative_perception: bool = False,
+        metrics: SimulationMetrics | None = None,
+        feedback_detector=None,
+    ):
+        if max_concurrent_agents <= 0:
+            raise ValueError("max_concurrent_agents must be > 0")
+        if agent_timeout_seconds is not None and agent_timeout_seconds <= 0:
+            raise ValueError("agent_timeout_seconds must be > 0")
         self.character_engine = character_engine
         self.world_master = world_master
         self.storage = storage
         self.llm = llm
         self.smart_renderer = smart_renderer
+        self.batch_agent_decisions = batch_agent_decisions
+        self.max_concurrent_agents = max_concurrent_agents
+        self.agent_timeout_seconds = agent_timeout_seconds
+        self.agent_failure_policy = AgentFailurePolicy(agent_failure_policy)
+        self.log_flush_rounds = log_flush_rounds
+        self.early_termination = early_termination
+        self.speculative_perception = speculative_perception
+        self.metrics = metrics
+        self.feedback_detector = feedback_detector
+        self.last_scene_stats: SceneRunStats | None = None
+
+    def _can_batch_decisions(self, agents: Sequence[object]) -> bool:
+        return (
+            self.batch_agent_decisions
+            and len(agents) > 1
+            and hasattr(self.character_engine, "decide_batch")
+        )
+
+    async def _decide_concurrently(
+        self, agents: Sequence[object], scene_context: Dict[str, object]
+    ) -> list[AgentAction]:
+        """并发决策：信号量限流，结果按 agents 顺序返回，耗时取决于最慢的角色。"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_agents)
+
+        async def _decide(agent) -> AgentAction:
+            async with semaphore:
+                return await asyncio.wait_for(
+                    agent.decide(agent.agent_id, scene_context),
+                    self.agent_timeout_seconds,
+                )
+
+        tasks = [asyncio.ensure_future(_decide(agent)) for agent in agents]
+        if not tasks:
+            return []
+        abort = self.agent_failure_policy == AgentFailurePolicy.ABORT
+        try:
+            await asyncio.wait(
+                tasks,
+                return_when=asyncio.FIRST_EXCEPTION if abort else asyncio.ALL_COMPLETED,
+            )
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        actions: list[AgentAction] = []
+        for agent, task in zip(agents, tasks):
+            error = None if task.cancelled() else task.exception()
+            if task.cancelled() or error is not None:
+                if abort:
+                    # 取 agents 顺序中第一个真实失败，保证异常可复现。
+                    if error is None:
+                        continue
+                    raise error
+                logger.warning(
+                    "agent %s decision failed (%s): %r",
+                    agent.agent_id,
+                    self.agent_failure_policy.value,
+                    error,
+                )
+                if self.agent_failure_policy == AgentFailurePolicy.WAIT:
+                    actions.append(_wait_action(agent.agent_id))
+                continue
+            actions.append(task.result())
+        return actions
 
     async def run_round(
         self, scene_context: Dict[str, object], agents: Sequence[object], config
     ) -> SimulationRoundResult:
         agent_actions: list[AgentAction] = []
-        for agent in agents:
-            action = await agent.decide(agent.agent_id, scene_context)
-            agent_actions.append(action)
+        if self._can_batch_decisions(agents):
+            agent_actions = await self.character_engine.decide_batch(
+                [agent.agent_id for agent in agents], scene_context
+            )
+        else:
+            prefetcher = _config_value(config, "prefetcher")
+            with use_prefetcher(prefetcher):
+                agent_actions = await self._decide_concurrently(agents, scene_context)
+            if prefetcher is not None and _config_value(config, "speculate_next", False):
+                for agent in agents:
+                    prefetcher.prefetch(agent.agent_id, scene_context)
 
         action_payloads = [
             {
@@ -46,7 +229,13 @@ class SimulationEngine:
             {},
         )
         sensory_seeds = await self.world_master.inject_sensory_seeds(scene_context)
-        info_gain = await self.calculate_info_gain(scene_context, dm_arbitration)
+        metrics = _config_value(config, "round_metrics")
+        if metrics is None:
+            info_gain = await self.calculate_info_gain(scene_context, dm_arbitration)
+        else:
+            info_gain = await self.calculate_info_gain(
+                scene_context, dm_arbitration, metrics=metrics
+            )
 
         return SimulationRoundResult(
             round_id=config.round_id,
@@ -60,6 +249,32 @@ class SimulationEngine:
             stagnation_count=0,
         )
 
+    def _open_prefetcher(self) -> PerceptionPrefetcher | None:
+        """投机感知开启时为本次 run_scene 创建独立的预取器。"""
+        factory = getattr(self.character_engine, "perception_prefetcher", None)
+        if not self.speculative_perception or factory is None:
+            return None
+        return factory()
+
+    def _finish_scene_stats(
+        self, stats: SceneRunStats, prefetcher: PerceptionPrefetcher | None
+    ) -> None:
+        if prefetcher is not None:
+            prefetcher.discard()
+            stats.speculative_hits = prefetcher.hits
+            stats.speculative_misses = prefetcher.misses
+        self.last_scene_stats = stats
+        if self.metrics is not None:
+            self.metrics.record(stats)
+        logger.info(
+            "scene %s ended (%s) after %d/%d rounds, wasted=%d",
+            stats.scene_id,
+            stats.end_reason,
+            stats.rounds_run,
+            stats.max_rounds,
+            stats.wasted_rounds,
+        )
+
     async def run_scene(self, scene_skeleton: Dict[str, object], config) -> str:
         rounds: list[SimulationRoundResult] = []
         agents = (
@@ -118,107 +333,189 @@ class SimulationEngine:
                 )
             scene_skeleton["next_anchor"] = next_anchor
 
-        for idx in range(max_rounds):
-            round_number = idx + 1
-            round_config = SimpleNamespace(round_id=f"{round_id_base}-{round_number}")
-            result = await self.run_round(scene_skeleton, agents, round_config)
-            if result.info_gain < 0.1:
-                stagnation_count += 1
-            else:
-                stagnation_count = 0
-            result.stagnation_count = stagnation_count
-            rounds.append(result)
-
-            pacing = await self.world_master.monitor_pacing(rounds)
-            if pacing.type == "inject_incident":
-                await self.inject_breaking_incident(scene_skeleton)
-            elif pacing.type == "force_escalation":
-                await self.force_conflict_escalation(scene_skeleton)
-
-            if world_state is not None and next_anchor is not None:
-                check = await self.world_master.check_convergence(world_state, next_anchor)
-                result.convergence_score = max(0.0, 1.0 - check.distance)
-                action = await self.world_master.generate_convergence_action(
-                    check, world_state
-                )
-                if check.distance > 0.9 or action.get("type") == "replan_route":
-                    if not scene_id:
-                        raise ValueError("scene_id is required for replan_route")
-                    replan_result = await self.world_master.replan_route(
-                        scene_id,
-                        next_anchor,
-                        world_state,
-                    )
-                    if not replan_result.success:
-                        raise ValueError(replan_result.reason)
-                    result.narrative_events.append(
-                        {"event": "replan_route", "reason": replan_result.reason}
-                    )
-                    if replan_result.modified_anchor:
-                        next_anchor = normalize_anchor(replan_result.modified_anchor)
-                        scene_skeleton["next_anchor"] = next_anchor
-                else:
-                    result.narrative_events.append(
-                        {"event": "convergence_action", "action": action}
-                    )
-
-                required_conditions = next_anchor["required_conditions"]
-                missing_conditions = [
-                    condition
-                    for condition in required_conditions
-                    if not world_state.get(condition)
-                ]
-                if not missing_conditions:
+        log_writer = (
+            SimulationLogWriter(
+                self.storage,
+                scene_id=scene_id,
+                scene_version_id=scene_version_id,
+                flush_every=self.log_flush_rounds,
+            )
+            if scene_id and scene_version_id
+            else None
+        )
+        stats = SceneRunStats(scene_id=scene_id, max_rounds=max_rounds)
+        round_metrics = RoundMetrics(window=3)
+        prefetcher = self._open_prefetcher()
+        try:
+            for idx in range(max_rounds):
+                # 锚点条件在推演前已满足：直接达成并转向下一个锚点，不花费角色决策调用；
+                # 没有后续锚点时结束场景。
+                anchors_exhausted = False
+                while (
+                    self.early_termination
+                    and world_state is not None
+                    and next_anchor is not None
+                    and _anchor_conditions_met(world_state, next_anchor)
+                ):
                     if not scene_version_id:
-                        raise ValueError(
-                            "scene_version_id is required to mark anchor achieved"
-                        )
+                        raise ValueError("scene_version_id is required to mark anchor achieved")
                     marked = self.storage.mark_anchor_achieved(
                         anchor_id=next_anchor["id"],
                         scene_version_id=scene_version_id,
                     )
-                    result.narrative_events.append(
-                        {"event": "anchor_achieved", "anchor_id": marked["id"]}
-                    )
                     root_id = marked.get("root_id") or scene_skeleton.get("root_id")
                     branch_id = marked.get("branch_id") or scene_skeleton.get("branch_id")
                     if not root_id or not branch_id:
-                        raise ValueError(
-                            "root_id and branch_id are required for next anchor"
-                        )
-                    next_anchor = normalize_anchor(
-                        self.storage.get_next_unachieved_anchor(
-                            root_id=root_id, branch_id=branch_id
-                        )
+                        raise ValueError("root_id and branch_id are required for next anchor")
+                    following = self._find_next_unachieved_anchor(
+                        root_id=root_id, branch_id=branch_id
                     )
+                    if following is None:
+                        anchors_exhausted = True
+                        break
+                    next_anchor = normalize_anchor(following)
                     scene_skeleton["next_anchor"] = next_anchor
-
-            if scene_id and scene_version_id:
-                log = SimulationLog(
-                    id=f"sim:{scene_id}:round:{round_number}",
-                    scene_version_id=scene_version_id,
-                    round_number=round_number,
-                    agent_actions=json.dumps(
-                        [action.model_dump() for action in result.agent_actions]
-                    ),
-                    dm_arbitration=json.dumps(result.dm_arbitration.model_dump()),
-                    narrative_events=json.dumps(result.narrative_events),
-                    sensory_seeds=json.dumps(result.sensory_seeds),
-                    convergence_score=result.convergence_score,
-                    drama_score=result.drama_score,
-                    info_gain=result.info_gain,
-                    stagnation_count=result.stagnation_count,
+                if anchors_exhausted:
+                    stats.end_reason = "anchor_satisfied"
+                    break
+                round_number = idx + 1
+                round_config = SimpleNamespace(
+                    round_id=f"{round_id_base}-{round_number}",
+                    speculate_next=prefetcher is not None and round_number < max_rounds,
+                    prefetcher=prefetcher,
+                    round_metrics=round_metrics,
+                )
+                result = await self.run_round(scene_skeleton, agents, round_config)
+                stats.rounds_run = round_number
+                if result.info_gain < 0.1:
+                    stagnation_count += 1
+                    stats.wasted_rounds += 1
+                else:
+                    stagnation_count = 0
+                result.stagnation_count = stagnation_count
+                rounds.append(result)
+                round_metrics.record_round(
+                    result, conflict_escalation=scene_skeleton.get("conflict_escalation")
                 )
-                self.storage.create_simulation_log(log)
 
-            if self.should_end_scene(result):
-                break
+                pacing = await self.world_master.monitor_pacing(rounds, metrics=round_metrics)
+                if pacing.type == "inject_incident":
+                    await self.inject_breaking_incident(scene_skeleton)
+                elif pacing.type == "force_escalation":
+                    await self.force_conflict_escalation(scene_skeleton)
+
+                if self.feedback_detector is not None:
+                    # 反馈检测读取同一份滚动窗口，重复判定看窗口均值而不是单轮。
+                    report = await self.feedback_detector.detect_feedback(
+                        rounds, metrics=round_metrics
+                    )
+                    if report is not None:
+                        result.narrative_events.append(
+                            {
+                                "event": "feedback",
+                                "trigger": report.trigger,
+                                "actions": [item.action for item in report.corrections],
+                            }
+                        )
 
+                if world_state is not None and next_anchor is not None:
+                    check = await self.world_master.check_convergence(world_state, next_anchor)
+                    result.convergence_score = max(0.0, 1.0 - check.distance)
+                    action = await self.world_master.generate_convergence_action(
+                        check, world_state
+                    )
+                    if check.distance > 0.9 or action.get("type") == "replan_route":
+                        if not scene_id:
+                            raise ValueError("scene_id is required for replan_route")
+                        replan_result = await self.world_master.replan_route(
+                            scene_id,
+                            next_anchor,
+                            world_state,
+                        )
+                        if not replan_result.success:
+                            raise ValueError(replan_result.reason)
+                        result.narrative_events.append(
+                            {"event": "replan_route", "reason": replan_result.reason}
+                        )
+                        if replan_result.modified_anchor:
+                            next_anchor = normalize_anchor(replan_result.modified_anchor)
+                            scene_skeleton["next_anchor"] = next_anchor
+                    else:
+                        result.narrative_events.append(
+                            {"event": "convergence_action", "action": action}
+                        )
+
+                    if _anchor_conditions_met(world_state, next_anchor):
+                        if not scene_version_id:
+                            raise ValueError(
+                                "scene_version_id is required to mark anchor achieved"
+                            )
+                        marked = self.storage.mark_anchor_achieved(
+                            anchor_id=next_anchor["id"],
+                            scene_version_id=scene_version_id,
+                        )
+                        result.narrative_events.append(
+                            {"event": "anchor_achieved", "anchor_id": marked["id"]}
+                        )
+                        root_id = marked.get("root_id") or scene_skeleton.get("root_id")
+                        branch_id = marked.get("branch_id") or scene_skeleton.get("branch_id")
+                        if not root_id or not branch_id:
+                            raise ValueError(
+                                "root_id and branch_id are required for next anchor"
+                            )
+                        next_anchor = normalize_anchor(
+                            self.storage.get_next_unachieved_anchor(
+                                root_id=root_id, branch_id=branch_id
+                            )
+                        )
+                        scene_skeleton["next_anchor"] = next_anchor
+
+                if log_writer is not None:
+                    log_writer.add(round_number, result)
+
+                if self.should_end_scene(result):
+                    stats.end_reason = (
+                        "converged" if result.convergence_score >= 0.9 else "stagnated"
+                    )
+                    break
+        except BaseException:
+            stats.end_reason = "error"
+            self._finish_scene_stats(stats, prefetcher)
+            if log_writer is not None:
+                # 已完成的轮次照常落库，但不掩盖原始异常。
+                with contextlib.suppress(Exception):
+                    await log_writer.flush()
+            raise
+        self._finish_scene_stats(stats, prefetcher)
+        if log_writer is not None:
+            await log_writer.flush()
+
+        if not rounds:
+            return ""
         return await self.smart_render(rounds, scene_skeleton)
 
+    def _find_next_unachieved_anchor(
+        self, *, root_id: str, branch_id: str
+    ) -> Dict[str, object] | None:
+        """下一个未达成锚点；root/branch 缺失照常抛 KeyError，只有锚点已全部达成时返回 None。"""
+        self.storage.require_root(root_id=root_id, branch_id=branch_id)
+        try:
+            return self.storage.get_next_unachieved_anchor(root_id=root_id, branch_id=branch_id)
+        except KeyError:
+            return None
+
     async def calculate_info_gain(
-        self, prev_state: Dict[str, object], curr_state: object
+        self,
+        prev_state: Dict[str, object],
+        curr_state: object,
+        *,
+        metrics: RoundMetrics | None = None,
     ) -> float:
+        """新增 facts/relations/secrets 占比 + 冲突升级幅度。
+
+        传入 metrics 时与场景内累计的已知集合比较（首次调用以 prev_state 初始化），
+        已在前几轮出现过的信息不再计为新增。
+        """
         def _get_value(state: object, key: str, default: object) -> object:
             if isinstance(state, dict):
                 return state.get(key, default)
@@ -233,16 +530,22 @@ class SimulationEngine:
                 return list(value)
             return [value]
 
-        prev_facts = set(_as_list(_get_value(prev_state, "facts", [])))
-        curr_facts = set(_as_list(_get_value(curr_state, "facts", [])))
-        prev_relations = set(_as_list(_get_value(prev_state, "relations", [])))
-        curr_relations = set(_as_list(_get_value(curr_state, "relations", [])))
-        prev_secrets = set(_as_list(_get_value(prev_state, "secrets", [])))
-        curr_secrets = set(_as_list(_get_value(curr_state, "secrets", [])))
-
-        new_info = len(curr_facts - prev_facts)
-        new_info += len(curr_relations - prev_relations)
-        new_info += len(curr_secrets - prev_secrets)
+        if metrics is not None:
+            if not metrics.seeded:
+                metrics.seed(prev_state)
+            new_info, total_items = metrics.absorb(curr_state)
+        else:
+            prev_facts = set(_as_list(_get_value(prev_state, "facts", [])))
+            curr_facts = set(_as_list(_get_value(curr_state, "facts", [])))
+            prev_relations = set(_as_list(_get_value(prev_state, "relations", [])))
+            curr_relations = set(_as_list(_get_value(curr_state, "relations", [])))
+            prev_secrets = set(_as_list(_get_value(prev_state, "secrets", [])))
+            curr_secrets = set(_as_list(_get_value(curr_state, "secrets", [])))
+
+            new_info = len(curr_facts - prev_facts)
+            new_info += len(curr_relations - prev_relations)
+            new_info += len(curr_secrets - prev_secrets)
+            total_items = len(curr_facts) + len(curr_relations) + len(curr_secrets)
 
         prev_conflict = float(_get_value(prev_state, "conflict_escalation", 0.0) or 0.0)
         curr_conflict = float(_get_value(curr_state, "conflict_escalation", 0.0) or 0.0)
@@ -251,7 +554,7 @@ class SimulationEngine:
         if new_info == 0 and conflict_delta <= 0.0:
             return 0.0
 
-        total_info = max(len(curr_facts) + len(curr_relations) + len(curr_secrets), 1)
+        total_info = max(total_items, 1)
         info_ratio = new_info / total_info
         score = info_ratio + min(conflict_delta, 1.0)
         return min(score, 1.0)
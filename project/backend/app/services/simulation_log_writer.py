@@ -0,0 +1,112 @@
+"""SimulationLog 批量写入：推演轮次只入缓冲，序列化与图写入在线程中按批完成。"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, List
+
+from app.models import SimulationRoundResult
+from app.storage.schema import SimulationLog
+
+
+def build_simulation_log(
+    *,
+    scene_id: str,
+    scene_version_id: str,
+    round_number: int,
+    result: SimulationRoundResult,
+) -> SimulationLog:
+    return SimulationLog(
+        id=f"sim:{scene_id}:round:{round_number}",
+        scene_id=scene_id,
+        scene_version_id=scene_version_id,
+        round_number=round_number,
+        agent_actions=json.dumps([action.model_dump() for action in result.agent_actions]),
+        dm_arbitration=json.dumps(result.dm_arbitration.model_dump()),
+        narrative_events=json.dumps(result.narrative_events),
+        sensory_seeds=json.dumps(result.sensory_seeds),
+        convergence_score=result.convergence_score,
+        drama_score=result.drama_score,
+        info_gain=result.info_gain,
+        stagnation_count=result.stagnation_count,
+    )
+
+
+class SimulationLogWriter:
+    """缓冲单个场景的轮次结果，每 flush_every 轮在后台线程写一批，场景结束时 flush 剩余。
+
+    批次串行写入以保持轮次顺序；后台写入失败会在下一次 add/flush 时抛出。
+    只有提供 create_simulation_logs 的存储才放到线程中写（该方法须自取独立连接），
+    逐条 create_simulation_log 的旧存储仍在事件循环线程上写入。
+    入队的轮次结果在写入前不应再被修改（不做深拷贝以免在事件循环上序列化）。
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        *,
+        scene_id: str,
+        scene_version_id: str,
+        flush_every: int = 0,
+    ) -> None:
+        if flush_every < 0:
+            raise ValueError("flush_every must be >= 0")
+        self.storage = storage
+        self.scene_id = scene_id
+        self.scene_version_id = scene_version_id
+        self.flush_every = flush_every
+        self._pending: list[tuple[int, SimulationRoundResult]] = []
+        self._inflight: asyncio.Task[None] | None = None
+        self.written = 0
+
+    def add(self, round_number: int, result: SimulationRoundResult) -> None:
+        self._raise_background_error()
+        self._pending.append((round_number, result))
+        if self.flush_every and len(self._pending) >= self.flush_every:
+            self._schedule()
+
+    async def flush(self) -> None:
+        self._schedule()
+        if self._inflight is not None:
+            inflight, self._inflight = self._inflight, None
+            await inflight
+
+    def _raise_background_error(self) -> None:
+        if self._inflight is not None and self._inflight.done():
+            inflight, self._inflight = self._inflight, None
+            inflight.result()
+
+    def _schedule(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        previous = self._inflight
+        self._inflight = asyncio.ensure_future(self._write_after(previous, batch))
+
+    async def _write_after(
+        self,
+        previous: asyncio.Task[None] | None,
+        batch: list[tuple[int, SimulationRoundResult]],
+    ) -> None:
+        if previous is not None:
+            await previous
+        if hasattr(self.storage, "create_simulation_logs"):
+            await asyncio.to_thread(
+                lambda: self.storage.create_simulation_logs(self._build_logs(batch))
+            )
+        else:
+            for log in self._build_logs(batch):
+                self.storage.create_simulation_log(log)
+        self.written += len(batch)
+
+    def _build_logs(self, batch: list[tuple[int, SimulationRoundResult]]) -> List[SimulationLog]:
+        return [
+            build_simulation_log(
+                scene_id=self.scene_id,
+                scene_version_id=self.scene_version_id,
+                round_number=round_number,
+                result=result,
+            )
+            for round_number, result in batch
+        ]
@@ -0,0 +1,224 @@
+"""多场景推演调度：独立场景并发 run_scene，依赖场景按序执行并沿用前序场景的 world_state。"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Sequence
+from uuid import uuid4
+
+from app.services.upstream_limiter import LLMPriority, llm_priority
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_SCENE_STATUSES = frozenset({"completed", "failed", "skipped"})
+
+
+@dataclass
+class SceneTask:
+    """批次内的单个场景；depends_on 列出必须先完成的场景 key。"""
+
+    key: str
+    scene_context: Dict[str, Any]
+    max_rounds: int
+    depends_on: List[str] = field(default_factory=list)
+    status: str = "pending"
+    content: str | None = None
+    error: str | None = None
+
+
+class SimulationJob:
+    """一次批量推演的进度：状态快照供轮询，事件序列供 SSE 订阅。"""
+
+    def __init__(self, job_id: str, scenes: Sequence[SceneTask]) -> None:
+        self.job_id = job_id
+        self.scenes: "OrderedDict[str, SceneTask]" = OrderedDict(
+            (scene.key, scene) for scene in scenes
+        )
+        self.status = "pending"
+        self.events: list[dict[str, Any]] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"completed", "failed"}
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        self.events.append({"event": event, "data": {"job_id": self.job_id, **data}})
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def snapshot(self) -> dict[str, Any]:
+        counts = {"total": len(self.scenes)}
+        for scene in self.scenes.values():
+            counts[scene.status] = counts.get(scene.status, 0) + 1
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": counts,
+            "scenes": [
+                {
+                    "key": scene.key,
+                    "status": scene.status,
+                    "depends_on": list(scene.depends_on),
+                    "content": scene.content,
+                    "error": scene.error,
+                }
+                for scene in self.scenes.values()
+            ],
+        }
+
+    async def stream(self) -> AsyncIterator[dict[str, Any]]:
+        """从第一条事件开始回放，随后跟随新事件，任务结束后停止。"""
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                return
+            await changed.wait()
+
+
+def _build_scene_tasks(scenes: Sequence[Any]) -> list[SceneTask]:
+    tasks: list[SceneTask] = []
+    for index, scene in enumerate(scenes):
+        context = dict(scene.scene_context)
+        key = scene.key or context.get("scene_id") or context.get("id") or f"scene-{index + 1}"
+        tasks.append(
+            SceneTask(
+                key=str(key),
+                scene_context=context,
+                max_rounds=scene.max_rounds,
+                depends_on=list(dict.fromkeys(scene.depends_on)),
+            )
+        )
+    keys = [task.key for task in tasks]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate scene keys: {duplicates}")
+    known = set(keys)
+    for task in tasks:
+        unknown = [dep for dep in task.depends_on if dep not in known]
+        if unknown:
+            raise ValueError(f"scene {task.key} depends on unknown scenes: {unknown}")
+        if task.key in task.depends_on:
+            raise ValueError(f"scene {task.key} depends on itself")
+    _check_acyclic(tasks)
+    return tasks
+
+
+def _check_acyclic(tasks: Sequence[SceneTask]) -> None:
+    remaining = {task.key: set(task.depends_on) for task in tasks}
+    while remaining:
+        ready = [key for key, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"scene dependency cycle: {sorted(remaining)}")
+        for key in ready:
+            del remaining[key]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+class SimulationScheduler:
+    """在进程内调度批量推演任务。
+
+    max_concurrent_scenes 限制所有任务合计同时运行的场景数；场景内的 LLM 调用以后台优先级
+    进入上游限流器，共享全局并发/速率预算而不抢占交互请求。已结束的任务只保留最近
+    max_jobs 个。
+    """
+
+    def __init__(self, *, max_concurrent_scenes: int = 4, max_jobs: int = 100) -> None:
+        if max_concurrent_scenes <= 0:
+            raise ValueError("max_concurrent_scenes must be > 0")
+        if max_jobs <= 0:
+            raise ValueError("max_jobs must be > 0")
+        self.max_concurrent_scenes = max_concurrent_scenes
+        self.max_jobs = max_jobs
+        self._scene_slots = asyncio.Semaphore(max_concurrent_scenes)
+        self._jobs: "OrderedDict[str, SimulationJob]" = OrderedDict()
+        self._runners: dict[str, asyncio.Task[None]] = {}
+
+    def submit(self, engine: Any, scenes: Sequence[Any]) -> SimulationJob:
+        if not scenes:
+            raise ValueError("scenes must not be empty")
+        job = SimulationJob(f"simjob-{uuid4().hex}", _build_scene_tasks(scenes))
+        self._jobs[job.job_id] = job
+        self._evict()
+        runner = asyncio.create_task(self._run(engine, job))
+        self._runners[job.job_id] = runner
+        runner.add_done_callback(lambda _: self._runners.pop(job.job_id, None))
+        return job
+
+    def get(self, job_id: str) -> SimulationJob | None:
+        return self._jobs.get(job_id)
+
+    def _evict(self) -> None:
+        overflow = len(self._jobs) - self.max_jobs
+        if overflow <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:overflow]:
+            del self._jobs[job_id]
+
+    async def _run(self, engine: Any, job: SimulationJob) -> None:
+        finished = {key: asyncio.Event() for key in job.scenes}
+        job.status = "running"
+        job.publish("job_started", {"total": len(job.scenes)})
+
+        async def run_one(scene: SceneTask) -> None:
+            try:
+                for dep in scene.depends_on:
+                    await finished[dep].wait()
+                blocked = [
+                    dep for dep in scene.depends_on if job.scenes[dep].status != "completed"
+                ]
+                if blocked:
+                    scene.status = "skipped"
+                    scene.error = f"dependency not completed: {blocked}"
+                    job.publish("scene_skipped", {"key": scene.key, "error": scene.error})
+                    return
+                self._inherit_world_state(job, scene)
+                async with self._scene_slots:
+                    scene.status = "running"
+                    job.publish("scene_started", {"key": scene.key})
+                    try:
+                        with llm_priority(LLMPriority.BACKGROUND):
+                            scene.content = await engine.run_scene(
+                                scene.scene_context,
+                                SimpleNamespace(max_rounds=scene.max_rounds, round_id=scene.key),
+                            )
+                    except Exception as exc:  # noqa: BLE001 - 单个场景失败不影响其他分支
+                        logger.warning("scene %s simulation failed: %s", scene.key, exc)
+                        scene.status = "failed"
+                        scene.error = str(exc) or exc.__class__.__name__
+                        job.publish("scene_failed", {"key": scene.key, "error": scene.error})
+                        return
+                scene.status = "completed"
+                job.publish("scene_completed", {"key": scene.key, "content": scene.content})
+            finally:
+                finished[scene.key].set()
+
+        await asyncio.gather(*(run_one(scene) for scene in job.scenes.values()))
+        failed = any(scene.status != "completed" for scene in job.scenes.values())
+        job.status = "failed" if failed else "completed"
+        job.publish("job_finished", job.snapshot())
+
+    @staticmethod
+    def _inherit_world_state(job: SimulationJob, scene: SceneTask) -> None:
+        """未显式给出 world_state 的场景沿用最后一个带 world_state 的依赖场景的输入状态。
+
+        run_scene 不回写 world_state，因此这里拷贝的是前序场景推演时使用的状态，
+        而不是推演结束后的状态。
+        """
+        if scene.scene_context.get("world_state") is not None:
+            return
+        for dep in reversed(scene.depends_on):
+            world_state = job.scenes[dep].scene_context.get("world_state")
+            if world_state is not None:
+                scene.scene_context["world_state"] = copy.deepcopy(world_state)
+                return
@@ -1,7 +1,10 @@
 """TopOne Gemini 接口封装，支持真实大模型调用."""
 from __future__ import annotations
 
-from typing import Any, Iterable, Mapping, Sequence
+import importlib.util
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable, Mapping, Sequence
 
 import httpx
 
@@ -9,10 +12,68 @@ from app.config import (
     TOPONE_API_KEY,
     TOPONE_BASE_URL,
     TOPONE_DEFAULT_MODEL,
+    TOPONE_HTTP2,
+    TOPONE_INITIAL_CONCURRENCY,
+    TOPONE_KEEPALIVE_EXPIRY_SECONDS,
+    TOPONE_MAX_CONCURRENCY,
+    TOPONE_MAX_CONNECTIONS,
+    TOPONE_MAX_KEEPALIVE_CONNECTIONS,
     TOPONE_MIN_TIMEOUT_SECONDS,
+    TOPONE_REQUESTS_PER_MINUTE,
     TOPONE_SECONDARY_MODEL,
     TOPONE_TIMEOUT_SECONDS,
+    TOPONE_TOKENS_PER_MINUTE,
 )
+from app.services.upstream_limiter import LLMPriority, UpstreamLimiter, current_llm_priority
+
+
+def _http2_supported() -> bool:
+    """httpx 的 HTTP/2 依赖 h2 可选包，缺失时退回 HTTP/1.1."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _default_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=TOPONE_MAX_CONNECTIONS,
+        max_keepalive_connections=TOPONE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=TOPONE_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _default_limiter() -> UpstreamLimiter:
+    return UpstreamLimiter(
+        requests_per_minute=TOPONE_REQUESTS_PER_MINUTE,
+        tokens_per_minute=TOPONE_TOKENS_PER_MINUTE,
+        initial_concurrency=TOPONE_INITIAL_CONCURRENCY,
+        max_concurrency=TOPONE_MAX_CONCURRENCY,
+    )
+
+
+def _estimate_tokens(payload: Mapping[str, Any]) -> int:
+    """粗估请求 token 数（约 4 字节/token），响应后按 usageMetadata 回补."""
+    size = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    return max(1, size // 4)
+
+
+def _is_overload_error(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class _Admission:
+    __slots__ = ("estimated_tokens", "actual_tokens")
+
+    def __init__(self, estimated_tokens: int) -> None:
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: int | None = None
+
+    def record_usage(self, data: Mapping[str, Any]) -> None:
+        usage = data.get("usageMetadata") or {}
+        total = usage.get("totalTokenCount")
+        if isinstance(total, int):
+            self.actual_tokens = total
 
 
 class ToponeClient:
@@ -26,6 +87,9 @@ class ToponeClient:
         secondary_model: str | None = None,
         timeout_seconds: float | None = None,
         allowed_models: Sequence[str] | None = None,
+        limits: httpx.Limits | None = None,
+        http2: bool | None = None,
+        limiter: UpstreamLimiter | None = None,
     ) -> None:
         self.api_key = TOPONE_API_KEY if api_key is None else api_key
         self.base_url = base_url or TOPONE_BASE_URL
@@ -34,6 +98,40 @@ class ToponeClient:
         resolved_timeout = TOPONE_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
         self.timeout_seconds = self._validate_timeout(resolved_timeout)
         self.allowed_models = tuple(allowed_models or (self.default_model, self.secondary_model))
+        self.limits = limits or _default_limits()
+        requested_http2 = TOPONE_HTTP2 if http2 is None else http2
+        self.http2 = requested_http2 and _http2_supported()
+        self._http_client: httpx.AsyncClient | None = None
+        self.limiter = limiter or _default_limiter()
+
+    @property
+    def is_open(self) -> bool:
+        return self._http_client is not None and not self._http_client.is_closed
+
+    def open(self) -> httpx.AsyncClient:
+        """惰性创建长连接池客户端，整个 ToponeClient 生命周期内复用."""
+        if not self.is_open:
+            self._http_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """关闭连接池；之后再次调用会重新建池."""
+        client = self._http_client
+        self._http_client = None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    async def __aenter__(self) -> "ToponeClient":
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
 
     @staticmethod
     def _strip_thoughts(payload: dict[str, Any]) -> dict[str, Any]:
@@ -79,6 +177,7 @@ class ToponeClient:
         messages: Iterable[Mapping[str, str]],
         system_instruction: str | None,
         generation_config: Mapping[str, Any] | None,
+        cached_content: str | None = None,
     ) -> dict[str, Any]:
         contents = [
             {"role": msg["role"], "parts": self._to_parts(msg["text"])}
@@ -89,6 +188,10 @@ class ToponeClient:
             payload["systemInstruction"] = {"parts": self._to_parts(system_instruction)}
         if generation_config:
             payload["generationConfig"] = generation_config
+        if cached_content:
+            if system_instruction:
+                raise ValueError("system_instruction must live in cached_content when it is used")
+            payload["cachedContent"] = cached_content
         return payload
 
     async def generate_content(
@@ -100,10 +203,78 @@ class ToponeClient:
         model: str | None = None,
         timeout: float | None = None,
         transport: httpx.BaseTransport | None = None,
+        priority: LLMPriority | None = None,
+        cached_content: str | None = None,
     ) -> dict[str, Any]:
         """调用 TopOne generateContent 接口并返回 JSON 响应."""
         model_name = self._validate_model(model or self.default_model)
         api_key = self._ensure_key()
+        payload = self._build_payload(
+            messages=messages,
+            system_instruction=system_instruction,
+            generation_config=generation_config,
+            cached_content=cached_content,
+        )
+        request_timeout = self._resolve_timeout(timeout)
+
+        async with self._admit(model_name, payload, priority) as admission:
+            async with self._client_for(transport, request_timeout) as client:
+                response = await client.post(
+                    f"/v1beta/models/{model_name}:generateContent",
+                    params={"key": api_key},
+                    json=payload,
+                    timeout=request_timeout,
+                )
+            response.raise_for_status()
+            data = response.json()
+            admission.record_usage(data)
+        return self._strip_thoughts(data)
+
+    async def create_cached_content(
+        self,
+        *,
+        model: str,
+        system_instruction: str | None,
+        text: str,
+        ttl_seconds: float,
+        transport: httpx.BaseTransport | None = None,
+    ) -> dict[str, Any]:
+        """创建 cachedContents（静态前缀），返回含 name/expireTime 的 JSON."""
+        model_name = self._validate_model(model)
+        api_key = self._ensure_key()
+        payload: dict[str, Any] = {
+            "model": f"models/{model_name}",
+            "contents": [{"role": "user", "parts": self._to_parts(text)}],
+            "ttl": f"{int(ttl_seconds)}s",
+        }
+        if system_instruction:
+            payload["systemInstruction"] = {"parts": self._to_parts(system_instruction)}
+
+        async with self._admit(model_name, payload, None):
+            async with self._client_for(transport, self.timeout_seconds) as client:
+                response = await client.post(
+                    "/v1beta/cachedContents",
+                    params={"key": api_key},
+                    json=payload,
+                    timeout=self.timeout_seconds,
+                )
+            response.raise_for_status()
+            return response.json()
+
+    async def stream_generate_content(
+        self,
+        *,
+        messages: Iterable[Mapping[str, str]],
+        system_instruction: str | None = None,
+        generation_config: Mapping[str, Any] | None = None,
+        model: str | None = None,
+        timeout: float | None = None,
+        transport: httpx.BaseTransport | None = None,
+        priority: LLMPriority | None = None,
+    ) -> AsyncIterator[str]:
+        """调用 streamGenerateContent（SSE），逐块产出去除 thought 后的文本增量."""
+        model_name = self._validate_model(model or self.default_model)
+        api_key = self._ensure_key()
         payload = self._build_payload(
             messages=messages,
             system_instruction=system_instruction,
@@ -111,16 +282,79 @@ class ToponeClient:
         )
         request_timeout = self._resolve_timeout(timeout)
 
+        async with self._admit(model_name, payload, priority) as admission:
+            async with self._client_for(transport, request_timeout) as client:
+                async with client.stream(
+                    "POST",
+                    f"/v1beta/models/{model_name}:streamGenerateContent",
+                    params={"alt": "sse", "key": api_key},
+                    json=payload,
+                    timeout=request_timeout,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        chunk = self._parse_sse_chunk(line)
+                        if chunk is None:
+                            continue
+                        admission.record_usage(chunk)
+                        text = self._chunk_text(chunk)
+                        if text:
+                            yield text
+
+    @classmethod
+    def _parse_sse_chunk(cls, line: str) -> dict[str, Any] | None:
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return None
+        return cls._strip_thoughts(json.loads(data))
+
+    @staticmethod
+    def _chunk_text(chunk: Mapping[str, Any]) -> str:
+        return "".join(
+            part.get("text", "")
+            for candidate in chunk.get("candidates", [])[:1]
+            for part in (candidate.get("content") or {}).get("parts", [])
+        )
+
+    @asynccontextmanager
+    async def _admit(
+        self,
+        model: str,
+        payload: Mapping[str, Any],
+        priority: LLMPriority | None,
+    ) -> AsyncIterator[_Admission]:
+        """经按模型的限流器放行；429/5xx/传输错误收缩并发窗口，成功则线性扩张."""
+        limiter = self.limiter.for_model(model)
+        admission = _Admission(_estimate_tokens(payload))
+        await limiter.acquire(
+            priority=current_llm_priority() if priority is None else priority,
+            tokens=admission.estimated_tokens,
+        )
+        overloaded = False
+        try:
+            yield admission
+        except BaseException as exc:
+            overloaded = _is_overload_error(exc)
+            raise
+        finally:
+            adjustment = 0
+            if admission.actual_tokens is not None:
+                adjustment = admission.actual_tokens - admission.estimated_tokens
+            limiter.release(overloaded=overloaded, token_adjustment=adjustment)
+
+    @asynccontextmanager
+    async def _client_for(
+        self, transport: httpx.BaseTransport | None, timeout: float
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        if transport is None:
+            yield self.open()
+            return
+        # 显式 transport（测试/自定义链路）走一次性客户端，不污染共享连接池。
         async with httpx.AsyncClient(
             base_url=self.base_url,
-            timeout=request_timeout,
+            timeout=timeout,
             transport=transport,
         ) as client:
-            response = await client.post(
-                f"/v1beta/models/{model_name}:generateContent",
-                params={"key": api_key},
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return self._strip_thoughts(data)
+            yield client
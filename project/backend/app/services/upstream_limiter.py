@@ -0,0 +1,278 @@
+"""TopOne 上游限流：按模型的令牌桶（请求/分钟、token/分钟）+ AIMD 并发窗口 + 优先级队列."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Iterator
+
+
+class LLMPriority(IntEnum):
+    """数值越小越先出队：交互请求抢占后台批处理."""
+
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+_CURRENT_PRIORITY: ContextVar[LLMPriority] = ContextVar(
+    "llm_priority", default=LLMPriority.DEFAULT
+)
+
+
+def current_llm_priority() -> LLMPriority:
+    return _CURRENT_PRIORITY.get()
+
+
+@contextmanager
+def llm_priority(priority: LLMPriority) -> Iterator[None]:
+    """在当前上下文内为所有上游调用设置优先级."""
+    token = _CURRENT_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _CURRENT_PRIORITY.reset(token)
+
+
+class TokenBucket:
+    """容量 capacity、每秒补充 refill_per_second；允许透支以便按实际用量回补."""
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if capacity <= 0 or refill_per_second <= 0:
+            raise ValueError("token bucket capacity and refill rate must be > 0")
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self._level = float(capacity)
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if elapsed > 0:
+            self._level = min(self.capacity, self._level + elapsed * self.refill_per_second)
+
+    @property
+    def level(self) -> float:
+        self._refill()
+        return self._level
+
+    def delay_for(self, amount: float) -> float:
+        """距离可扣减 amount 还需等待的秒数（amount 超过容量时按容量计）."""
+        self._refill()
+        needed = min(float(amount), self.capacity)
+        if self._level >= needed:
+            return 0.0
+        return (needed - self._level) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self._level -= float(amount)
+
+
+class AIMDWindow:
+    """加性增、乘性减的并发窗口：成功 +increase/limit，过载乘以 decrease_factor."""
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        minimum: int = 1,
+        maximum: int,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("AIMD window requires 1 <= minimum <= initial <= maximum")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be in (0, 1)")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self._value = float(initial)
+
+    @property
+    def limit(self) -> int:
+        return int(self._value)
+
+    def on_success(self) -> None:
+        self._value = min(float(self.maximum), self._value + self.increase / max(self._value, 1.0))
+
+    def on_overload(self) -> None:
+        self._value = max(float(self.minimum), self._value * self.decrease_factor)
+
+
+@dataclass
+class QueueWaitStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        average = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "avg_seconds": average,
+            "max_seconds": self.max_seconds,
+        }
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    event: asyncio.Event = field(compare=False, default_factory=asyncio.Event)
+
+
+class ModelLimiter:
+    """单模型限流器：按 (priority, 到达顺序) 出队，窗口与令牌桶同时满足才放行."""
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        initial_concurrency: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock=clock)
+        self.window = AIMDWindow(
+            initial=initial_concurrency, minimum=min_concurrency, maximum=max_concurrency
+        )
+        self.in_flight = 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._wait_stats = {priority: QueueWaitStats() for priority in LLMPriority}
+        self._overloads = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, *, priority: LLMPriority, tokens: int) -> float:
+        """排队直至放行，返回排队等待秒数."""
+        started = self._clock()
+        waiter = _Waiter(int(priority), next(self._seq))
+        heapq.heappush(self._queue, waiter)
+        try:
+            while True:
+                delay = self._admission_delay(waiter, tokens)
+                if delay == 0.0:
+                    break
+                waiter.event.clear()
+                if delay is None:
+                    await waiter.event.wait()
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._remove(waiter)
+            raise
+        heapq.heappop(self._queue)
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.in_flight += 1
+        waited = self._clock() - started
+        self._wait_stats[LLMPriority(priority)].record(waited)
+        self._wake_head()
+        return waited
+
+    def release(self, *, overloaded: bool, token_adjustment: int = 0) -> None:
+        """归还并发名额；overloaded 触发窗口乘性收缩，token_adjustment 按实际用量回补."""
+        self.in_flight -= 1
+        if overloaded:
+            self._overloads += 1
+            self.window.on_overload()
+        else:
+            self.window.on_success()
+        if token_adjustment:
+            self.tokens.consume(token_adjustment)
+        self._wake_head()
+
+    def _admission_delay(self, waiter: _Waiter, tokens: int) -> float | None:
+        if self._queue[0] is not waiter or self.in_flight >= self.window.limit:
+            return None
+        return max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+
+    def _remove(self, waiter: _Waiter) -> None:
+        try:
+            self._queue.remove(waiter)
+        except ValueError:
+            return
+        heapq.heapify(self._queue)
+        self._wake_head()
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].event.set()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "concurrency_limit": self.window.limit,
+            "overloads": self._overloads,
+            "requests_available": self.requests.level,
+            "tokens_available": self.tokens.level,
+            "queue_wait": {
+                priority.name.lower(): stats.snapshot()
+                for priority, stats in self._wait_stats.items()
+            },
+        }
+
+
+class UpstreamLimiter:
+    """按模型名惰性创建 ModelLimiter，共享同一组配置."""
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        initial_concurrency: int,
+        max_concurrency: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._config = {
+            "requests_per_minute": requests_per_minute,
+            "tokens_per_minute": tokens_per_minute,
+            "initial_concurrency": initial_concurrency,
+            "max_concurrency": max_concurrency,
+            "clock": clock,
+        }
+        self._models: dict[str, ModelLimiter] = {}
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            limiter = ModelLimiter(**self._config)
+            self._models[model] = limiter
+        return limiter
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {model: limiter.snapshot() for model, limiter in self._models.items()}
@@ -4,10 +4,43 @@ from __future__ import annotations
 
 import hashlib
 import json
+from bisect import bisect_right
 from types import SimpleNamespace
-from typing import Dict, Iterable, List, Sequence
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence
 
 from app.models import ActionResult, ConvergenceCheck, DMArbitration, ReplanResult
+from app.services.round_metrics import RoundMetrics
+from app.services.rule_engine import CompiledRuleSet, RuleSetError, compile_rule_set
+
+# 内置攻击判定，与声明式规则同一套求值器；在调用方规则之后执行。
+BUILTIN_ACTION_RULES = (
+    {
+        "id": "power_mismatch",
+        "action_type": "attack",
+        "require": [
+            {
+                "field": "world_state.power_levels.{action.agent_id}",
+                "op": "ge",
+                "ref": "world_state.power_levels.{action.action_target}",
+            }
+        ],
+        "outcome": "partial",
+        "reason": "power_mismatch",
+    },
+    {
+        "id": "position_disadvantage",
+        "action_type": "attack",
+        "require": [
+            {
+                "field": "world_state.position_advantage.{action.agent_id}",
+                "op": "is_not",
+                "value": False,
+            }
+        ],
+        "outcome": "partial",
+        "reason": "position_disadvantage",
+    },
+)
 
 _SENSORY_SEED_TYPES = (
     "weather",
@@ -43,6 +76,9 @@ _SENSORY_DETAIL_POOL = {
 }
 
 
+_BUILTIN_RULE_SET = compile_rule_set(BUILTIN_ACTION_RULES, strict=True)
+
+
 class WorldMasterEngine:
     """世界主宰（DM）引擎。"""
 
@@ -57,8 +93,10 @@ class WorldMasterEngine:
         rules: Sequence[object] | None,
     ) -> DMArbitration:
         conflicts = await self.detect_conflicts(actions)
+        # 规则每轮只准备一次，整轮行动单遍求值。
+        predicates, compiled = self._prepare_rules(rules)
         action_results = [
-            await self.check_action_validity(action, world_state, rules)
+            self._validate_action(action, world_state, predicates, compiled)
             for action in actions
         ]
         return DMArbitration(
@@ -70,6 +108,53 @@ class WorldMasterEngine:
 
     async def detect_conflicts(  # pragma: no cover
         self, actions: Sequence[object]
+    ) -> List[Dict[str, object]]:
+        """按 (action_type, action_target) 分组找同目标，按 (agent_id, action_target) 反查互攻。
+
+        输出顺序与逐对比较一致：按 (i, j) 升序，同一对先 mutual_attack 后 shared_target。
+        复杂度 O(n + 冲突数)。
+        """
+        fields = [
+            (
+                self._get_value(action, "agent_id"),
+                self._get_value(action, "action_type"),
+                self._get_value(action, "action_target"),
+            )
+            for action in actions
+        ]
+        try:
+            by_type_target: dict[tuple[object, object], list[int]] = {}
+            attacks_by_agent_target: dict[tuple[object, object], list[int]] = {}
+            for idx, (agent_id, action_type, target) in enumerate(fields):
+                by_type_target.setdefault((action_type, target), []).append(idx)
+                if action_type == "attack":
+                    attacks_by_agent_target.setdefault((agent_id, target), []).append(idx)
+        except TypeError:
+            # 字段不可哈希时退回逐对比较。
+            return self._detect_conflicts_pairwise(actions)
+
+        conflicts: list[dict[str, object]] = []
+        for idx, (agent_id, action_type, target) in enumerate(fields):
+            group = by_type_target[(action_type, target)]
+            shared = group[bisect_right(group, idx) :]
+            mutual: list[int] = []
+            if action_type == "attack":
+                partners = attacks_by_agent_target.get((target, agent_id), [])
+                mutual = partners[bisect_right(partners, idx) :]
+            if not shared and not mutual:
+                continue
+            mutual_set = set(mutual)
+            shared_set = set(shared)
+            for other in sorted(mutual_set | shared_set):
+                pair = [agent_id, fields[other][0]]
+                if other in mutual_set:
+                    conflicts.append({"type": "mutual_attack", "agents": pair})
+                if other in shared_set:
+                    conflicts.append({"type": "shared_target", "agents": list(pair)})
+        return conflicts
+
+    def _detect_conflicts_pairwise(  # pragma: no cover
+        self, actions: Sequence[object]
     ) -> List[Dict[str, object]]:
         conflicts: list[dict[str, object]] = []
         for idx, action in enumerate(actions):
@@ -102,46 +187,59 @@ class WorldMasterEngine:
         world_state: Dict[str, object],
         rules: Sequence[object] | None,
     ) -> ActionResult:
-        rules = rules or []
+        predicates, compiled = self._prepare_rules(rules)
+        return self._validate_action(action, world_state, predicates, compiled)
+
+    def _prepare_rules(  # pragma: no cover
+        self, rules: Sequence[object] | CompiledRuleSet | None
+    ) -> tuple[tuple[Callable[[object, Dict[str, object]], object], ...], CompiledRuleSet | None]:
+        """拆分调用方规则：可调用对象按原样执行，声明式规则（dict）编译为 CompiledRuleSet。"""
+        if isinstance(rules, CompiledRuleSet):
+            return (), rules
+        if not rules:
+            return (), None
+        predicates = []
+        declarative = []
         for rule in rules:
+            if callable(rule):
+                predicates.append(rule)
+            elif isinstance(rule, Mapping):
+                declarative.append(rule)
+            else:
+                raise RuleSetError("rule must be a callable or a rule object")
+        compiled = compile_rule_set(declarative) if declarative else None
+        return tuple(predicates), compiled
+
+    def _validate_action(  # pragma: no cover
+        self,
+        action: object,
+        world_state: Dict[str, object],
+        predicates: Sequence[Callable[[object, Dict[str, object]], object]],
+        compiled: CompiledRuleSet | None,
+    ) -> ActionResult:
+        for rule in predicates:
             if not rule(action, world_state):
-                return ActionResult(
-                    action_id=self._get_value(action, "action_id"),
-                    agent_id=self._get_value(action, "agent_id"),
-                    success="failure",
-                    reason="rule_violation",
-                    actual_outcome="",
-                )
+                return self._action_result(action, "failure", "rule_violation")
         if isinstance(action, dict):
             action_type = action.get("action_type")
         else:
             action_type = getattr(action, "action_type", None)
-        if action_type == "attack":
-            agent_id = self._get_value(action, "agent_id")
-            target_id = self._get_value(action, "action_target")
-            power_levels = world_state["power_levels"]
-            position_advantage = world_state["position_advantage"]
-            if power_levels[agent_id] < power_levels[target_id]:
-                return ActionResult(
-                    action_id=self._get_value(action, "action_id"),
-                    agent_id=agent_id,
-                    success="partial",
-                    reason="power_mismatch",
-                    actual_outcome="",
-                )
-            if position_advantage[agent_id] is False:
-                return ActionResult(
-                    action_id=self._get_value(action, "action_id"),
-                    agent_id=agent_id,
-                    success="partial",
-                    reason="position_disadvantage",
-                    actual_outcome="",
-                )
+        for rule_set in (compiled, _BUILTIN_RULE_SET):
+            if rule_set is None:
+                continue
+            violated = rule_set.first_violation(action, world_state, action_type)
+            if violated is not None:
+                return self._action_result(action, violated.outcome, violated.reason)
+        return self._action_result(action, "success", "ok")
+
+    def _action_result(  # pragma: no cover
+        self, action: object, success: str, reason: str
+    ) -> ActionResult:
         return ActionResult(
             action_id=self._get_value(action, "action_id"),
             agent_id=self._get_value(action, "agent_id"),
-            success="success",
-            reason="ok",
+            success=success,
+            reason=reason,
             actual_outcome="",
         )
 
@@ -206,13 +304,22 @@ class WorldMasterEngine:
         return seeds
 
     async def monitor_pacing(  # pragma: no cover
-        self, rounds: Sequence[object]
+        self, rounds: Sequence[object], *, metrics: RoundMetrics | None = None
     ) -> SimpleNamespace:
-        recent = list(rounds)[-3:]
-        avg_info_gain = sum(r.info_gain for r in recent) / len(recent)
+        """最近 3 轮平均信息增益过低则注入事件，冲突持续降温则强制升级。
+
+        传入 RoundMetrics 时直接读取滚动窗口，不再切片 rounds。
+        """
+        if metrics is not None and metrics.rounds:
+            avg_info_gain = metrics.mean_info_gain()
+            deescalating = metrics.is_deescalating()
+        else:
+            recent = rounds[-3:]
+            avg_info_gain = sum(r.info_gain for r in recent) / len(recent)
+            deescalating = self._is_deescalating(recent)
         if avg_info_gain < 0.2:
             return SimpleNamespace(type="inject_incident", reason="stagnation")
-        if self._is_deescalating(recent):
+        if deescalating:
             return SimpleNamespace(type="force_escalation", reason="deescalation")
         return SimpleNamespace(type="continue")
 
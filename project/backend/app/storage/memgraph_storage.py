@@ -8,7 +8,7 @@ import json
 import os
 import threading
 import time
-from typing import Any, Iterable, Iterator, Sequence, TypeVar
+from typing import Any, Iterable, Iterator, Mapping, Sequence, TypeVar
 from uuid import uuid4
 
 from gqlalchemy import Memgraph
@@ -33,12 +33,17 @@ from app.storage.schema import (
 )
 from app.storage.snapshot import SnapshotManager
 from app.storage.temporal_edge import TemporalEdgeManager
+from app.utils.node_diff import deep_merge_dict
 
 NodeType = TypeVar("NodeType")
 
 VALID_ANCHOR_TYPES = {"inciting_incident", "midpoint", "climax", "resolution"}
 VALID_ANCHOR_CONSTRAINTS = {"hard", "soft", "flexible"}
 AGENT_MEMORY_LIMIT = 80
+BULK_PATCH_LABELS = frozenset(
+    {"Entity", "SceneOrigin", "SceneVersion", "Act", "Chapter", "StoryAnchor"}
+)
+SIMULATION_LOG_FIELDS = frozenset(SimulationLog.model_fields)
 
 
 class _ValidatedMemgraph(Memgraph):  # pragma: no cover
@@ -49,6 +54,23 @@ class _ValidatedMemgraph(Memgraph):  # pragma: no cover
         return super().save_node(node)
 
 
+def _simulation_log_scene_id(log_id: str) -> str | None:
+    """从 sim:{scene_id}:round:{n} 形式的日志 id 中解析 scene_id。"""
+    if not log_id.startswith("sim:"):
+        return None
+    scene_id, sep, _ = log_id[len("sim:") :].rpartition(":round:")
+    return scene_id if sep and scene_id else None
+
+
+SCENE_MENTION_FIELDS = ("expected_outcome", "actual_outcome", "summary", "rendered_content")
+
+
+def _scene_version_mentions(version: SceneVersion, terms: Iterable[str]) -> bool:
+    """场景文本中是否出现实体 id 或名称。"""
+    text = "\n".join(str(getattr(version, field) or "") for field in SCENE_MENTION_FIELDS)
+    return any(term in text for term in terms)
+
+
 def _get_positive_int_env(name: str, default: int) -> int:  # pragma: no cover
     raw = os.getenv(name)
     if raw is None:
@@ -179,6 +201,8 @@ class _MemgraphConnectionPool:  # pragma: no cover
 
 class MemgraphStorage:  # pragma: no cover
     _cache_lock = threading.Lock()
+    # 旧版日志没有 scene_id 属性：本实例首次按场景查询日志前补写一次。
+    _simulation_log_scene_ids_ready = False
     _entity_cache: dict[tuple[str, str], list[dict[str, Any]]] = {}
     _character_cache: dict[tuple[str, str], list[dict[str, Any]]] = {}
     _relation_min_seq_cache: dict[tuple[str, str], int | None] = {}
@@ -426,17 +450,25 @@ class MemgraphStorage:  # pragma: no cover
         return world_state, relations
 
     def _get_latest_scene_version(self, scene_origin_id: str) -> SceneVersion | None:
-        result = next(
-            self.db.execute_and_fetch(
-                "MATCH (sv:SceneVersion {scene_origin_id: $scene_origin_id}) "
-                "RETURN sv ORDER BY sv.id DESC LIMIT 1;",
-                {"scene_origin_id": scene_origin_id},
-            ),
-            None,
+        return self._get_latest_scene_versions([scene_origin_id]).get(scene_origin_id)
+
+    def _get_latest_scene_versions(
+        self, scene_origin_ids: Sequence[str]
+    ) -> dict[str, SceneVersion]:
+        """按 scene_origin_id 批量取最新版本（sv.id 最大者）；读写路径共用同一口径。"""
+        if not scene_origin_ids:
+            return {}
+        records = self.db.execute_and_fetch(
+            "MATCH (sv:SceneVersion) WHERE sv.scene_origin_id IN $ids "
+            "WITH sv ORDER BY sv.id DESC "
+            "WITH sv.scene_origin_id AS scene_origin_id, collect(sv)[0] AS sv "
+            "RETURN scene_origin_id, sv;",
+            {"ids": list(scene_origin_ids)},
         )
-        if result is None:
-            return None
-        return SceneVersion(**result["sv"]._properties)
+        return {
+            record["scene_origin_id"]: SceneVersion(**record["sv"]._properties)
+            for record in records
+        }
 
     def _get_scene_version_for_commit(
         self, *, scene_origin_id: str, commit_id: str
@@ -793,7 +825,7 @@ class MemgraphStorage:  # pragma: no cover
         )
 
     def _simulation_log_props(self, log: SimulationLog) -> dict[str, object]:
-        return self._props_from(
+        props = self._props_from(
             log,
             required=(
                 "id",
@@ -808,8 +840,13 @@ class MemgraphStorage:  # pragma: no cover
                 "info_gain",
                 "stagnation_count",
             ),
-            optional=(),
+            optional=("scene_id",),
         )
+        if "scene_id" not in props:
+            scene_id = _simulation_log_scene_id(log.id)
+            if scene_id is not None:
+                props["scene_id"] = scene_id
+        return props
 
     def _subplot_props(self, subplot: Subplot) -> dict[str, object]:
         return self._props_from(
@@ -1287,6 +1324,73 @@ class MemgraphStorage:  # pragma: no cover
             "review_status": review_status,
         }
 
+    def create_chapters(
+        self, *, chapters: Sequence[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        if not chapters:
+            return []
+        act_ids = sorted({str(item["act_id"]) for item in chapters})
+        found = {
+            record["id"]
+            for record in self.db.execute_and_fetch(
+                "MATCH (a:Act) WHERE a.id IN $ids RETURN a.id AS id;",
+                {"ids": act_ids},
+            )
+        }
+        missing = [act_id for act_id in act_ids if act_id not in found]
+        if missing:
+            raise KeyError(f"act not found: {missing[0]}")
+        keys = [{"act_id": item["act_id"], "seq": item["seq"]} for item in chapters]
+        if len({(key["act_id"], key["seq"]) for key in keys}) != len(keys):
+            raise ValueError("duplicate chapter sequence in batch")
+        existing = next(
+            self.db.execute_and_fetch(
+                "UNWIND $keys AS key "
+                "MATCH (c:Chapter {act_id: key.act_id, sequence: key.seq}) "
+                "RETURN c.sequence AS seq LIMIT 1;",
+                {"keys": keys},
+            ),
+            None,
+        )
+        if existing is not None:
+            raise KeyError(f"chapter sequence already exists: {existing['seq']}")
+        rows: list[dict[str, Any]] = []
+        created: list[dict[str, Any]] = []
+        for item in chapters:
+            act_id = item["act_id"]
+            seq = item["seq"]
+            chapter = Chapter(
+                id=f"{act_id}:ch:{seq}",
+                act_id=act_id,
+                sequence=seq,
+                title=item["title"],
+                focus=item["focus"],
+                pov_character_id=item.get("pov_character_id"),
+                rendered_content=item.get("rendered_content"),
+                review_status=item.get("review_status", "pending"),
+            )
+            rows.append({"act_id": act_id, "props": self._chapter_props(chapter)})
+            created.append(
+                {
+                    "id": chapter.id,
+                    "act_id": act_id,
+                    "sequence": seq,
+                    "title": chapter.title,
+                    "focus": chapter.focus,
+                    "pov_character_id": chapter.pov_character_id,
+                    "rendered_content": chapter.rendered_content,
+                    "review_status": chapter.review_status,
+                }
+            )
+        self.db.execute(
+            "UNWIND $rows AS row "
+            "MATCH (a:Act {id: row.act_id}) "
+            "CREATE (c:Chapter) SET c += row.props "
+            "CREATE (a)-[:CONTAINS_CHAPTER]->(c);",
+            {"rows": rows},
+        )
+        return created
+
     def get_chapter(self, chapter_id: str) -> Chapter | None:
         return self._get_node("Chapter", Chapter, chapter_id)
 
@@ -1579,15 +1683,7 @@ class MemgraphStorage:  # pragma: no cover
         )
         return {"id": agent_id, "desires": desires, "version": new_version}
 
-    @staticmethod
-    def _deep_merge_dict(base: dict[str, Any], patch: dict[str, Any]) -> dict[str, Any]:
-        merged = dict(base)
-        for key, value in patch.items():
-            if isinstance(value, dict) and isinstance(merged.get(key), dict):
-                merged[key] = MemgraphStorage._deep_merge_dict(merged[key], value)
-            else:
-                merged[key] = value
-        return merged
+    _deep_merge_dict = staticmethod(deep_merge_dict)
 
     def update_agent_beliefs(
         self, *, agent_id: str, beliefs_patch: dict[str, Any]
@@ -1635,6 +1731,49 @@ class MemgraphStorage:  # pragma: no cover
         )
         return {"id": agent_id, "memory": trimmed}
 
+    def save_agent_round_state(
+        self,
+        *,
+        agent_id: str,
+        expected_version: int | None,
+        beliefs: dict[str, Any],
+        intentions: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        """单轮决策结束时一次写回 beliefs/intentions，按 version 乐观锁。"""
+        if expected_version is None:
+            raise ValueError("agent version is required")
+        if not isinstance(beliefs, dict):
+            raise ValueError("agent beliefs must be json object")
+        if not isinstance(intentions, list):
+            raise ValueError("agent intentions must be list")
+        params: dict[str, Any] = {
+            "agent_id": agent_id,
+            "expected_version": expected_version,
+            "beliefs": json.dumps(beliefs),
+            "intentions": json.dumps(intentions),
+            "version": expected_version + 1,
+        }
+        set_clause = "a.beliefs = $beliefs, a.intentions = $intentions, a.version = $version"
+        updated = next(
+            self.db.execute_and_fetch(
+                "MATCH (a:CharacterAgentState {id: $agent_id}) "
+                "WHERE a.version = $expected_version "
+                f"SET {set_clause} RETURN a.id AS id;",
+                params,
+            ),
+            None,
+        )
+        if updated is None:
+            if self.get_agent_state(agent_id) is None:
+                raise KeyError(f"agent state not found: {agent_id}")
+            raise ValueError(f"agent state version conflict: {agent_id}")
+        return {
+            "id": agent_id,
+            "beliefs": beliefs,
+            "intentions": intentions,
+            "version": expected_version + 1,
+        }
+
     def create_simulation_log(self, log: SimulationLog) -> SimulationLog:
         if self.get_scene_version(log.scene_version_id) is None:
             raise KeyError(f"scene version not found: {log.scene_version_id}")
@@ -1647,15 +1786,73 @@ class MemgraphStorage:  # pragma: no cover
         )
         return log
 
+    def create_simulation_logs(self, logs: list[SimulationLog]) -> list[SimulationLog]:
+        """批量写入推演日志：一次校验涉及的 SceneVersion，UNWIND 创建节点并回写最新日志。
+
+        SimulationLogWriter 在工作线程中调用本方法，因此整批写入走连接池的独立连接，
+        不与事件循环线程共用 self.db 的缓存连接。
+        """
+        if not logs:
+            return []
+        version_ids = sorted({log.scene_version_id for log in logs})
+        latest: dict[str, str] = {}
+        for log in logs:
+            latest[log.scene_version_id] = log.id
+        with self.transaction() as conn:
+            found = {
+                row["id"]
+                for row in conn.execute_and_fetch(
+                    "UNWIND $ids AS sv_id "
+                    "MATCH (sv:SceneVersion {id: sv_id}) "
+                    "RETURN sv.id AS id;",
+                    {"ids": version_ids},
+                )
+            }
+            missing = [version_id for version_id in version_ids if version_id not in found]
+            if missing:
+                raise KeyError(f"scene version not found: {missing[0]}")
+            conn.execute(
+                "UNWIND $rows AS row CREATE (n:SimulationLog) SET n += row;",
+                {"rows": [self._simulation_log_props(log) for log in logs]},
+            )
+            conn.execute(
+                "UNWIND $rows AS row "
+                "MATCH (sv:SceneVersion {id: row.scene_version_id}) "
+                "SET sv.simulation_log_id = row.log_id, sv.is_simulated = true;",
+                {
+                    "rows": [
+                        {"scene_version_id": version_id, "log_id": log_id}
+                        for version_id, log_id in latest.items()
+                    ]
+                },
+            )
+        return list(logs)
+
     def get_simulation_log(self, log_id: str) -> SimulationLog | None:
         return self._get_node("SimulationLog", SimulationLog, log_id)
 
-    def list_simulation_logs(self, scene_id: str) -> list[SimulationLog]:
-        prefix = f"sim:{scene_id}:round:"
+    @staticmethod
+    def _simulation_log_page(offset: int, limit: int | None) -> tuple[str, dict[str, int]]:
+        if offset < 0:
+            raise ValueError("offset must be >= 0")
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be > 0")
+        clause = " SKIP $offset"
+        params = {"offset": offset}
+        if limit is not None:
+            clause += " LIMIT $limit"
+            params["limit"] = limit
+        return clause, params
+
+    def list_simulation_logs(
+        self, scene_id: str, *, offset: int = 0, limit: int | None = None
+    ) -> list[SimulationLog]:
+        self._ensure_simulation_log_scene_ids()
+        page, params = self._simulation_log_page(offset, limit)
         records = self.db.execute_and_fetch(
-            "MATCH (l:SimulationLog) WHERE l.id STARTS WITH $prefix "
-            "RETURN l ORDER BY l.round_number ASC;",
-            {"prefix": prefix},
+            "MATCH (l:SimulationLog {scene_id: $scene_id}) "
+            f"RETURN l ORDER BY l.round_number ASC{page};",
+            {"scene_id": scene_id, **params},
         )
         logs: list[SimulationLog] = []
         for record in records:
@@ -1663,6 +1860,51 @@ class MemgraphStorage:  # pragma: no cover
             logs.append(SimulationLog(**node._properties))
         return logs
 
+    def list_simulation_log_fields(
+        self,
+        scene_id: str,
+        *,
+        fields: Sequence[str],
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """只取指定属性，避免为列表页反序列化大段 JSON 字段。"""
+        unknown = [field for field in fields if field not in SIMULATION_LOG_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"unknown simulation log fields: {unknown}")
+        self._ensure_simulation_log_scene_ids()
+        page, params = self._simulation_log_page(offset, limit)
+        projection = ", ".join(f"l.{field} AS {field}" for field in fields)
+        records = self.db.execute_and_fetch(
+            "MATCH (l:SimulationLog {scene_id: $scene_id}) "
+            f"RETURN {projection} ORDER BY l.round_number ASC{page};",
+            {"scene_id": scene_id, **params},
+        )
+        return [{field: record[field] for field in fields} for record in records]
+
+    def _ensure_simulation_log_scene_ids(self) -> None:
+        if self._simulation_log_scene_ids_ready:
+            return
+        self.backfill_simulation_log_scene_ids()
+        self._simulation_log_scene_ids_ready = True
+
+    def backfill_simulation_log_scene_ids(self) -> int:
+        """一次性迁移：为旧日志补写 scene_id，使其可被索引查询命中。"""
+        rows = [
+            {"id": record["id"], "scene_id": scene_id}
+            for record in self.db.execute_and_fetch(
+                "MATCH (l:SimulationLog) WHERE l.scene_id IS NULL RETURN l.id AS id;"
+            )
+            if (scene_id := _simulation_log_scene_id(record["id"])) is not None
+        ]
+        if rows:
+            self.db.execute(
+                "UNWIND $rows AS row "
+                "MATCH (l:SimulationLog {id: row.id}) SET l.scene_id = row.scene_id;",
+                {"rows": rows},
+            )
+        return len(rows)
+
     def update_simulation_log(self, log: SimulationLog) -> SimulationLog:
         props = self._simulation_log_props(log)
         self._update_node("SimulationLog", log.id, props)
@@ -1814,6 +2056,63 @@ class MemgraphStorage:  # pragma: no cover
             self.create_scene_version(scene_version)
         return root_id
 
+    @staticmethod
+    def _require_bulk_label(label: str) -> None:
+        if label not in BULK_PATCH_LABELS:
+            raise ValueError(f"unsupported bulk label: {label}")
+
+    def get_node_props_by_ids(
+        self, *, label: str, ids: Sequence[str]
+    ) -> dict[str, dict[str, Any]]:
+        self._require_bulk_label(label)
+        if not ids:
+            return {}
+        records = self.db.execute_and_fetch(
+            f"MATCH (n:{label}) WHERE n.id IN $ids RETURN n;",
+            {"ids": list(ids)},
+        )
+        nodes: dict[str, dict[str, Any]] = {}
+        for record in records:
+            props = dict(record["n"]._properties)
+            nodes[props["id"]] = props
+        return nodes
+
+    def get_latest_scene_version_props(
+        self, *, scene_origin_ids: Sequence[str]
+    ) -> dict[str, dict[str, Any]]:
+        if not scene_origin_ids:
+            return {}
+        records = self.db.execute_and_fetch(
+            "UNWIND $ids AS origin_id "
+            "MATCH (sv:SceneVersion {scene_origin_id: origin_id}) "
+            "WITH origin_id, sv ORDER BY sv.id DESC "
+            "WITH origin_id, collect(sv)[0] AS sv "
+            "RETURN origin_id, sv;",
+            {"ids": list(scene_origin_ids)},
+        )
+        return {
+            record["origin_id"]: dict(record["sv"]._properties) for record in records
+        }
+
+    def apply_node_patches(
+        self, *, patches: Mapping[str, Sequence[Mapping[str, Any]]]
+    ) -> int:
+        for label in patches:
+            self._require_bulk_label(label)
+        pending = {label: list(rows) for label, rows in patches.items() if rows}
+        if not pending:
+            return 0
+        with self.transaction() as conn:
+            for label, rows in pending.items():
+                conn.execute(
+                    f"UNWIND $rows AS row MATCH (n:{label} {{id: row.id}}) "
+                    "SET n += row.props;",
+                    {"rows": rows},
+                )
+        if "Entity" in pending:
+            self._invalidate_entity_cache()
+        return sum(len(rows) for rows in pending.values())
+
     def list_branches(self, *, root_id: str) -> list[str]:
         self._require_root_node(root_id)
         records = self.db.execute_and_fetch(
@@ -2386,23 +2685,128 @@ class MemgraphStorage:  # pragma: no cover
         root_id: str,
         branch_id: str,
         scene_id: str,
-    ) -> list[str]:
+        entity_ids: Sequence[str] | None = None,
+    ) -> dict[str, Any]:
         scene_origin = self._require_scene_origin(scene_id)
         self._require_branch_node(scene_origin.root_id, branch_id)
         records = self.db.execute_and_fetch(
             "MATCH (s:SceneOrigin {root_id: $root_id}) "
             "WHERE s.sequence_index > $seq "
-            "RETURN s.id AS id ORDER BY s.sequence_index ASC;",
+            "OPTIONAL MATCH (sv:SceneVersion {scene_origin_id: s.id}) "
+            "WITH s, count(sv) AS version_count "
+            "RETURN s.id AS id, s.sequence_index AS seq, version_count "
+            "ORDER BY seq ASC;",
             {"root_id": scene_origin.root_id, "seq": scene_origin.sequence_index},
         )
-        scene_ids = [record["id"] for record in records]
-        if scene_ids:
+        future_scenes = [
+            (record["id"], record["seq"], record["version_count"]) for record in records
+        ]
+        candidate_count = sum(version_count for _, _, version_count in future_scenes)
+        scene_ids = [future_id for future_id, _, _ in future_scenes]
+        latest_versions = self._get_latest_scene_versions(scene_ids)
+        if entity_ids is not None:
+            # 只有能证明与实体无关的场景才跳过：实体是 POV、关系在该场景生效/开始/结束、
+            # 或场景文本提到实体时都视为依赖；实体不在图中时无法判断，全部标记。
+            dependent_seqs = self._get_entity_dependent_scene_seqs(
+                root_id=scene_origin.root_id,
+                branch_id=branch_id,
+                scene_seqs=[seq for _, seq, _ in future_scenes],
+                entity_ids=entity_ids,
+            )
+            if dependent_seqs is not None:
+                wanted = set(entity_ids)
+                mentions = self._get_entity_mention_terms(
+                    root_id=scene_origin.root_id,
+                    branch_id=branch_id,
+                    entity_ids=entity_ids,
+                )
+                scene_ids = [
+                    future_id
+                    for future_id, seq, _ in future_scenes
+                    if seq in dependent_seqs
+                    or future_id not in latest_versions
+                    or latest_versions[future_id].pov_character_id in wanted
+                    or _scene_version_mentions(latest_versions[future_id], mentions)
+                ]
+        # 与 get_root_snapshot / complete_scene 一样按 _get_latest_scene_versions 取最新版本。
+        version_ids = [
+            latest_versions[future_id].id
+            for future_id in scene_ids
+            if future_id in latest_versions and not latest_versions[future_id].dirty
+        ]
+        if version_ids:
             self.db.execute(
-                "MATCH (sv:SceneVersion) WHERE sv.scene_origin_id IN $ids "
+                "UNWIND $ids AS sv_id "
+                "MATCH (sv:SceneVersion {id: sv_id}) "
                 "SET sv.dirty = true;",
-                {"ids": scene_ids},
+                {"ids": version_ids},
+            )
+        return {
+            "scene_ids": scene_ids,
+            "scene_version_ids": version_ids,
+            "writes": len(version_ids),
+            "writes_avoided": candidate_count - len(version_ids),
+        }
+
+    def _get_entity_dependent_scene_seqs(
+        self,
+        *,
+        root_id: str,
+        branch_id: str,
+        scene_seqs: Sequence[int],
+        entity_ids: Sequence[str],
+    ) -> set[int] | None:
+        """返回依赖这些实体关系的场景序号；有实体不在当前分支时返回 None。"""
+        if not scene_seqs:
+            return set()
+        known = self.db.execute_and_fetch(
+            "MATCH (e:Entity {root_id: $root_id, branch_id: $branch_id}) "
+            "WHERE e.id IN $entity_ids "
+            "RETURN count(DISTINCT e.id) AS known;",
+            {"root_id": root_id, "branch_id": branch_id, "entity_ids": list(entity_ids)},
+        )
+        if next(iter(known), {"known": 0})["known"] < len(set(entity_ids)):
+            return None
+        first_seq = min(scene_seqs)
+        records = self.db.execute_and_fetch(
+            "MATCH (from:Entity {root_id: $root_id, branch_id: $branch_id})"
+            "-[r:TemporalRelation {branch_id: $branch_id}]->(to:Entity) "
+            "WHERE (from.id IN $entity_ids OR to.id IN $entity_ids) "
+            "AND (r.end_scene_seq IS NULL OR r.end_scene_seq >= $seq) "
+            "RETURN r.start_scene_seq AS start_seq, r.end_scene_seq AS end_seq;",
+            {
+                "root_id": root_id,
+                "branch_id": branch_id,
+                "seq": first_seq,
+                "entity_ids": list(entity_ids),
+            },
+        )
+        intervals = [(record["start_seq"], record["end_seq"]) for record in records]
+        # 关系在场景中仍生效，或恰好在该场景开始/结束，都算依赖。
+        return {
+            seq
+            for seq in scene_seqs
+            if any(
+                start <= seq and (end is None or end >= seq) for start, end in intervals
             )
-        return scene_ids
+        }
+
+    def _get_entity_mention_terms(
+        self,
+        *,
+        root_id: str,
+        branch_id: str,
+        entity_ids: Sequence[str],
+    ) -> set[str]:
+        records = self.db.execute_and_fetch(
+            "MATCH (e:Entity {root_id: $root_id, branch_id: $branch_id}) "
+            "WHERE e.id IN $entity_ids "
+            "RETURN e.id AS id, e.name AS name;",
+            {"root_id": root_id, "branch_id": branch_id, "entity_ids": list(entity_ids)},
+        )
+        terms = set(entity_ids)
+        terms.update(record["name"] for record in records if record["name"])
+        return terms
 
     def build_logic_check_world_state(
         self, *, root_id: str, branch_id: str, scene_id: str
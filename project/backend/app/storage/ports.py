@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Iterable, Protocol, Sequence
+from typing import Any, Iterable, Mapping, Protocol, Sequence
 
 from app.models import CharacterSheet, Entity, SceneNode, SnowflakeRoot
 
@@ -178,7 +178,8 @@ class GraphStoragePort(Protocol):
         root_id: str,
         branch_id: str,
         scene_id: str,
-    ) -> list[str]: ...
+        entity_ids: Sequence[str] | None = None,
+    ) -> dict[str, Any]: ...
 
     def build_logic_check_world_state(
         self, *, root_id: str, branch_id: str, scene_id: str
@@ -208,6 +209,22 @@ class GraphStoragePort(Protocol):
         review_status: str = "pending",
     ) -> dict[str, Any]: ...
 
+    def create_chapters(
+        self, *, chapters: Sequence[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]: ...
+
+    def get_node_props_by_ids(
+        self, *, label: str, ids: Sequence[str]
+    ) -> dict[str, dict[str, Any]]: ...
+
+    def get_latest_scene_version_props(
+        self, *, scene_origin_ids: Sequence[str]
+    ) -> dict[str, dict[str, Any]]: ...
+
+    def apply_node_patches(
+        self, *, patches: Mapping[str, Sequence[Mapping[str, Any]]]
+    ) -> int: ...
+
     def get_chapter(self, chapter_id: str) -> Any: ...
 
     def update_chapter(self, chapter: Any) -> Any: ...
@@ -266,11 +283,33 @@ class GraphStoragePort(Protocol):
 
     def add_agent_memory(self, *, agent_id: str, entry: dict[str, Any]) -> dict[str, Any]: ...
 
+    def save_agent_round_state(
+        self,
+        *,
+        agent_id: str,
+        expected_version: int | None,
+        beliefs: dict[str, Any],
+        intentions: list[dict[str, Any]],
+    ) -> dict[str, Any]: ...
+
     def create_simulation_log(self, log: Any) -> Any: ...
 
+    def create_simulation_logs(self, logs: list[Any]) -> list[Any]: ...
+
     def get_simulation_log(self, log_id: str) -> Any: ...
 
-    def list_simulation_logs(self, scene_id: str) -> list[Any]: ...
+    def list_simulation_logs(
+        self, scene_id: str, *, offset: int = 0, limit: int | None = None
+    ) -> list[Any]: ...
+
+    def list_simulation_log_fields(
+        self,
+        scene_id: str,
+        *,
+        fields: Sequence[str],
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]: ...
 
     def update_simulation_log(self, log: Any) -> Any: ...
 
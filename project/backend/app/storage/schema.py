@@ -39,6 +39,8 @@ INDEX_DEFINITIONS = [
     {"label": "CharacterAgentState", "property": "branch_id"},
     {"label": "SimulationLog", "property": "id"},
     {"label": "SimulationLog", "property": "scene_version_id"},
+    {"label": "SimulationLog", "property": "scene_id"},
+    {"label": "SimulationLog", "properties": ["scene_id", "round_number"]},
     {"label": "WorldSnapshot", "property": "id"},
     {"label": "WorldSnapshot", "property": "scene_version_id"},
     {"label": "WorldSnapshot", "properties": ["branch_id", "scene_seq"]},
@@ -148,6 +150,7 @@ class SimulationLog(Node):
     drama_score: float
     info_gain: float
     stagnation_count: int = 0
+    scene_id: str | None = None
 
 
 class Subplot(Node):
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Any, Mapping, Sequence
+from typing import Any, Iterator, Mapping, Sequence
 
 
 def build_entity_scene_index(
@@ -25,6 +25,51 @@ def collect_impacted_scenes(
     return list(impacted)
 
 
+def build_scene_order(
+    scene_ids: Sequence[str],
+    scene_sequences: Mapping[str, int] | None = None,
+) -> list[str]:
+    if scene_sequences is None:
+        return list(dict.fromkeys(scene_ids))
+    unique_ids = dict.fromkeys(scene_ids)
+    sequenced = sorted(
+        (scene_id for scene_id in unique_ids if scene_id in scene_sequences),
+        key=lambda scene_id: (scene_sequences[scene_id], scene_id),
+    )
+    unsequenced = [scene_id for scene_id in unique_ids if scene_id not in scene_sequences]
+    return sequenced + unsequenced
+
+
+def build_entity_scene_bitsets(
+    entity_to_scenes: Mapping[str, set[str]],
+    scene_positions: Mapping[str, int],
+) -> dict[str, int]:
+    entity_bits: dict[str, int] = {}
+    for entity_id, scene_ids in entity_to_scenes.items():
+        mask = 0
+        for scene_id in scene_ids:
+            mask |= 1 << scene_positions[scene_id]
+        entity_bits[entity_id] = mask
+    return entity_bits
+
+
+def collect_impacted_scene_mask(
+    entity_bits: Mapping[str, int],
+    entity_ids: Sequence[str],
+) -> int:
+    mask = 0
+    for entity_id in entity_ids:
+        mask |= entity_bits[entity_id]
+    return mask
+
+
+def iter_mask_positions(mask: int) -> Iterator[int]:
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
 def calculate_impact_severity(state_changes: Sequence[Mapping[str, Any]]) -> str:
     change_count = len(state_changes)
     if change_count >= 3:
@@ -0,0 +1,43 @@
+"""In-memory diffing and merging of node properties for read-modify-write saves."""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+
+def diff_node_props(
+    current: Mapping[str, Any],
+    desired: Mapping[str, Any],
+) -> dict[str, Any]:
+    return {
+        key: value
+        for key, value in desired.items()
+        if value is not None and current.get(key) != value
+    }
+
+
+def build_patch_rows(
+    current_by_id: Mapping[str, Mapping[str, Any]],
+    desired_by_id: Mapping[str, Mapping[str, Any]],
+    *,
+    kind: str,
+) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    for node_id, desired in desired_by_id.items():
+        current = current_by_id.get(node_id)
+        if current is None:
+            raise KeyError(f"{kind} not found: {node_id}")
+        changed = diff_node_props(current, desired)
+        if changed:
+            rows.append({"id": node_id, "props": changed})
+    return rows
+
+
+def deep_merge_dict(base: dict[str, Any], patch: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge_dict(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
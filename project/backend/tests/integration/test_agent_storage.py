@@ -187,3 +187,48 @@ def test_add_agent_memory_trims_to_top_80_by_importance(memgraph_storage):
     assert len(importances) == 80
     assert importances[0] == 21
     assert importances[-1] == 999
+
+
+def test_save_agent_round_state_writes_once_with_version_check(memgraph_storage):
+    root_id, branch_id = _seed_root(memgraph_storage)
+    entity_id = _create_character(
+        memgraph_storage,
+        root_id=root_id,
+        branch_id=branch_id,
+    )
+
+    memgraph_storage.init_character_agent(
+        char_id=entity_id,
+        branch_id=branch_id,
+        initial_desires=[{"id": "d1", "type": "short_term"}],
+    )
+
+    agent = _fetch_agent(memgraph_storage, character_id=entity_id)
+    assert agent is not None
+
+    memgraph_storage.save_agent_round_state(
+        agent_id=agent["id"],
+        expected_version=1,
+        beliefs={"world": {"weather": "rain"}},
+        intentions=[{"id": "i1"}],
+    )
+
+    updated = helpers.fetch_one(
+        memgraph_storage,
+        "MATCH (a:CharacterAgentState {id: $agent_id}) "
+        "RETURN a.beliefs AS beliefs, a.intentions AS intentions, "
+        "a.memory AS memory, a.version AS version;",
+        {"agent_id": agent["id"]},
+    )
+    assert updated is not None
+    assert updated["version"] == 2
+    assert json.loads(updated["beliefs"]) == {"world": {"weather": "rain"}}
+    assert json.loads(updated["intentions"]) == [{"id": "i1"}]
+
+    with pytest.raises(ValueError, match="version conflict"):
+        memgraph_storage.save_agent_round_state(
+            agent_id=agent["id"],
+            expected_version=1,
+            beliefs={},
+            intentions=[],
+        )
@@ -846,7 +846,10 @@ def test_memgraph_storage_graph_port_flow(memgraph_storage):
         branch_id=default_branch_id,
         scene_id=scene_origin_id,
     )
-    assert scene_origin_id_2 in future_dirty
+    assert scene_origin_id_2 in future_dirty["scene_ids"]
+    assert future_dirty["writes"] == len(future_dirty["scene_version_ids"])
+    snapshot = memgraph_storage.get_root_snapshot(root_id=root_id, branch_id=default_branch_id)
+    assert {scene["id"]: scene["is_dirty"] for scene in snapshot["scenes"]}[scene_origin_id_2]
 
     assert memgraph_storage.apply_local_scene_fix(
         root_id=root_id,
@@ -56,6 +56,119 @@ def test_simulation_log_crud(memgraph_storage):
     assert memgraph_storage.get_simulation_log(simulation.id) is None
 
 
+def test_simulation_logs_batch_create(memgraph_storage):
+    root_id, branch_id = _seed_root(memgraph_storage)
+
+    created_scene = helpers.create_scene_origin(
+        memgraph_storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        title="Scene 1",
+    )
+    scene_version_id = created_scene["scene_version_id"]
+
+    simulation_cls = helpers.get_schema_model("SimulationLog")
+    logs = [
+        simulation_cls(
+            id=f"sim:{scene_version_id}:round:{round_number}",
+            scene_version_id=scene_version_id,
+            round_number=round_number,
+            agent_actions="[]",
+            dm_arbitration="{}",
+            narrative_events="[]",
+            sensory_seeds="[]",
+            convergence_score=0.5,
+            drama_score=0.6,
+            info_gain=0.3,
+        )
+        for round_number in (1, 2, 3)
+    ]
+
+    memgraph_storage.create_simulation_logs(logs)
+    for log in logs:
+        assert memgraph_storage.get_simulation_log(log.id) is not None
+    version = memgraph_storage.get_scene_version(scene_version_id)
+    assert version.simulation_log_id == logs[-1].id
+
+    missing = simulation_cls(**{**logs[0].model_dump(), "id": "sim:missing", "scene_version_id": "sv-missing"})
+    try:
+        memgraph_storage.create_simulation_logs([missing])
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("expected KeyError for missing scene version")
+    assert memgraph_storage.get_simulation_log("sim:missing") is None
+
+
+def test_simulation_logs_list_by_indexed_scene_id(memgraph_storage):
+    root_id, branch_id = _seed_root(memgraph_storage)
+
+    created_scene = helpers.create_scene_origin(
+        memgraph_storage,
+        root_id=root_id,
+        branch_id=branch_id,
+        title="Scene 1",
+    )
+    scene_version_id = created_scene["scene_version_id"]
+    scene_id = f"scene-{uuid4()}"
+
+    simulation_cls = helpers.get_schema_model("SimulationLog")
+    memgraph_storage.create_simulation_logs(
+        [
+            simulation_cls(
+                id=f"sim:{scene_id}:round:{round_number}",
+                scene_version_id=scene_version_id,
+                round_number=round_number,
+                agent_actions="[]",
+                dm_arbitration="{}",
+                narrative_events="[]",
+                sensory_seeds="[]",
+                convergence_score=0.5,
+                drama_score=0.1 * round_number,
+                info_gain=0.3,
+            )
+            for round_number in (3, 1, 2)
+        ]
+    )
+
+    logs = memgraph_storage.list_simulation_logs(scene_id)
+    assert [log.round_number for log in logs] == [1, 2, 3]
+    assert {log.scene_id for log in logs} == {scene_id}
+
+    page = memgraph_storage.list_simulation_logs(scene_id, offset=1, limit=1)
+    assert [log.round_number for log in page] == [2]
+
+    rows = memgraph_storage.list_simulation_log_fields(
+        scene_id, fields=["round_number", "drama_score"], limit=2
+    )
+    assert [row["round_number"] for row in rows] == [1, 2]
+    assert set(rows[0]) == {"round_number", "drama_score"}
+
+    legacy_id = f"sim:{scene_id}:round:4"
+    memgraph_storage.create_simulation_logs(
+        [
+            simulation_cls(
+                id=legacy_id,
+                scene_version_id=scene_version_id,
+                round_number=4,
+                agent_actions="[]",
+                dm_arbitration="{}",
+                narrative_events="[]",
+                sensory_seeds="[]",
+                convergence_score=0.5,
+                drama_score=0.4,
+                info_gain=0.3,
+            )
+        ]
+    )
+    memgraph_storage.db.execute(
+        "MATCH (l:SimulationLog {id: $id}) REMOVE l.scene_id;", {"id": legacy_id}
+    )
+    memgraph_storage._simulation_log_scene_ids_ready = False
+    logs = memgraph_storage.list_simulation_logs(scene_id)
+    assert [log.round_number for log in logs] == [1, 2, 3, 4]
+
+
 def test_subplot_crud(memgraph_storage):
     root_id, branch_id = _seed_root(memgraph_storage)
 
@@ -69,6 +69,9 @@ class Step5Storage:
         self.created_chapters.append(record)
         return record
 
+    def create_chapters(self, *, chapters):
+        return [self.create_chapter(**chapter) for chapter in chapters]
+
 
 @pytest.fixture()
 def client(monkeypatch):
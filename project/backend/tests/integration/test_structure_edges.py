@@ -782,7 +782,8 @@ def test_structure_edges_scene_updates_and_flags(memgraph_storage):
         branch_id=branch_id,
         scene_id=created["scene_origin_id"],
     )
-    assert future["scene_origin_id"] in future_ids
+    assert future["scene_origin_id"] in future_ids["scene_ids"]
+    assert future_ids["scene_version_ids"] == [future["scene_version_id"]]
 
 
 def test_structure_edges_entities_relations_and_context(memgraph_storage):
@@ -318,6 +318,9 @@ class WuxiaGraphStorageStub(GraphStorageStub):
         self.chapters_by_act.setdefault(act_id, []).append(chapter_id)
         return self._chapter_to_dict(chapter)
 
+    def create_chapters(self, *, chapters):
+        return [self.create_chapter(**chapter) for chapter in chapters]
+
     def get_chapter(self, chapter_id: str) -> Chapter | None:
         return self.chapters.get(chapter_id)
 
@@ -0,0 +1,69 @@
+import random
+import time
+
+from app.services.world_master import WorldMasterEngine
+
+SIZES = (10, 100, 1000)
+ACTION_TYPES = ("attack", "investigate", "talk", "wait")
+
+
+def _actions(count: int, seed: int) -> list[dict[str, object]]:
+    rng = random.Random(seed)
+    agents = [f"agent-{idx}" for idx in range(count)]
+    targets = agents[: max(4, count // 20)] + ["door", "altar"]
+    return [
+        {
+            "action_id": f"act-{idx}",
+            "agent_id": agent_id,
+            "action_type": rng.choice(ACTION_TYPES),
+            "action_target": rng.choice(targets),
+        }
+        for idx, agent_id in enumerate(agents)
+    ]
+
+
+def _run_sync(coro):
+    # detect_conflicts 内部没有 await：直接驱动协程，避免事件循环开销干扰计时。
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise AssertionError("detect_conflicts unexpectedly suspended")
+
+
+def _measure(run, iterations: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - t0) / iterations * 1_000_000
+
+
+def test_detect_conflicts_indexed_matches_pairwise_and_scales():
+    engine = WorldMasterEngine()
+    for size in SIZES:
+        actions = _actions(size, seed=size)
+        expected = engine._detect_conflicts_pairwise(actions)
+        actual = _run_sync(engine.detect_conflicts(actions))
+        assert actual == expected
+        assert any(item["type"] == "shared_target" for item in actual)
+
+        iterations = max(1, 2000 // size)
+        pairwise_us = _measure(lambda: engine._detect_conflicts_pairwise(actions), iterations)
+        indexed_us = _measure(lambda: _run_sync(engine.detect_conflicts(actions)), iterations)
+        print(
+            "detect_conflicts_perf "
+            f"actions={size} conflicts={len(actual)} iterations={iterations} "
+            f"pairwise_us={pairwise_us:.2f} indexed_us={indexed_us:.2f}"
+        )
+        assert pairwise_us >= 0
+        assert indexed_us >= 0
+
+    mutual = [
+        {"agent_id": "a", "action_type": "attack", "action_target": "b"},
+        {"agent_id": "b", "action_type": "attack", "action_target": "a"},
+        {"agent_id": "c", "action_type": "attack", "action_target": "a"},
+        {"agent_id": "a", "action_type": "attack", "action_target": "c"},
+    ]
+    assert _run_sync(engine.detect_conflicts(mutual)) == engine._detect_conflicts_pairwise(
+        mutual
+    )
@@ -0,0 +1,97 @@
+import random
+import time
+
+from app.services.dependency_matrix import DependencyMatrix
+from app.utils.graph_algorithms import build_entity_scene_index, collect_impacted_scenes
+
+SCENE_COUNT = 100
+ENTITY_COUNT = 500
+ENTITIES_PER_SCENE = 20
+CHANGED_ENTITIES = 5
+ITERATIONS = 2000
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        raise ValueError("percentile requires at least one value")
+    ordered = sorted(values)
+    index = min(int((len(ordered) - 1) * pct), len(ordered) - 1)
+    return ordered[index]
+
+
+def _build_project(seed: int):
+    rng = random.Random(seed)
+    entity_ids = [f"entity-{idx}" for idx in range(ENTITY_COUNT)]
+    scene_entities = {
+        f"scene-{idx}": rng.sample(entity_ids, ENTITIES_PER_SCENE)
+        for idx in range(SCENE_COUNT)
+    }
+    scene_sequences = {f"scene-{idx}": idx for idx in range(SCENE_COUNT)}
+    referenced = sorted({entity_id for ids in scene_entities.values() for entity_id in ids})
+    queries = [
+        (rng.sample(referenced, CHANGED_ENTITIES), rng.randrange(SCENE_COUNT))
+        for _ in range(ITERATIONS)
+    ]
+    return scene_entities, scene_sequences, queries
+
+
+def _set_impacted_after(entity_to_scenes, scene_sequences, entity_ids, min_scene_seq):
+    impacted = collect_impacted_scenes(entity_to_scenes, entity_ids)
+    return [
+        scene_id for scene_id in impacted if scene_sequences[scene_id] > min_scene_seq
+    ]
+
+
+def _measure(run, queries) -> list[float]:
+    latencies_us: list[float] = []
+    for entity_ids, min_scene_seq in queries:
+        t0 = time.perf_counter()
+        run(entity_ids, min_scene_seq)
+        latencies_us.append((time.perf_counter() - t0) * 1_000_000)
+    return latencies_us
+
+
+def test_dependency_matrix_bitset_vs_set_benchmark():
+    scene_entities, scene_sequences, queries = _build_project(seed=7)
+
+    entity_to_scenes = build_entity_scene_index(scene_entities)
+    matrix = DependencyMatrix.from_scene_entities(
+        scene_entities, scene_sequences=scene_sequences
+    )
+
+    for entity_ids, min_scene_seq in queries[:50]:
+        expected = _set_impacted_after(
+            entity_to_scenes, scene_sequences, entity_ids, min_scene_seq
+        )
+        actual = matrix.get_impacted_scenes_after(
+            entity_ids, min_scene_seq=min_scene_seq
+        )
+        assert set(actual) == set(expected)
+        assert actual == sorted(actual, key=scene_sequences.__getitem__)
+
+    set_latencies = _measure(
+        lambda entity_ids, min_scene_seq: _set_impacted_after(
+            entity_to_scenes, scene_sequences, entity_ids, min_scene_seq
+        ),
+        queries,
+    )
+    bitset_latencies = _measure(
+        lambda entity_ids, min_scene_seq: matrix.get_impacted_scenes_after(
+            entity_ids, min_scene_seq=min_scene_seq
+        ),
+        queries,
+    )
+
+    set_p50 = _percentile(set_latencies, 0.5)
+    bitset_p50 = _percentile(bitset_latencies, 0.5)
+    print(
+        "dependency_matrix_perf "
+        f"scenes={SCENE_COUNT} entities={ENTITY_COUNT} iterations={ITERATIONS} "
+        f"set_p50_us={set_p50:.2f} set_p99_us={_percentile(set_latencies, 0.99):.2f} "
+        f"bitset_p50_us={bitset_p50:.2f} "
+        f"bitset_p99_us={_percentile(bitset_latencies, 0.99):.2f}"
+    )
+
+    assert matrix.scene_count == SCENE_COUNT
+    assert set_p50 >= 0
+    assert bitset_p50 >= 0
@@ -0,0 +1,81 @@
+import json
+import time
+from uuid import uuid4
+
+from pydantic import TypeAdapter
+
+from app.llm.topone_gateway import _type_adapter, _validate_structured_output
+from app.models import SceneNode
+
+SCENE_COUNT = 100
+ITERATIONS = 200
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        raise ValueError("percentile requires at least one value")
+    ordered = sorted(values)
+    index = min(int((len(ordered) - 1) * pct), len(ordered) - 1)
+    return ordered[index]
+
+
+def _scene_list_text() -> str:
+    scenes = [
+        {
+            "id": str(uuid4()),
+            "branch_id": "main",
+            "title": f"Scene {idx + 1}",
+            "sequence_index": idx + 1,
+            "pov_character_id": str(uuid4()),
+            "expected_outcome": f"推进主线：阶段 {idx + 1}",
+            "conflict_type": "internal" if idx % 2 == 0 else "external",
+            "actual_outcome": "",
+            "logic_exception": False,
+            "is_dirty": False,
+        }
+        for idx in range(SCENE_COUNT)
+    ]
+    return "```json\n" + json.dumps(scenes, ensure_ascii=False) + "\n```"
+
+
+def _legacy_validate(text: str):
+    # 旧路径：每次新建 TypeAdapter，并先 json.loads 再 validate_python。
+    candidate = text.strip().split("\n", 1)[1].rsplit("\n", 1)[0]
+    return TypeAdapter(list[SceneNode]).validate_python(json.loads(candidate))
+
+
+def _measure(run, text: str) -> list[float]:
+    latencies_us: list[float] = []
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        run(text)
+        latencies_us.append((time.perf_counter() - t0) * 1_000_000)
+    return latencies_us
+
+
+def test_structured_validation_cached_adapter_benchmark():
+    text = _scene_list_text()
+    expected = _legacy_validate(text)
+    actual = _validate_structured_output(text, list[SceneNode])
+    assert actual == expected
+    assert len(actual) == SCENE_COUNT
+
+    _type_adapter(list[SceneNode])
+    legacy_latencies = _measure(_legacy_validate, text)
+    fast_latencies = _measure(
+        lambda payload: _validate_structured_output(payload, list[SceneNode]), text
+    )
+
+    legacy_p50 = _percentile(legacy_latencies, 0.5)
+    fast_p50 = _percentile(fast_latencies, 0.5)
+    print(
+        "structured_validation_perf "
+        f"scenes={SCENE_COUNT} iterations={ITERATIONS} "
+        f"legacy_p50_us={legacy_p50:.2f} "
+        f"legacy_p99_us={_percentile(legacy_latencies, 0.99):.2f} "
+        f"fast_p50_us={fast_p50:.2f} "
+        f"fast_p99_us={_percentile(fast_latencies, 0.99):.2f}"
+    )
+
+    assert legacy_p50 >= 0
+    assert fast_p50 >= 0
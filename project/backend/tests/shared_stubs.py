@@ -142,10 +142,15 @@ class GraphStorageStub:
         return [scene_id]
 
     def mark_future_scenes_dirty(
-        self, *, root_id: str, branch_id: str, scene_id: str
-    ) -> list[str]:
+        self, *, root_id: str, branch_id: str, scene_id: str, entity_ids=None
+    ) -> dict:
         self.future_dirty_calls.append((root_id, branch_id, scene_id))
-        return [scene_id]
+        return {
+            "scene_ids": [scene_id],
+            "scene_version_ids": [],
+            "writes": 1,
+            "writes_avoided": 0,
+        }
 
     def apply_semantic_states_patch(
         self, *, root_id: str, branch_id: str, entity_id: str, patch: dict
@@ -1,3 +1,6 @@
+import json
+from types import SimpleNamespace
+
 import httpx
 import pytest
 from fastapi.testclient import TestClient
@@ -12,6 +15,7 @@ from app.main import (
     get_topone_client,
     get_topone_gateway,
 )
+from app.logic.snowflake_manager import SnowflakeManager
 from app.models import SceneNode, SnowflakeRoot
 from tests.shared_stubs import GraphStorageStub
 
@@ -85,6 +89,9 @@ class DummyStep5Storage:
             "pov_character_id": pov_character_id,
         }
 
+    def create_chapters(self, *, chapters):
+        return [self.create_chapter(**chapter) for chapter in chapters]
+
 
 class DummyManager:
     def __init__(self) -> None:
@@ -146,6 +153,10 @@ class DummyGateway:
     async def render_scene(self, payload):
         return "Rendered text"
 
+    async def render_scene_stream(self, payload):
+        for chunk in ("Rendered ", "text"):
+            yield chunk
+
 
 
 
@@ -783,6 +794,86 @@ def test_scene_render_and_complete_endpoints(monkeypatch):
         app.dependency_overrides.clear()
 
 
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_scene_render_stream_persists_on_completion(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "gemini")
+    storage = GraphStorageStub()
+    app.dependency_overrides[get_graph_storage] = lambda: storage
+    app.dependency_overrides[get_topone_gateway] = lambda: DummyGateway()
+
+    client = TestClient(app)
+    try:
+        response = client.post(
+            "/api/v1/scenes/scene-alpha/render/stream",
+            params={"branch_id": DEFAULT_BRANCH_ID},
+            json={
+                "voice_dna": "dna",
+                "conflict_type": "internal",
+                "outline_requirement": "keep the plan",
+                "user_intent": "advance the plot",
+                "expected_outcome": "Outcome 1",
+                "world_state": {},
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["delta", "delta", "done"]
+        assert "".join(data["text"] for name, data in events if name == "delta") == (
+            "Rendered text"
+        )
+        assert storage.rendered["scene-alpha"] == "Rendered text"
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_chapter_render_stream_aborts_when_over_length(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "gemini")
+    chapter = SimpleNamespace(
+        id="ch-1", title="Title", focus="Focus", rendered_content=None
+    )
+    updates: list[object] = []
+    pulled: list[int] = []
+
+    class ChapterStorage:
+        def get_chapter(self, chapter_id):
+            return chapter if chapter_id == "ch-1" else None
+
+        def update_chapter(self, item):
+            updates.append(item)
+
+    class LongGateway:
+        async def render_scene_stream(self, payload):
+            for index in range(10):
+                pulled.append(index)
+                yield "字" * 1000
+
+    app.dependency_overrides[get_graph_storage] = lambda: ChapterStorage()
+    app.dependency_overrides[get_topone_gateway] = lambda: LongGateway()
+
+    client = TestClient(app)
+    try:
+        response = client.post("/api/v1/chapters/ch-1/render/stream")
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["delta", "delta", "error"]
+        assert events[-1][1]["status_code"] == 400
+        assert "字数超限" in events[-1][1]["detail"]
+        assert pulled == [0, 1, 2]
+        assert updates == []
+
+        missing = client.post("/api/v1/chapters/ch-missing/render/stream")
+        assert missing.status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+
 def test_fork_and_reset_branch_endpoints(monkeypatch):
     monkeypatch.setenv("SNOWFLAKE_ENGINE", "local")
     storage = GraphStorageStub()
@@ -929,6 +1020,120 @@ def test_complete_scene_orchestrated_force_execute(monkeypatch):
         app.dependency_overrides.clear()
 
 
+def test_complete_scene_orchestrated_applies_cascading_impact_after_commit(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "gemini")
+    storage = GraphStorageStub()
+
+    class CascadingGateway(DummyGateway):
+        async def logic_check(self, payload):
+            return LogicCheckResult(
+                ok=True,
+                mode=payload.mode,
+                decision="execute",
+                impact_level=ImpactLevel.CASCADING,
+                warnings=[],
+            )
+
+    class FailingCascadeStorage(GraphStorageStub):
+        def mark_future_scenes_dirty(self, **kwargs):
+            super().mark_future_scenes_dirty(**kwargs)
+            raise KeyError("branch not found")
+
+    app.dependency_overrides[get_topone_gateway] = lambda: CascadingGateway()
+
+    client = TestClient(app)
+    payload = {
+        "root_id": "root",
+        "branch_id": DEFAULT_BRANCH_ID,
+        "outline_requirement": "outline",
+        "world_state": {},
+        "user_intent": "intent",
+        "mode": "standard",
+        "content": "story text",
+        "entity_ids": ["entity-1"],
+        "confirmed_proposals": [],
+        "actual_outcome": "Outcome",
+        "summary": "Summary",
+    }
+    try:
+        app.dependency_overrides[get_graph_storage] = lambda: storage
+        response = client.post(
+            "/api/v1/scenes/scene-alpha/complete/orchestrated", json=payload
+        )
+        assert response.status_code == 200
+        assert "impact" not in response.json()
+        assert storage.future_dirty_calls == [("root", DEFAULT_BRANCH_ID, "scene-alpha")]
+
+        failing = FailingCascadeStorage()
+        app.dependency_overrides[get_graph_storage] = lambda: failing
+        response = client.post(
+            "/api/v1/scenes/scene-alpha/complete/orchestrated", json=payload
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "committed"
+        assert failing.future_dirty_calls == [("root", DEFAULT_BRANCH_ID, "scene-alpha")]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_complete_scene_orchestrated_reject_cancels_state_extract(monkeypatch):
+    import asyncio
+
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "gemini")
+    storage = GraphStorageStub()
+    events: list[str] = []
+
+    class RejectingGateway(DummyGateway):
+        async def state_extract(self, payload):
+            events.append("extract_started")
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                events.append("extract_cancelled")
+                raise
+            return await super().state_extract(payload)
+
+        async def logic_check(self, payload):
+            await asyncio.sleep(0)
+            events.append("logic_done")
+            return LogicCheckResult(
+                ok=False,
+                mode=payload.mode,
+                decision="review",
+                impact_level=ImpactLevel.LOCAL,
+                warnings=[],
+            )
+
+    app.dependency_overrides[get_graph_storage] = lambda: storage
+    app.dependency_overrides[get_topone_gateway] = lambda: RejectingGateway()
+
+    client = TestClient(app)
+    payload = {
+        "root_id": "root",
+        "branch_id": DEFAULT_BRANCH_ID,
+        "outline_requirement": "outline",
+        "world_state": {},
+        "user_intent": "intent",
+        "mode": "standard",
+        "content": "story text",
+        "entity_ids": ["entity-1"],
+        "confirmed_proposals": [],
+        "actual_outcome": "Outcome",
+        "summary": "Summary",
+    }
+    try:
+        response = client.post(
+            "/api/v1/scenes/scene-alpha/complete/orchestrated", json=payload
+        )
+        assert response.status_code == 400
+        assert "logic_check rejected" in response.json()["detail"]
+        assert events[0] == "extract_started"
+        assert "extract_cancelled" in events
+        assert "scene-alpha" not in storage.completed
+    finally:
+        app.dependency_overrides.clear()
+
+
 
 def test_merge_and_revert_branch_endpoints(monkeypatch):
     monkeypatch.setenv("SNOWFLAKE_ENGINE", "local")
@@ -1104,3 +1309,62 @@ def test_create_project_rejects_blank_name(monkeypatch):
         assert response.json()["detail"]
     finally:
         app.dependency_overrides.clear()
+
+
+def test_step4_stream_emits_scenes_then_done():
+    class StreamEngine:
+        def __init__(self, fail: bool) -> None:
+            self.fail = fail
+
+        async def generate_scene_list_stream(self, root, characters):
+            for index in range(2):
+                yield SceneNode(
+                    branch_id=DEFAULT_BRANCH_ID,
+                    title=f"Scene {index}",
+                    sequence_index=index,
+                    expected_outcome="Outcome",
+                    conflict_type="internal",
+                    actual_outcome="",
+                    is_dirty=False,
+                )
+            if self.fail:
+                raise ValueError("invalid structured output schema at scene 3")
+
+    storage = GraphStorageStub()
+    engines = [StreamEngine(fail=False), StreamEngine(fail=True)]
+    app.dependency_overrides[get_snowflake_manager] = lambda: SnowflakeManager(
+        engine=engines.pop(0), min_scenes=1, max_scenes=5, storage=storage
+    )
+    client = TestClient(app)
+    payload = {
+        "root": {
+            "logline": "Test story",
+            "three_disasters": ["D1", "D2", "D3"],
+            "ending": "End",
+            "theme": "Testing",
+        },
+        "characters": [
+            {
+                "name": "Hero",
+                "ambition": "A",
+                "conflict": "C",
+                "epiphany": "E",
+                "voice_dna": "V",
+            }
+        ],
+    }
+    try:
+        response = client.post("/api/v1/snowflake/step4/stream", json=payload)
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["scene", "scene", "done"]
+        assert events[-1][1]["count"] == 2
+        assert events[-1][1]["root_id"]
+
+        response = client.post("/api/v1/snowflake/step4/stream", json=payload)
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["scene", "scene", "error"]
+        assert events[1][1]["index"] == 1
+        assert events[1][1]["scene"]["title"] == "Scene 1"
+        assert events[-1][1]["status_code"] == 422
+    finally:
+        app.dependency_overrides.clear()
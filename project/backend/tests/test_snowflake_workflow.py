@@ -393,3 +393,89 @@ async def test_step4_scene_persistence():
     )
     assert manager.last_persisted_root_id == "root-abc"
     assert result == mock_scenes
+
+
+class StreamingSceneEngine:
+    def __init__(self, scenes):
+        self._scenes = scenes
+        self.pulled = 0
+
+    async def generate_scene_list_stream(self, root, characters):
+        for scene in self._scenes:
+            self.pulled += 1
+            yield scene
+
+
+def _stream_scene(index: int) -> SceneNode:
+    return SceneNode(
+        branch_id=DEFAULT_BRANCH_ID,
+        title=f"Scene {index}",
+        sequence_index=index,
+        expected_outcome=f"Outcome {index}",
+        conflict_type="internal",
+        actual_outcome="",
+        is_dirty=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_step4_stream_yields_scenes_then_persists():
+    mock_root = SnowflakeRoot(
+        logline="Hero saves world",
+        three_disasters=["A", "B", "C"],
+        ending="Win",
+        theme="Hope",
+    )
+    hero = CharacterSheet(
+        name="Hero", ambition="Save world", conflict="Weakness", epiphany="Strength", voice_dna="Bold"
+    )
+    scenes = [_stream_scene(idx) for idx in range(3)]
+    mock_storage = Mock()
+    mock_storage.save_snowflake.return_value = "root-abc"
+    manager = SnowflakeManager(
+        engine=StreamingSceneEngine(scenes), min_scenes=1, max_scenes=5, storage=mock_storage
+    )
+
+    received = []
+    async for scene in manager.stream_step_4_scenes(mock_root, [hero]):
+        mock_storage.save_snowflake.assert_not_called()
+        received.append(scene)
+
+    assert received == scenes
+    assert all(scene.pov_character_id == hero.entity_id for scene in received)
+    mock_storage.save_snowflake.assert_called_once_with(
+        root=mock_root, characters=[hero], scenes=scenes
+    )
+    assert manager.last_persisted_root_id == "root-abc"
+
+
+@pytest.mark.asyncio
+async def test_step4_stream_fails_fast_on_count_and_invalid_scene():
+    mock_root = SnowflakeRoot(
+        logline="Hero saves world",
+        three_disasters=["A", "B", "C"],
+        ending="Win",
+        theme="Hope",
+    )
+    engine = StreamingSceneEngine([_stream_scene(idx) for idx in range(10)])
+    manager = SnowflakeManager(engine=engine, min_scenes=1, max_scenes=2)
+    with pytest.raises(ValueError, match="Scene count 3"):
+        async for _ in manager.stream_step_4_scenes(mock_root, []):
+            pass
+    assert engine.pulled == 3
+
+    invalid = _stream_scene(1)
+    invalid.conflict_type = " "
+    manager = SnowflakeManager(
+        engine=StreamingSceneEngine([_stream_scene(0), invalid]), min_scenes=1, max_scenes=5
+    )
+    with pytest.raises(ValueError, match="conflict_type"):
+        async for _ in manager.stream_step_4_scenes(mock_root, []):
+            pass
+
+    too_few = SnowflakeManager(
+        engine=StreamingSceneEngine([_stream_scene(0)]), min_scenes=2, max_scenes=5
+    )
+    with pytest.raises(ValueError, match="Scene count 1"):
+        async for _ in too_few.stream_step_4_scenes(mock_root, []):
+            pass
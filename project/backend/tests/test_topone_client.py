@@ -103,3 +103,100 @@ def test_topone_client_uses_config_defaults(monkeypatch):
     assert client.secondary_model == "model-secondary"
     assert client.timeout_seconds == 600.0
     assert client.allowed_models == ("model-primary", "model-secondary")
+
+
+@pytest.mark.asyncio
+async def test_generate_content_reuses_pooled_client():
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"candidates": []})
+
+    client = ToponeClient(api_key="test-key", base_url="https://example.com", http2=False)
+    pooled = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    client._http_client = pooled
+
+    for _ in range(2):
+        await client.generate_content(messages=[{"role": "user", "text": "hi"}])
+
+    assert len(calls) == 2
+    assert client.open() is pooled
+    await client.aclose()
+    assert pooled.is_closed
+    assert not client.is_open
+
+
+@pytest.mark.asyncio
+async def test_open_and_aclose_manage_pool_lifecycle():
+    limits = httpx.Limits(max_connections=3, max_keepalive_connections=2, keepalive_expiry=5.0)
+    client = ToponeClient(api_key="test-key", limits=limits, http2=False)
+
+    assert not client.is_open
+    first = client.open()
+    assert client.open() is first
+    assert client.limits is limits
+
+    await client.aclose()
+    await client.aclose()
+    assert first.is_closed
+
+    async with client:
+        assert client.is_open
+        assert client.open() is not first
+    assert not client.is_open
+
+
+def test_http2_falls_back_when_h2_missing(monkeypatch):
+    monkeypatch.setattr(topone_client, "_http2_supported", lambda: False)
+    assert ToponeClient(api_key="k", http2=True).http2 is False
+
+    monkeypatch.setattr(topone_client, "_http2_supported", lambda: True)
+    assert ToponeClient(api_key="k", http2=True).http2 is True
+    assert ToponeClient(api_key="k", http2=False).http2 is False
+
+
+@pytest.mark.asyncio
+async def test_stream_generate_content_yields_sse_text_deltas():
+    captured: dict = {}
+    chunks = [
+        {"candidates": [{"content": {"parts": [{"text": "think", "thought": True}]}}]},
+        {"candidates": [{"content": {"parts": [{"text": "Hello "}]}}]},
+        {"candidates": [{"content": {"parts": [{"text": "world"}]}}]},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        captured["url"] = request.url
+        return httpx.Response(
+            200, content=body.encode(), headers={"content-type": "text/event-stream"}
+        )
+
+    client = ToponeClient(api_key="test-key", base_url="https://example.com")
+
+    deltas = [
+        text
+        async for text in client.stream_generate_content(
+            messages=[{"role": "user", "text": "hi"}],
+            transport=httpx.MockTransport(handler),
+        )
+    ]
+
+    assert deltas == ["Hello ", "world"]
+    assert captured["url"].path.endswith(":streamGenerateContent")
+    assert captured["url"].params["alt"] == "sse"
+
+
+@pytest.mark.asyncio
+async def test_stream_generate_content_raises_on_http_error():
+    client = ToponeClient(api_key="test-key", base_url="https://example.com")
+    transport = httpx.MockTransport(lambda request: httpx.Response(500))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        async for _ in client.stream_generate_content(
+            messages=[{"role": "user", "text": "hi"}],
+            transport=transport,
+        ):
+            pass
@@ -1,7 +1,12 @@
 import pytest
 
-from app.llm.schemas import SceneRenderPayload
-from app.llm.topone_gateway import ToponeGateway
+from app.llm.resilience import InvalidModelOutputError
+from app.llm.schemas import SceneRenderPayload, StateProposal
+from app.llm.topone_gateway import (
+    ToponeGateway,
+    _type_adapter,
+    _validate_structured_output,
+)
 
 
 class StubToponeClient:
@@ -31,6 +36,24 @@ class StubToponeClient:
             ]
         }
 
+    async def stream_generate_content(
+        self,
+        *,
+        messages,
+        system_instruction=None,
+        generation_config=None,
+        model=None,
+    ):
+        self.calls.append(
+            {
+                "system_instruction": system_instruction,
+                "model": model,
+                "messages": messages,
+            }
+        )
+        for chunk in ("Rendered ", "scene ", "text"):
+            yield chunk
+
 
 @pytest.mark.asyncio
 async def test_render_scene_force_adds_drama_instruction():
@@ -69,3 +92,38 @@ async def test_render_scene_standard_keeps_prompt_clean():
     await gateway.render_scene(payload)
 
     assert "戏剧性优先" not in client.calls[0]["system_instruction"]
+
+
+@pytest.mark.asyncio
+async def test_render_scene_stream_uses_same_prompt_as_render_scene():
+    client = StubToponeClient()
+    gateway = ToponeGateway(client)
+    payload = SceneRenderPayload(
+        voice_dna="冷静",
+        conflict_type="internal",
+        outline_requirement="保持原计划",
+        user_intent="强制推进剧情",
+        expected_outcome="主角继续前进",
+        world_state={"hp": "50%"},
+        force_reason="必须现在推进",
+    )
+
+    await gateway.render_scene(payload)
+    chunks = [chunk async for chunk in gateway.render_scene_stream(payload)]
+
+    assert "".join(chunks) == "Rendered scene text"
+    assert client.calls[0] == client.calls[1]
+    assert client.calls[1]["model"] == "gemini-default"
+
+
+def test_structured_validation_reuses_adapter_and_classifies_errors():
+    assert _type_adapter(list[StateProposal]) is _type_adapter(list[StateProposal])
+
+    fenced = '```json\n[{"entity_id": "e1", "confidence": 0.9, "semantic_states_patch": {}}]\n```'
+    proposals = _validate_structured_output(fenced, list[StateProposal])
+    assert proposals[0].entity_id == "e1"
+
+    with pytest.raises(InvalidModelOutputError, match="invalid JSON model output"):
+        _validate_structured_output('[{"entity_id": ', list[StateProposal])
+    with pytest.raises(InvalidModelOutputError, match="invalid structured output schema"):
+        _validate_structured_output('[{"entity_id": 1}]', list[StateProposal])
@@ -159,6 +159,156 @@ async def test_decide_runs_perceive_deliberate_act_pipeline():
     action = await engine.decide("agent-1", {"scene": "ctx"})
 
     assert action == expected
-    engine.perceive.assert_awaited_once_with("agent-1", {"scene": "ctx"})
-    engine.deliberate.assert_awaited_once_with("agent-1")
-    engine.act.assert_awaited_once_with("agent-1", {"scene": "ctx"})
+    context = engine.perceive.await_args.kwargs["context"]
+    assert context.agent_id == "agent-1"
+    engine.perceive.assert_awaited_once_with("agent-1", {"scene": "ctx"}, context=context)
+    engine.deliberate.assert_awaited_once_with("agent-1", context=context)
+    engine.act.assert_awaited_once_with("agent-1", {"scene": "ctx"}, context=context)
+
+
+class _RoundStorage(_FakeStorage):
+    def __init__(self, agent_state):
+        super().__init__(agent_state=agent_state)
+        self.loads = 0
+        self.saved: list[dict[str, object]] = []
+
+    def get_agent_state(self, agent_id: str):
+        self.loads += 1
+        return super().get_agent_state(agent_id)
+
+    def save_agent_round_state(self, **kwargs):
+        self.saved.append(kwargs)
+        return {"id": kwargs["agent_id"], "version": kwargs["expected_version"] + 1}
+
+
+@pytest.mark.asyncio
+async def test_decide_loads_state_once_and_writes_back_once():
+    agent_state = SimpleNamespace(
+        beliefs=json.dumps({"world": {"location": "town"}}),
+        desires=json.dumps([_build_desire("d1", priority=5, expires_at_scene=None)]),
+        last_updated_scene=1,
+        version=3,
+    )
+    storage = _RoundStorage(agent_state)
+    expected = _build_action("agent-1")
+    llm = SimpleNamespace(
+        generate_agent_perception=AsyncMock(
+            return_value={"beliefs_patch": {"world": {"weather": "rain"}}}
+        ),
+        generate_agent_intentions=AsyncMock(return_value=[_build_intention()]),
+        generate_agent_action=AsyncMock(return_value=expected),
+    )
+    engine = CharacterAgentEngine(storage=storage, llm=llm)
+
+    action = await engine.decide("agent-1", {"scene": "ctx"})
+
+    assert action == expected
+    assert storage.loads == 1
+    assert storage.updated_beliefs is None
+    llm.generate_agent_intentions.assert_awaited_once()
+    assert storage.saved == [
+        {
+            "agent_id": "agent-1",
+            "expected_version": 3,
+            "beliefs": {"world": {"location": "town", "weather": "rain"}},
+            "intentions": [_build_intention().model_dump()],
+        }
+    ]
+
+
+def _build_action(agent_id: str, action_type: str = "investigate") -> AgentAction:
+    return AgentAction(
+        agent_id=agent_id,
+        internal_thought="think",
+        action_type=action_type,
+        action_target="target-1",
+        dialogue=None,
+        action_description="search",
+    )
+
+
+@pytest.mark.asyncio
+async def test_decide_batch_packs_perception_and_action_calls():
+    storage = _FakeStorage()
+    updates: list[str] = []
+    storage.update_agent_beliefs = lambda *, agent_id, beliefs_patch: updates.append(agent_id)
+    llm = SimpleNamespace(
+        generate_agent_perceptions_batch=AsyncMock(
+            return_value={
+                "a1": {"beliefs_patch": {"loc": "gate"}},
+                "a2": {"beliefs_patch": {"loc": "hall"}},
+            }
+        ),
+        generate_agent_actions_batch=AsyncMock(
+            return_value={"a1": _build_action("a1").model_dump()}
+        ),
+        generate_agent_perception=AsyncMock(),
+        generate_agent_action=AsyncMock(),
+    )
+    engine = CharacterAgentEngine(storage=storage, llm=llm)
+    engine.deliberate = AsyncMock(
+        side_effect=lambda agent_id: [] if agent_id == "a2" else [_build_intention()]
+    )
+
+    actions = await engine.decide_batch(["a1", "a2"], {"scene": "ctx"})
+
+    assert [action.agent_id for action in actions] == ["a1", "a2"]
+    assert actions[0].action_type == "investigate"
+    assert actions[1].action_type == "wait"
+    assert updates == ["a1", "a2"]
+    llm.generate_agent_perceptions_batch.assert_awaited_once()
+    batch_requests = llm.generate_agent_actions_batch.await_args.args[0]
+    assert [item["profile"]["agent_id"] for item in batch_requests] == ["a1"]
+    llm.generate_agent_perception.assert_not_awaited()
+    llm.generate_agent_action.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_decide_batch_falls_back_per_agent_on_partial_failure():
+    storage = _FakeStorage()
+    llm = SimpleNamespace(
+        generate_agent_perceptions_batch=AsyncMock(
+            return_value={"a1": {"beliefs_patch": {"loc": "gate"}}, "a2": {"beliefs_patch": 3}}
+        ),
+        generate_agent_actions_batch=AsyncMock(
+            return_value={
+                "a1": _build_action("a2").model_dump(),
+                "a2": _build_action("a2").model_dump(),
+            }
+        ),
+        generate_agent_perception=AsyncMock(return_value={"beliefs_patch": {"loc": "hall"}}),
+        generate_agent_action=AsyncMock(return_value=_build_action("a1", "retreat")),
+    )
+    engine = CharacterAgentEngine(storage=storage, llm=llm)
+    engine.deliberate = AsyncMock(return_value=[_build_intention()])
+
+    actions = await engine.decide_batch(["a1", "a2"], {"scene": "ctx"})
+
+    llm.generate_agent_perception.assert_awaited_once()
+    assert llm.generate_agent_perception.await_args.args[0] == {"agent_id": "a2"}
+    llm.generate_agent_action.assert_awaited_once()
+    assert llm.generate_agent_action.await_args.args[0] == {"agent_id": "a1"}
+    assert [action.action_type for action in actions] == ["retreat", "investigate"]
+
+
+@pytest.mark.asyncio
+async def test_decide_batch_falls_back_when_whole_batch_invalid():
+    llm = SimpleNamespace(
+        generate_agent_perceptions_batch=AsyncMock(side_effect=ValueError("bad json")),
+        generate_agent_actions_batch=AsyncMock(return_value=["not", "a", "map"]),
+        generate_agent_perception=AsyncMock(return_value={"beliefs_patch": {}}),
+        generate_agent_action=AsyncMock(
+            side_effect=lambda profile, scene, intents: _build_action(profile["agent_id"])
+        ),
+    )
+    engine = CharacterAgentEngine(storage=_FakeStorage(), llm=llm)
+    engine.deliberate = AsyncMock(return_value=[_build_intention()])
+
+    actions = await engine.decide_batch(["a1", "a2"], {"scene": "ctx"})
+
+    assert [action.agent_id for action in actions] == ["a1", "a2"]
+    assert llm.generate_agent_perception.await_count == 2
+    assert llm.generate_agent_action.await_count == 2
+
+    with pytest.raises(ValueError, match="duplicate agent_id"):
+        await engine.decide_batch(["a1", "a1"], {"scene": "ctx"})
@@ -75,6 +75,23 @@ def test_topone_timeout_seconds_accepts_minimum(monkeypatch):
     importlib.reload(config)
 
 
+def test_simulation_agent_timeout_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("SIMULATION_AGENT_TIMEOUT_SECONDS", raising=False)
+    reloaded = importlib.reload(config)
+    assert reloaded.SIMULATION_AGENT_TIMEOUT_SECONDS == 0.0
+
+
+def test_llm_cache_disabled_by_default_and_skips_creative_roles(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_BACKEND", raising=False)
+    for role in ("ARCHITECT", "REASONING", "CREATIVE", "FLASH"):
+        monkeypatch.delenv(f"LLM_CACHE_TTL_{role}_SECONDS", raising=False)
+    reloaded = importlib.reload(config)
+    assert reloaded.LLM_CACHE_BACKEND == "none"
+    assert reloaded.LLM_CACHE_TTL_SECONDS["creative"] == 0.0
+    assert reloaded.LLM_CACHE_TTL_SECONDS["architect"] == 0.0
+    assert reloaded.LLM_CACHE_TTL_SECONDS["reasoning"] > 0
+
+
 def test_scene_min_count_exceeds_max_raises(monkeypatch):
     monkeypatch.setenv("SCENE_MIN_COUNT", "10")
     monkeypatch.setenv("SCENE_MAX_COUNT", "5")
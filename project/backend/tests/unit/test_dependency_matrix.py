@@ -92,11 +92,57 @@ def test_dependency_matrix_query_uses_entity_ids_only():
     )
 
     matrix = matrix_cls(entity_to_scenes)
+    build_calls = entity_to_scenes.getitem_calls
 
     impacted = matrix.get_impacted_scenes(["e1", "e3"])
 
     assert set(impacted) == {"scene-alpha", "scene-3"}
-    assert entity_to_scenes.getitem_calls == 2
+    assert entity_to_scenes.getitem_calls == build_calls
+
+
+def test_dependency_matrix_unknown_entity_raises():
+    matrix_cls = _get_dependency_matrix_class()
+
+    matrix = matrix_cls.from_scene_entities({"scene-alpha": ["e1"]})
+
+    with pytest.raises(KeyError):
+        matrix.get_impacted_scenes(["missing"])
+
+
+def test_dependency_matrix_filters_scenes_after_sequence():
+    matrix_cls = _get_dependency_matrix_class()
+
+    matrix = matrix_cls.from_scene_entities(
+        {
+            "scene-3": ["e1"],
+            "scene-1": ["e1", "e2"],
+            "scene-2": ["e2"],
+            "scene-4": [],
+        },
+        scene_sequences={"scene-1": 1, "scene-2": 2, "scene-3": 3, "scene-4": 4},
+    )
+
+    assert matrix.scene_count == 4
+    assert matrix.get_impacted_scenes(["e1"]) == ["scene-1", "scene-3"]
+    assert matrix.filter_scenes_after(
+        ["scene-3", "scene-1", "scene-2"], min_scene_seq=1
+    ) == ["scene-2", "scene-3"]
+    assert matrix.get_impacted_scenes_after(["e1", "e2"], min_scene_seq=2) == [
+        "scene-3"
+    ]
+    assert matrix.get_impacted_scenes_after(["e1"], min_scene_seq=3) == []
+
+
+def test_dependency_matrix_filter_requires_scene_sequence():
+    matrix_cls = _get_dependency_matrix_class()
+
+    matrix = matrix_cls.from_scene_entities(
+        {"scene-1": ["e1"], "scene-2": ["e1"]},
+        scene_sequences={"scene-1": 1},
+    )
+
+    with pytest.raises(KeyError):
+        matrix.filter_scenes_after(["scene-2"], min_scene_seq=0)
 
 
 def test_dependency_matrix_accuracy_metrics():
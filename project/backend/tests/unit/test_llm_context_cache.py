@@ -0,0 +1,185 @@
+import json
+
+import httpx
+import pytest
+
+from app.llm.context_cache import ContextCache, SharedContext
+from app.llm.topone_gateway import ToponeGateway
+from app.models import CharacterSheet, SnowflakeRoot
+from app.services.topone_client import ToponeClient
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CachingClient:
+    def __init__(self, *, create_error=None, cached_call_error=None) -> None:
+        self.default_model = "default-model"
+        self.secondary_model = "secondary-model"
+        self.created: list[dict] = []
+        self.calls: list[dict] = []
+        self._create_error = create_error
+        self._cached_call_error = cached_call_error
+
+    async def create_cached_content(self, *, model, system_instruction, text, ttl_seconds):
+        self.created.append({"model": model, "system_instruction": system_instruction, "text": text})
+        if self._create_error is not None:
+            raise self._create_error
+        return {"name": f"cachedContents/{len(self.created)}"}
+
+    async def generate_content(
+        self,
+        *,
+        messages,
+        system_instruction=None,
+        generation_config=None,
+        model=None,
+        cached_content=None,
+    ):
+        self.calls.append(
+            {
+                "text": messages[0]["text"],
+                "system_instruction": system_instruction,
+                "cached_content": cached_content,
+            }
+        )
+        if cached_content is not None and self._cached_call_error is not None:
+            raise self._cached_call_error
+        text = json.dumps([{"title": "Chapter", "focus": "F"}])
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+ROOT = SnowflakeRoot(logline="L", three_disasters=["A", "B", "C"], ending="E", theme="T")
+CHARACTERS = [
+    CharacterSheet(name="Hero", ambition="A", conflict="C", epiphany="E", voice_dna="V" * 200)
+]
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://example.com")
+    return httpx.HTTPStatusError(
+        "boom", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+def _cache(clock=None) -> ContextCache:
+    return ContextCache(ttl_seconds=600, min_prefix_chars=100, clock=clock or FakeClock())
+
+
+@pytest.mark.asyncio
+async def test_chapter_lists_share_one_cached_prefix():
+    client = CachingClient()
+    gateway = ToponeGateway(client, context_cache=_cache())
+
+    for sequence in (1, 2):
+        act = {"id": f"act-{sequence}", "prompt_constraint": "no magic" if sequence == 2 else None}
+        await gateway.generate_chapter_list(ROOT, act, CHARACTERS)
+
+    assert len(client.created) == 1
+    assert "characters:" in client.created[0]["text"]
+    assert [call["cached_content"] for call in client.calls] == ["cachedContents/1"] * 2
+    assert all(call["system_instruction"] is None for call in client.calls)
+    assert client.calls[0]["text"].startswith("act: {'id': 'act-1'")
+    assert "prompt_constraint: no magic" in client.calls[1]["text"]
+
+
+@pytest.mark.asyncio
+async def test_context_cache_refreshes_before_expiry():
+    clock = FakeClock()
+    client = CachingClient()
+    gateway = ToponeGateway(client, context_cache=_cache(clock))
+
+    await gateway.generate_story_anchors(ROOT, CHARACTERS, [{"id": "act-1"}])
+    clock.now += 600 - 30
+    await gateway.generate_story_anchors(ROOT, CHARACTERS, [{"id": "act-1"}])
+
+    assert len(client.created) == 2
+    assert client.calls[-1]["cached_content"] == "cachedContents/2"
+
+
+@pytest.mark.asyncio
+async def test_context_cache_falls_back_when_creation_fails():
+    client = CachingClient(create_error=_status_error(400))
+    gateway = ToponeGateway(client, context_cache=_cache())
+
+    for _ in range(2):
+        await gateway.generate_act_list(ROOT, CHARACTERS)
+
+    assert len(client.created) == 1
+    assert all(call["cached_content"] is None for call in client.calls)
+    assert all(call["system_instruction"] for call in client.calls)
+    assert "three_disasters" in client.calls[0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_context_cache_falls_back_when_cached_call_rejected():
+    client = CachingClient(cached_call_error=_status_error(404))
+    gateway = ToponeGateway(client, context_cache=_cache())
+
+    result = await gateway.generate_act_list(ROOT, CHARACTERS)
+
+    assert result == [{"title": "Chapter", "focus": "F"}]
+    assert [call["cached_content"] for call in client.calls] == ["cachedContents/1", None]
+
+    await gateway.generate_act_list(ROOT, CHARACTERS)
+    assert len(client.created) == 1
+    assert client.calls[-1]["cached_content"] is None
+
+
+@pytest.mark.asyncio
+async def test_short_prefix_skips_context_cache():
+    cache = _cache()
+    client = CachingClient()
+    context = SharedContext(system_prompt="sys", prefix="short", suffix="s")
+
+    assert await cache.resolve(client, model="default-model", context=context) is None
+    assert client.created == []
+
+
+@pytest.mark.asyncio
+async def test_client_creates_and_uses_cached_content():
+    captured: list[tuple[str, dict]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content.decode())
+        captured.append((request.url.path, body))
+        if request.url.path.endswith("/cachedContents"):
+            return httpx.Response(200, json={"name": "cachedContents/abc"})
+        return httpx.Response(200, json={"candidates": []})
+
+    client = ToponeClient(api_key="test-key", base_url="https://example.com", http2=False)
+    transport = httpx.MockTransport(handler)
+
+    created = await client.create_cached_content(
+        model=client.default_model,
+        system_instruction="sys",
+        text="prefix",
+        ttl_seconds=600,
+        transport=transport,
+    )
+    await client.generate_content(
+        messages=[{"role": "user", "text": "suffix"}],
+        cached_content=created["name"],
+        transport=transport,
+    )
+
+    (create_path, create_body), (_, generate_body) = captured
+    assert create_path == "/v1beta/cachedContents"
+    assert create_body["model"] == f"models/{client.default_model}"
+    assert create_body["ttl"] == "600s"
+    assert create_body["systemInstruction"]["parts"][0]["text"] == "sys"
+    assert generate_body["cachedContent"] == "cachedContents/abc"
+    assert "systemInstruction" not in generate_body
+
+    with pytest.raises(ValueError, match="cached_content"):
+        await client.generate_content(
+            messages=[{"role": "user", "text": "suffix"}],
+            system_instruction="sys",
+            cached_content="cachedContents/abc",
+            transport=transport,
+        )
@@ -268,3 +268,21 @@ async def test_render_scene_uses_smart_render_prompt():
     prompt = require_prompt(get_prompt_submodule("renderer"), "SMART_RENDER_PROMPT")
     messages = engine._call_model.await_args.kwargs["messages"]
     assert_messages_use_prompt(messages, prompt)
+
+
+@pytest.mark.asyncio
+async def test_generate_agent_batches_use_batch_prompts():
+    llm_engine = get_llm_engine_class()
+    engine = llm_engine(client=Mock())
+    engine._call_model = AsyncMock(return_value={})
+    module = get_prompt_submodule("character_agent")
+
+    await engine.generate_agent_perceptions_batch([{"agent_id": "a1"}], "scene")
+    messages = engine._call_model.await_args.kwargs["messages"]
+    assert_messages_use_prompt(messages, require_prompt(module, "BATCH_PERCEIVE_PROMPT"))
+
+    await engine.generate_agent_actions_batch(
+        [{"profile": {"agent_id": "a1"}, "intentions": [{"intent": "x"}]}], "scene"
+    )
+    messages = engine._call_model.await_args.kwargs["messages"]
+    assert_messages_use_prompt(messages, require_prompt(module, "BATCH_ACT_PROMPT"))
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from app.llm.json_stream import JsonArrayStreamParser
+from app.llm.resilience import InvalidModelOutputError
+from app.llm.topone_gateway import ToponeGateway
+from app.models import SnowflakeRoot
+
+
+def _scene(index: int, **overrides) -> dict:
+    scene = {
+        "branch_id": "main",
+        "title": f'Scene "{index}" [draft]',
+        "sequence_index": index,
+        "expected_outcome": "Outcome, with {braces}",
+        "conflict_type": "internal",
+        "actual_outcome": "",
+        "is_dirty": False,
+    }
+    scene.update(overrides)
+    return scene
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64])
+def test_parser_emits_elements_across_arbitrary_chunk_boundaries(size):
+    items = [_scene(1), _scene(2), {"nested": [1, {"a": "\\\""}]}]
+    text = "```json\n" + json.dumps(items, ensure_ascii=False, indent=2) + "\n```"
+    parser = JsonArrayStreamParser()
+
+    parsed: list = []
+    for chunk in _chunks(text, size):
+        parsed.extend(parser.feed(chunk))
+    parser.close()
+
+    assert parsed == items
+    assert parser.finished
+    assert parser.count == 3
+
+
+def test_parser_yields_first_element_before_array_closes():
+    parser = JsonArrayStreamParser()
+
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(": 2}]") == [{"b": 2}]
+    assert parser.feed("[]") == []
+    assert JsonArrayStreamParser().feed("[]") == []
+
+
+def test_parser_rejects_truncated_and_malformed_output():
+    truncated = JsonArrayStreamParser()
+    truncated.feed('[{"a": 1}, {"b": 2')
+    with pytest.raises(InvalidModelOutputError, match="truncated"):
+        truncated.close()
+
+    with pytest.raises(InvalidModelOutputError, match="expected array"):
+        JsonArrayStreamParser().feed('{"a": 1}')
+
+    with pytest.raises(InvalidModelOutputError, match="invalid JSON"):
+        JsonArrayStreamParser().feed("[{a: 1},")
+
+    with pytest.raises(InvalidModelOutputError, match="empty array element"):
+        JsonArrayStreamParser().feed('[{"a": 1},,')
+
+
+class StreamingClient:
+    default_model = "default-model"
+    secondary_model = "secondary-model"
+
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = chunks
+        self.pulled = 0
+        self.closed = False
+
+    async def stream_generate_content(self, **kwargs):
+        try:
+            for chunk in self._chunks:
+                self.pulled += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+ROOT = SnowflakeRoot(logline="L", three_disasters=["A", "B", "C"], ending="E", theme="T")
+
+
+@pytest.mark.asyncio
+async def test_gateway_streams_validated_scenes_and_fails_fast():
+    good = json.dumps([_scene(1), _scene(2)])
+    client = StreamingClient(_chunks(good, 16))
+    scenes = [scene async for scene in ToponeGateway(client).generate_scene_list_stream(ROOT, [])]
+    assert [scene.sequence_index for scene in scenes] == [1, 2]
+
+    bad = "[" + json.dumps(_scene(1)) + "," + json.dumps(_scene(2, title="")) + ","
+    client = StreamingClient([bad, json.dumps(_scene(3)) + "]"])
+    received = []
+    with pytest.raises(InvalidModelOutputError, match="at scene 2"):
+        async for scene in ToponeGateway(client).generate_scene_list_stream(ROOT, []):
+            received.append(scene)
+
+    assert [scene.sequence_index for scene in received] == [1]
+    assert client.pulled == 1
+    assert client.closed
@@ -0,0 +1,109 @@
+import json
+from typing import AsyncIterator
+
+import pytest
+
+from app.llm.replay import LLMCassette, ReplayDivergenceError, ReplayingLLM
+from app.models import ConvergenceCheck, Intention
+
+
+class FakeEngine:
+    def __init__(self, *, offline: bool = False) -> None:
+        self.offline = offline
+        self.calls = 0
+
+    def _tick(self) -> None:
+        if self.offline:
+            raise AssertionError("replay must not call the engine")
+        self.calls += 1
+
+    async def generate_agent_perception(
+        self, profile: dict[str, object], scene_context: str
+    ) -> dict[str, object]:
+        self._tick()
+        return {"beliefs_patch": {"seen": f"{scene_context}#{self.calls}"}}
+
+    async def generate_agent_intentions(
+        self, profile: dict[str, object], scene_context: str, limit: int = 1
+    ) -> list[Intention]:
+        self._tick()
+        return [
+            Intention(
+                id="i1",
+                desire_id="d1",
+                action_type="investigate",
+                target="door",
+                expected_outcome="open",
+                risk_assessment=0.2,
+            )
+        ][:limit]
+
+    async def check_convergence(
+        self, world_state: dict[str, object], next_anchor: dict[str, object]
+    ) -> ConvergenceCheck:
+        self._tick()
+        return ConvergenceCheck(next_anchor_id="a1", distance=0.4, convergence_needed=True)
+
+    async def render_scene_stream(self, payload: dict[str, object]) -> AsyncIterator[str]:
+        self._tick()
+        for chunk in ("雨", "夜"):
+            yield chunk
+
+    def sync_helper(self) -> str:
+        return "passthrough"
+
+
+async def _run(llm) -> list:
+    return [
+        await llm.generate_agent_perception({"agent_id": "a"}, "ctx"),
+        await llm.generate_agent_perception({"agent_id": "a"}, "ctx"),
+        await llm.generate_agent_intentions({"agent_id": "a"}, scene_context="ctx"),
+        await llm.check_convergence({"door": True}, {"id": "a1"}),
+        [chunk async for chunk in llm.render_scene_stream({"scene_id": "s1"})],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replay_serves_recorded_responses_without_calling_engine(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    recorder = ReplayingLLM(FakeEngine(), LLMCassette(path, mode="record"))
+    recorded = await _run(recorder)
+
+    assert recorder.sync_helper() == "passthrough"
+    assert recorder.cassette.recorded == 5
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines[0]["call_site"] == "FakeEngine.generate_agent_perception"
+    assert lines[2]["request"]["limit"] == 1
+
+    replayer = ReplayingLLM(FakeEngine(offline=True), LLMCassette(path, mode="replay"))
+    replayed = await _run(replayer)
+
+    assert replayed == recorded
+    assert replayed[0] != replayed[1]
+    assert isinstance(replayed[2][0], Intention)
+    assert isinstance(replayed[3], ConvergenceCheck)
+    assert replayed[4] == ["雨", "夜"]
+    assert replayer.cassette.report()["served"] == 5
+    with pytest.raises(ReplayDivergenceError, match="sync_helper"):
+        replayer.sync_helper()
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_divergent_requests(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    await _run(ReplayingLLM(FakeEngine(), LLMCassette(path, mode="record")))
+    replayer = ReplayingLLM(FakeEngine(offline=True), LLMCassette(path, mode="replay"))
+
+    with pytest.raises(ReplayDivergenceError, match="world_state"):
+        await replayer.check_convergence({"door": False}, {"id": "a1"})
+
+    (divergence,) = replayer.cassette.report()["divergences"]
+    assert divergence["call_site"] == "FakeEngine.check_convergence"
+    assert divergence["changed_fields"] == ["world_state"]
+
+
+def test_cassette_rejects_missing_file_and_unknown_mode(tmp_path):
+    with pytest.raises(ValueError, match="not found"):
+        LLMCassette(tmp_path / "missing.jsonl", mode="replay")
+    with pytest.raises(ValueError, match="record/replay"):
+        LLMCassette(tmp_path / "x.jsonl", mode="live")
@@ -0,0 +1,182 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.llm.resilience import (
+    LatencyTracker,
+    ResilientCaller,
+    RetryPolicy,
+    decorrelated_jitter,
+    hedged_call,
+    is_retryable_error,
+)
+from app.llm.topone_gateway import ToponeGateway
+
+_ROOT_JSON = json.dumps(
+    {"logline": "L", "three_disasters": ["A", "B", "C"], "ending": "E", "theme": "T"}
+)
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://example.com")
+    return httpx.HTTPStatusError(
+        "boom", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+class ScriptedClient:
+    def __init__(self, outcomes) -> None:
+        self._outcomes = list(outcomes)
+        self.calls = 0
+        self.default_model = "default-model"
+        self.secondary_model = "secondary-model"
+
+    async def generate_content(
+        self,
+        *,
+        messages,
+        system_instruction=None,
+        generation_config=None,
+        model=None,
+    ):
+        self.calls += 1
+        outcome = self._outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return {"candidates": [{"content": {"parts": [{"text": outcome}]}}]}
+
+
+def _gateway(client, policy: RetryPolicy, sleeps: list[float]) -> ToponeGateway:
+    gateway = ToponeGateway(client, retry_policy=policy)
+
+    async def _sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    gateway._resilience = ResilientCaller(policy, sleep=_sleep, rng=lambda low, high: high)
+    return gateway
+
+
+def test_retryable_errors_and_jitter_bounds():
+    assert is_retryable_error(_status_error(503))
+    assert is_retryable_error(_status_error(429))
+    assert not is_retryable_error(_status_error(400))
+    assert is_retryable_error(httpx.ReadTimeout("slow"))
+    assert not is_retryable_error(ValueError("nope"))
+
+    policy = RetryPolicy(base_delay_seconds=1.0, max_delay_seconds=5.0)
+    assert decorrelated_jitter(1.0, policy, lambda low, high: high) == 3.0
+    assert decorrelated_jitter(3.0, policy, lambda low, high: high) == 5.0
+    assert decorrelated_jitter(3.0, policy, lambda low, high: low) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_gateway_retries_transient_status_with_jitter():
+    client = ScriptedClient([_status_error(503), httpx.ConnectError("reset"), _ROOT_JSON])
+    sleeps: list[float] = []
+    gateway = _gateway(client, RetryPolicy(max_attempts=3, base_delay_seconds=0.5), sleeps)
+
+    root = await gateway.generate_root_structure("idea")
+
+    assert root.logline == "L"
+    assert client.calls == 3
+    assert sleeps == [1.5, 4.5]
+
+
+@pytest.mark.asyncio
+async def test_gateway_retries_invalid_json_without_sleep_and_stops_on_client_errors():
+    client = ScriptedClient(["not-json", _ROOT_JSON])
+    sleeps: list[float] = []
+    gateway = _gateway(client, RetryPolicy(max_attempts=2), sleeps)
+
+    assert (await gateway.generate_root_structure("idea")).theme == "T"
+    assert client.calls == 2
+    assert sleeps == []
+
+    failing = ScriptedClient([_status_error(400), _ROOT_JSON])
+    gateway = _gateway(failing, RetryPolicy(max_attempts=3), sleeps)
+    with pytest.raises(httpx.HTTPStatusError):
+        await gateway.generate_root_structure("idea")
+    assert failing.calls == 1
+
+    exhausted = ScriptedClient(["bad", "still bad"])
+    gateway = _gateway(exhausted, RetryPolicy(max_attempts=2), sleeps)
+    with pytest.raises(ValueError, match="invalid JSON"):
+        await gateway.generate_root_structure("idea")
+
+
+def test_latency_tracker_p95_requires_min_samples():
+    tracker = LatencyTracker(window=100, min_samples=5)
+    for value in (1.0, 2.0, 3.0, 4.0):
+        tracker.record(value)
+    assert tracker.p95() is None
+    for value in range(5, 21):
+        tracker.record(float(value))
+    assert tracker.p95() == 19.0
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_takes_first_good_response_and_cancels_loser():
+    started: list[int] = []
+    cancelled: list[int] = []
+
+    async def factory() -> str:
+        index = len(started)
+        started.append(index)
+        try:
+            await asyncio.sleep(1.0 if index == 0 else 0.0)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return f"response-{index}"
+
+    result = await hedged_call(factory, delay=0.01)
+
+    assert result == "response-1"
+    assert started == [0, 1]
+    assert cancelled == [0]
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_skips_hedge_when_primary_is_fast():
+    calls: list[int] = []
+
+    async def factory() -> str:
+        calls.append(1)
+        return "fast"
+
+    assert await hedged_call(factory, delay=0.5) == "fast"
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_total_timeout_stops_retries_and_bounds_stuck_attempts():
+    now = [0.0]
+    sleeps: list[float] = []
+    calls: list[int] = []
+
+    async def _sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    async def slow_timeout() -> str:
+        calls.append(1)
+        now[0] += 8.0
+        raise httpx.ReadTimeout("slow")
+
+    policy = RetryPolicy(max_attempts=3, base_delay_seconds=1.0, total_timeout_seconds=10.0)
+    caller = ResilientCaller(policy, sleep=_sleep, rng=lambda low, high: high, clock=lambda: now[0])
+    with pytest.raises(httpx.ReadTimeout):
+        await caller.run(slow_timeout)
+    assert calls == [1]
+    assert sleeps == []
+
+    async def stuck() -> str:
+        await asyncio.sleep(10)
+        return "late"
+
+    with pytest.raises(TimeoutError):
+        await ResilientCaller(RetryPolicy(total_timeout_seconds=0.01)).run(stuck)
+    with pytest.raises(ValueError, match="total_timeout_seconds"):
+        RetryPolicy(total_timeout_seconds=0)
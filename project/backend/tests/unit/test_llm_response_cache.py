@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from app.llm.response_cache import (
+    InMemoryLRUCache,
+    SQLiteResponseCache,
+    build_response_cache,
+    bypass_response_cache,
+    response_cache_key,
+)
+from app.llm.schemas import LogicCheckPayload
+from app.llm.topone_gateway import LLMRole, ToponeGateway
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingClient:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.calls = 0
+        self.default_model = "default-model"
+        self.secondary_model = "secondary-model"
+
+    async def generate_content(
+        self,
+        *,
+        messages,
+        system_instruction=None,
+        generation_config=None,
+        model=None,
+    ):
+        self.calls += 1
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+
+
+_LOGIC_OK = json.dumps(
+    {
+        "ok": True,
+        "mode": "standard",
+        "decision": "execute",
+        "impact_level": "local",
+        "warnings": [],
+    }
+)
+
+
+def _logic_payload() -> LogicCheckPayload:
+    return LogicCheckPayload(
+        outline_requirement="keep plan",
+        world_state={"hp": "100%"},
+        user_intent="advance",
+        mode="standard",
+    )
+
+
+def test_response_cache_key_is_stable_and_sensitive():
+    base = dict(model="m", system_prompt="sys", user_text="u", generation_config={"a": 1, "b": 2})
+    assert response_cache_key(**base) == response_cache_key(
+        **{**base, "generation_config": {"b": 2, "a": 1}}
+    )
+    assert response_cache_key(**base) != response_cache_key(**{**base, "model": "m2"})
+    assert response_cache_key(**base) != response_cache_key(**{**base, "user_text": "u2"})
+
+
+def test_in_memory_lru_evicts_oldest_and_expires():
+    clock = FakeClock()
+    cache = InMemoryLRUCache(2, clock=clock)
+    cache.set("a", "1", ttl_seconds=10)
+    cache.set("b", "2", ttl_seconds=10)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", ttl_seconds=10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    clock.now += 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_sqlite_cache_persists_and_expires(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "cache" / "llm.sqlite3"
+    cache = SQLiteResponseCache(path, clock=clock)
+    cache.set("k", "value", ttl_seconds=5)
+    cache.close()
+
+    reopened = SQLiteResponseCache(path, clock=clock)
+    assert reopened.get("k") == "value"
+    clock.now += 6
+    assert reopened.get("k") is None
+    reopened.close()
+
+
+def test_build_response_cache_rejects_unknown_backend(tmp_path):
+    assert build_response_cache("none", max_entries=1, sqlite_path=tmp_path / "x") is None
+    with pytest.raises(ValueError, match="unsupported llm cache backend"):
+        build_response_cache("redis", max_entries=1, sqlite_path=tmp_path / "x")
+
+
+@pytest.mark.asyncio
+async def test_gateway_serves_repeated_structured_calls_from_cache():
+    client = CountingClient(_LOGIC_OK)
+    gateway = ToponeGateway(client, cache=InMemoryLRUCache(8))
+
+    first = await gateway.logic_check(_logic_payload())
+    second = await gateway.logic_check(_logic_payload())
+
+    assert client.calls == 1
+    assert second == first
+
+    with bypass_response_cache():
+        await gateway.logic_check(_logic_payload())
+    assert client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_gateway_revalidates_cached_text_and_respects_zero_ttl():
+    cache = InMemoryLRUCache(8)
+    client = CountingClient(_LOGIC_OK)
+    gateway = ToponeGateway(
+        client,
+        cache=cache,
+        cache_ttl_seconds={LLMRole.REASONING: 60, LLMRole.CREATIVE: 0},
+    )
+
+    await gateway.logic_check(_logic_payload())
+    (key,) = list(cache._entries)
+    cache.set(key, "not json", ttl_seconds=60)
+    result = await gateway.logic_check(_logic_payload())
+
+    assert result.ok is True
+    assert client.calls == 2
+    assert cache.get(key) == _LOGIC_OK
+
+    client.text = json.dumps(["a"])
+    await gateway.generate_logline_options("idea")
+    await gateway.generate_logline_options("idea")
+    assert client.calls == 4
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+from app.llm.schemas import LogicCheckPayload
+from app.llm.single_flight import SingleFlight
+from app.llm.topone_gateway import ToponeGateway
+
+
+class GatedClient:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.default_model = "default-model"
+        self.secondary_model = "secondary-model"
+
+    async def generate_content(
+        self,
+        *,
+        messages,
+        system_instruction=None,
+        generation_config=None,
+        model=None,
+    ):
+        self.calls += 1
+        await self.release.wait()
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+
+
+def _logic_payload(intent: str) -> LogicCheckPayload:
+    return LogicCheckPayload(
+        outline_requirement="keep plan",
+        world_state={"hp": "100%"},
+        user_intent=intent,
+        mode="standard",
+    )
+
+
+@pytest.mark.asyncio
+async def test_gateway_coalesces_concurrent_identical_calls():
+    client = GatedClient(
+        json.dumps(
+            {
+                "ok": True,
+                "mode": "standard",
+                "decision": "execute",
+                "impact_level": "local",
+                "warnings": [],
+            }
+        )
+    )
+    gateway = ToponeGateway(client)
+
+    tasks = [asyncio.create_task(gateway.logic_check(_logic_payload("same"))) for _ in range(3)]
+    other = asyncio.create_task(gateway.logic_check(_logic_payload("other")))
+    await asyncio.sleep(0)
+    client.release.set()
+    results = await asyncio.gather(*tasks, other)
+
+    assert client.calls == 2
+    assert all(result.ok for result in results)
+    assert len(gateway._single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_upstream_only_after_last_waiter():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def upstream() -> str:
+        started.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "never"
+
+    flight: SingleFlight[str] = SingleFlight()
+    first = asyncio.create_task(flight.run("k", upstream))
+    second = asyncio.create_task(flight.run("k", upstream))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+    assert len(flight) == 1
+
+    second.cancel()
+    await asyncio.gather(second, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_fans_out_errors_to_all_waiters():
+    gate = asyncio.Event()
+
+    async def upstream() -> str:
+        await gate.wait()
+        raise RuntimeError("boom")
+
+    flight: SingleFlight[str] = SingleFlight()
+    tasks = [asyncio.create_task(flight.run("k", upstream)) for _ in range(2)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert [str(item) for item in results] == ["boom", "boom"]
+    assert len(flight) == 0
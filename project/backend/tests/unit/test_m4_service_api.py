@@ -143,6 +143,9 @@ class StepStorage:
         self.created_chapters.append(record)
         return record
 
+    def create_chapters(self, *, chapters):
+        return [self.create_chapter(**chapter) for chapter in chapters]
+
 
 class AnchorStorage:
     def __init__(self) -> None:
@@ -276,16 +279,23 @@ class SimulationStorage:
     def get_simulation_log(self, log_id: str):
         return SimulationLogStub(log_id=log_id, round_number=1)
 
-    def list_simulation_logs(self, scene_id: str):
+    def list_simulation_logs(self, scene_id: str, *, offset=0, limit=None):
         self.list_called = scene_id
-        return [
+        logs = [
             SimulationLogStub(log_id=f"sim:{scene_id}:round:1", round_number=1),
             SimulationLogStub(log_id=f"sim:{scene_id}:round:2", round_number=2),
         ]
+        return logs[offset : None if limit is None else offset + limit]
+
+    def list_simulation_log_fields(self, scene_id: str, *, fields, offset=0, limit=None):
+        self.fields_called = (scene_id, list(fields), offset, limit)
+        rows = [log.model_dump() for log in self.list_simulation_logs(scene_id)]
+        page = rows[offset : None if limit is None else offset + limit]
+        return [{name: row[name] for name in fields} for row in page]
 
 
 class EmptySimulationStorage(SimulationStorage):
-    def list_simulation_logs(self, scene_id: str):
+    def list_simulation_logs(self, scene_id: str, *, offset=0, limit=None):
         self.list_called = scene_id
         return []
 
@@ -431,6 +441,29 @@ def test_simulation_logs_endpoint(client):
     assert storage.list_called == "scene-alpha"
 
 
+def test_simulation_logs_endpoint_paginates_and_projects(client):
+    storage = SimulationStorage()
+    _override(main.get_graph_storage, storage)
+
+    page = client.get("/api/v1/simulation/logs/scene-alpha?offset=1&limit=1")
+    assert page.status_code == 200
+    assert [row["round_number"] for row in page.json()] == [2]
+
+    beyond = client.get("/api/v1/simulation/logs/scene-alpha?offset=5")
+    assert beyond.status_code == 200
+    assert beyond.json() == []
+
+    projected = client.get(
+        "/api/v1/simulation/logs/scene-alpha?fields=round_number, agent_actions&limit=1"
+    )
+    assert projected.status_code == 200
+    assert projected.json() == [{"round_number": 1, "agent_actions": []}]
+    assert storage.fields_called == ("scene-alpha", ["round_number", "agent_actions"], 0, 1)
+
+    assert client.get("/api/v1/simulation/logs/scene-alpha?fields=secret").status_code == 422
+    assert client.get("/api/v1/simulation/logs/scene-alpha?limit=0").status_code == 422
+
+
 def test_simulation_logs_endpoint_returns_404_when_empty(client):
     storage = EmptySimulationStorage()
     _override(main.get_graph_storage, storage)
@@ -441,6 +474,55 @@ def test_simulation_logs_endpoint_returns_404_when_empty(client):
     assert storage.list_called == "scene-alpha"
 
 
+def test_dm_arbitrate_applies_declarative_rules(client):
+    _override(main.get_world_master_engine, WorldMasterEngine(llm=None))
+    rule = {
+        "action_type": "talk",
+        "require": [{"field": "world_state.awake.{action.action_target}", "op": "truthy"}],
+        "reason": "target_asleep",
+    }
+    action = {
+        "action_id": "act-1",
+        "agent_id": "a",
+        "action_type": "talk",
+        "action_target": "b",
+    }
+
+    response = client.post(
+        "/api/v1/dm/arbitrate",
+        json={
+            "round_id": "round-1",
+            "actions": [action],
+            "world_state": {"awake": {"b": False}},
+            "rules": [rule],
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["action_results"][0]["reason"] == "target_asleep"
+
+    response = client.post(
+        "/api/v1/dm/arbitrate",
+        json={
+            "round_id": "round-1",
+            "actions": [action],
+            "world_state": {},
+            "rules": [{"require": [{"field": "action.agent_id", "op": "like", "value": 1}]}],
+        },
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/api/v1/dm/arbitrate",
+        json={
+            "round_id": "round-1",
+            "actions": [action],
+            "world_state": {"awake": {}},
+            "rules": [rule],
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["action_results"][0]["reason"] == "target_asleep"
+
 @pytest.mark.asyncio
 async def test_service_core_components_coverage():
     await exercise_character_agent_engine()
@@ -42,10 +42,15 @@ class DummyStorage:
         return ["scene-local"]
 
     def mark_future_scenes_dirty(
-        self, *, root_id: str, branch_id: str, scene_id: str
-    ) -> list[str]:
+        self, *, root_id: str, branch_id: str, scene_id: str, entity_ids=None
+    ) -> dict:
         self.cascade_calls.append((root_id, branch_id, scene_id))
-        return ["scene-cascading"]
+        return {
+            "scene_ids": ["scene-cascading"],
+            "scene_version_ids": [],
+            "writes": 1,
+            "writes_avoided": 0,
+        }
 
 
 def test_require_snowflake_engine_mode_missing(monkeypatch):
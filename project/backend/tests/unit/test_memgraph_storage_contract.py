@@ -1,6 +1,7 @@
 import importlib
 import importlib.util
 import inspect
+from types import SimpleNamespace
 
 import pytest
 
@@ -126,3 +127,99 @@ def test_create_anchor_rejects_invalid_type():
             constraint=constraint,
             conditions="[]",
         )
+
+
+class _ScriptedDB:
+    def __init__(self, responses: dict[str, list[dict[str, object]]]) -> None:
+        self.responses = responses
+        self.writes: list[dict[str, object]] = []
+
+    def execute_and_fetch(self, query, params=None):
+        for marker, records in self.responses.items():
+            if marker in query:
+                return iter(records)
+        return iter(())
+
+    def execute(self, query, params=None):
+        self.writes.append(params)
+
+
+def _build_dirty_storage(*, known: int):
+    module = _import_memgraph_storage_module()
+    storage = module.MemgraphStorage.__new__(module.MemgraphStorage)
+    future = [
+        {"id": f"scene-{seq}", "seq": seq, "version_count": 1} for seq in (2, 3, 4, 5)
+    ]
+    latest = [
+        {
+            "scene_origin_id": f"scene-{seq}",
+            "sv": SimpleNamespace(
+                _properties={
+                    "id": f"sv-{seq}",
+                    "scene_origin_id": f"scene-{seq}",
+                    "commit_id": "commit-1",
+                    "pov_character_id": "narrator",
+                    "status": "draft",
+                    "expected_outcome": "",
+                    "conflict_type": "internal",
+                    "actual_outcome": "",
+                    "summary": "Hero returns" if seq == 5 else "quiet",
+                }
+            ),
+        }
+        for seq in (2, 3, 4, 5)
+    ]
+    storage.db = _ScriptedDB(
+        {
+            "MATCH (s:SceneOrigin": future,
+            "MATCH (sv:SceneVersion) WHERE sv.scene_origin_id IN": latest,
+            "count(DISTINCT e.id)": [{"known": known}],
+            "TemporalRelation": [{"start_seq": 0, "end_seq": 3}],
+            "e.name AS name": [{"id": "hero", "name": "Hero"}],
+        }
+    )
+    storage._require_scene_origin = lambda scene_id: SimpleNamespace(
+        root_id="root-alpha", sequence_index=1
+    )
+    storage._require_branch_node = lambda *args, **kwargs: None
+    return storage
+
+
+def test_mark_future_scenes_dirty_skips_only_provably_independent_scenes():
+    storage = _build_dirty_storage(known=1)
+    result = storage.mark_future_scenes_dirty(
+        root_id="root-alpha", branch_id="main", scene_id="scene-1", entity_ids=["hero"]
+    )
+    # scene-2/3 在关系区间内，scene-5 提到实体名称；只有 scene-4 可证明无关。
+    assert result["scene_ids"] == ["scene-2", "scene-3", "scene-5"]
+    assert result["writes"] == 3
+    assert result["writes_avoided"] == 1
+    assert storage.db.writes == [{"ids": ["sv-2", "sv-3", "sv-5"]}]
+
+    unknown = _build_dirty_storage(known=0)
+    result = unknown.mark_future_scenes_dirty(
+        root_id="root-alpha", branch_id="main", scene_id="scene-1", entity_ids=["ghost"]
+    )
+    assert result["scene_ids"] == ["scene-2", "scene-3", "scene-4", "scene-5"]
+    assert result["writes_avoided"] == 0
+
+
+def test_list_simulation_logs_backfills_legacy_logs_once():
+    module = _import_memgraph_storage_module()
+    storage = module.MemgraphStorage.__new__(module.MemgraphStorage)
+    storage.db = _ScriptedDB(
+        {
+            "WHERE l.scene_id IS NULL": [
+                {"id": "sim:scene-alpha:round:1"},
+                {"id": "legacy-without-scene"},
+            ],
+        }
+    )
+
+    assert storage.list_simulation_logs("scene-alpha") == []
+    storage.list_simulation_log_fields("scene-alpha", fields=["round_number"])
+
+    # 旧日志只补写一次，且只写入能从 id 解析出 scene_id 的记录。
+    assert storage.db.writes == [
+        {"rows": [{"id": "sim:scene-alpha:round:1", "scene_id": "scene-alpha"}]}
+    ]
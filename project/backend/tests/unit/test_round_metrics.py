@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.feedback_detector import FeedbackDetector
+from app.services.round_metrics import RoundMetrics
+from app.services.simulation_engine import SimulationEngine
+from app.services.world_master import WorldMasterEngine
+
+
+def _round(info_gain: float, drama: float = 0.5, conflict: float | None = None, **extra):
+    values = {
+        "info_gain": info_gain,
+        "drama_score": drama,
+        "convergence_score": 0.5,
+        "stagnation_count": 0,
+        **extra,
+    }
+    if conflict is not None:
+        values["conflict_escalation"] = conflict
+    return SimpleNamespace(**values)
+
+
+def test_round_metrics_keeps_rolling_window_means():
+    metrics = RoundMetrics(window=3)
+    for gain, drama in [(0.9, 0.9), (0.3, 0.6), (0.0, 0.0), (0.3, 0.3)]:
+        metrics.record_round(_round(gain, drama))
+
+    assert metrics.rounds == 4
+    assert metrics.mean_info_gain() == pytest.approx(0.2)
+    assert metrics.mean_drama() == pytest.approx(0.3)
+    assert metrics.latest.info_gain == 0.3
+
+    with pytest.raises(ValueError):
+        RoundMetrics(window=2)
+
+
+def test_round_metrics_deescalation_ignores_missing_conflict():
+    metrics = RoundMetrics()
+    for conflict in (0.9, 0.6, 0.3):
+        metrics.record_round(_round(0.5), conflict_escalation=conflict)
+    assert metrics.is_deescalating()
+
+    metrics.record_round(_round(0.5))
+    assert not metrics.is_deescalating()
+
+
+@pytest.mark.asyncio
+async def test_info_gain_with_metrics_counts_each_fact_once():
+    engine = SimulationEngine(character_engine=None, world_master=None, storage=None, llm=None)
+    metrics = RoundMetrics()
+    scene = {"facts": ["door"], "conflict_escalation": 0.0}
+    revealed = {"facts": ["door", "key"], "relations": ["a-b"]}
+
+    first = await engine.calculate_info_gain(scene, revealed, metrics=metrics)
+    repeated = await engine.calculate_info_gain(scene, revealed, metrics=metrics)
+
+    assert first == pytest.approx(await engine.calculate_info_gain(scene, revealed))
+    assert first == pytest.approx(2 / 3)
+    assert repeated == 0.0
+    assert metrics.known_count("facts") == 2
+
+
+@pytest.mark.asyncio
+async def test_monitor_pacing_and_feedback_read_metrics_window():
+    world_master = WorldMasterEngine(llm=None)
+    metrics = RoundMetrics()
+    history = [_round(0.9), _round(0.05), _round(0.05), _round(0.05)]
+    for item in history:
+        metrics.record_round(item)
+
+    pacing = await world_master.monitor_pacing(history, metrics=metrics)
+    assert pacing.type == "inject_incident"
+
+    metrics = RoundMetrics()
+    for conflict in (0.9, 0.6, 0.3):
+        metrics.record_round(_round(0.5), conflict_escalation=conflict)
+    pacing = await world_master.monitor_pacing([], metrics=metrics)
+    assert pacing.type == "force_escalation"
+
+    detector = FeedbackDetector()
+    quiet = RoundMetrics()
+    for gain in (0.0, 0.02, 0.07):
+        quiet.record_round(_round(gain, drama=0.1))
+    assert await detector.detect_feedback([quiet.latest]) is None
+    report = await detector.detect_feedback([], metrics=quiet)
+    assert report.trigger == "repetition"
+    assert report.feedback["info_gain"] == pytest.approx(0.03)
+
+
+@pytest.mark.asyncio
+async def test_run_scene_feeds_round_metrics_to_feedback_detector():
+    world_master = Mock()
+    world_master.monitor_pacing = AsyncMock(return_value=SimpleNamespace(type="none"))
+    engine = SimulationEngine(
+        character_engine=None,
+        world_master=world_master,
+        storage=None,
+        llm=None,
+        feedback_detector=FeedbackDetector(),
+    )
+    engine.run_round = AsyncMock(
+        side_effect=[_round(gain, drama=0.1, narrative_events=[]) for gain in (0.0, 0.0, 0.12)]
+    )
+    engine.smart_render = AsyncMock(return_value="rendered")
+
+    await engine.run_scene({"scene": "ctx"}, {"max_rounds": 3})
+
+    rounds = engine.smart_render.await_args.args[0]
+    # 最后一轮单看有新信息，但窗口均值 0.04 仍判定为重复。
+    assert [event["event"] for event in rounds[-1].narrative_events] == ["feedback"]
+    assert rounds[-1].narrative_events[0]["trigger"] == "repetition"
+    assert all(not item.narrative_events for item in rounds[:-1])
@@ -0,0 +1,147 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.rule_engine import RuleSetError, compile_rule_set, load_rule_set
+from app.services.world_master import WorldMasterEngine
+
+ALLY_RULE = {
+    "id": "no_friendly_fire",
+    "action_type": ["attack", "steal"],
+    "require": [
+        {
+            "field": "action.action_target",
+            "op": "not_in",
+            "ref": "world_state.allies.{action.agent_id}",
+        }
+    ],
+    "reason": "friendly_fire",
+}
+STAMINA_RULE = {
+    "id": "needs_stamina",
+    "require": [{"field": "world_state.stamina.{action.agent_id}", "op": "gt", "value": 0}],
+    "outcome": "partial",
+    "reason": "exhausted",
+}
+
+
+def _action(agent_id: str, action_type: str, target: str) -> dict[str, str]:
+    return {
+        "action_id": f"{agent_id}-{action_type}",
+        "agent_id": agent_id,
+        "action_type": action_type,
+        "action_target": target,
+    }
+
+
+def _world_state() -> dict[str, object]:
+    return {
+        "allies": {"a": ["b"], "b": ["a"], "c": []},
+        "stamina": {"a": 3, "b": 0, "c": 1},
+        "power_levels": {"a": 5, "b": 5, "c": 1},
+        "position_advantage": {"a": True, "b": True, "c": True},
+    }
+
+
+def test_compiled_rule_set_groups_by_action_type_in_declaration_order():
+    rule_set = compile_rule_set([ALLY_RULE, STAMINA_RULE])
+    state = _world_state()
+
+    assert [rule.rule_id for rule in rule_set.rules_for("attack")] == [
+        "no_friendly_fire",
+        "needs_stamina",
+    ]
+    assert [rule.rule_id for rule in rule_set.rules_for("talk")] == ["needs_stamina"]
+    assert rule_set.first_violation(_action("a", "attack", "b"), state).reason == "friendly_fire"
+    assert rule_set.first_violation(_action("b", "talk", "c"), state).outcome == "partial"
+    assert rule_set.first_violation(_action("a", "steal", "c"), state) is None
+    assert rule_set.first_violation(SimpleNamespace(**_action("a", "talk", "b")), state) is None
+
+
+def test_compile_rule_set_caches_by_content_and_rejects_bad_rules():
+    assert compile_rule_set([ALLY_RULE]) is compile_rule_set([dict(ALLY_RULE)])
+    assert load_rule_set(json.dumps([ALLY_RULE])) is compile_rule_set([ALLY_RULE])
+
+    with pytest.raises(RuleSetError, match="operator"):
+        compile_rule_set([{"require": [{"field": "action.agent_id", "op": "like", "value": 1}]}])
+    with pytest.raises(RuleSetError, match="action or world_state"):
+        compile_rule_set([{"require": [{"field": "scene.id", "op": "truthy"}]}])
+    with pytest.raises(RuleSetError, match="require"):
+        compile_rule_set([{"id": "empty"}])
+    with pytest.raises(RuleSetError, match="JSON"):
+        load_rule_set("[{")
+
+
+def test_missing_fields_violate_declarative_rules_and_raise_when_strict():
+    rule_set = compile_rule_set(
+        [{"require": [{"field": "world_state.curfew", "op": "exists"}], "reason": "no_curfew"}]
+    )
+    assert rule_set.first_violation(_action("a", "talk", "b"), {}).reason == "no_curfew"
+    assert rule_set.first_violation(_action("a", "talk", "b"), {"curfew": None}) is None
+
+    blocked = compile_rule_set(
+        [
+            {
+                "require": [
+                    {
+                        "field": "action.action_target",
+                        "op": "not_in",
+                        "ref": "world_state.blocked.{action.agent_id}",
+                    }
+                ],
+                "reason": "blocked",
+            }
+        ]
+    )
+    assert blocked.first_violation(_action("x", "talk", "b"), {"blocked": {}}).reason == "blocked"
+    mismatched = compile_rule_set([STAMINA_RULE])
+    state = {**_world_state(), "stamina": {"a": "high"}}
+    assert mismatched.first_violation(_action("a", "talk", "b"), state).reason == "exhausted"
+
+    with pytest.raises(KeyError):
+        compile_rule_set([STAMINA_RULE], strict=True).first_violation(
+            _action("z", "talk", "b"), _world_state()
+        )
+
+
+def test_identity_operators_accept_only_json_singletons():
+    rule_set = compile_rule_set(
+        [{"require": [{"field": "world_state.open", "op": "is_not", "value": False}]}]
+    )
+    assert rule_set.first_violation(_action("a", "talk", "b"), {"open": False}) is not None
+    assert rule_set.first_violation(_action("a", "talk", "b"), {"open": 0}) is None
+
+    for condition in (
+        {"field": "world_state.mood", "op": "is", "value": "x"},
+        {"field": "world_state.mood", "op": "is", "value": 0},
+        {"field": "world_state.mood", "op": "is_not", "ref": "world_state.other"},
+    ):
+        with pytest.raises(RuleSetError, match="null/true/false"):
+            compile_rule_set([{"require": [condition]}])
+
+
+@pytest.mark.asyncio
+async def test_arbitrate_applies_declarative_rules_before_builtin_checks():
+    engine = WorldMasterEngine(llm=None)
+    actions = [
+        _action("a", "attack", "b"),
+        _action("b", "talk", "a"),
+        _action("c", "attack", "a"),
+        _action("a", "investigate", "door"),
+    ]
+
+    arbitration = await engine.arbitrate("r1", actions, _world_state(), [ALLY_RULE, STAMINA_RULE])
+
+    assert [(item.success, item.reason) for item in arbitration.action_results] == [
+        ("failure", "friendly_fire"),
+        ("partial", "exhausted"),
+        ("partial", "power_mismatch"),
+        ("success", "ok"),
+    ]
+    mixed = await engine.check_action_validity(
+        actions[3], _world_state(), [lambda action, state: False, STAMINA_RULE]
+    )
+    assert mixed.reason == "rule_violation"
+    with pytest.raises(RuleSetError):
+        await engine.check_action_validity(actions[3], _world_state(), ["not-a-rule"])
@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock
 
@@ -270,6 +271,113 @@ async def test_simulation_engine_run_round_returns_result():
     world_master.inject_sensory_seeds.assert_awaited_once()
 
 
+@pytest.mark.asyncio
+async def test_simulation_engine_run_round_batches_agent_decisions_when_enabled():
+    engine_cls = _build_simulation_engine_class()
+    engine = build_instance(engine_cls)
+    engine.batch_agent_decisions = True
+
+    first, second = Mock(agent_id="a1"), Mock(agent_id="a2")
+    first.decide = AsyncMock()
+    second.decide = AsyncMock()
+    action = _build_agent_action()
+    engine.character_engine = Mock()
+    engine.character_engine.decide_batch = AsyncMock(return_value=[action, action])
+
+    world_master = Mock()
+    world_master.arbitrate = AsyncMock(return_value=_build_dm_arbitration())
+    world_master.inject_sensory_seeds = AsyncMock(return_value=[])
+    engine.world_master = world_master
+    engine.calculate_info_gain = AsyncMock(return_value=0.3)
+
+    result = await engine.run_round({"scene": "ctx"}, [first, second], AttrDict(round_id="r1"))
+
+    engine.character_engine.decide_batch.assert_awaited_once_with(["a1", "a2"], {"scene": "ctx"})
+    first.decide.assert_not_awaited()
+    assert len(result.agent_actions) == 2
+
+
+class _TimedAgent:
+    def __init__(self, agent_id: str, delay: float, tracker: dict, error: Exception | None = None):
+        self.agent_id = agent_id
+        self._delay = delay
+        self._tracker = tracker
+        self._error = error
+        self.cancelled = False
+
+    async def decide(self, agent_id, scene_context):
+        self._tracker["active"] += 1
+        self._tracker["peak"] = max(self._tracker["peak"], self._tracker["active"])
+        try:
+            await asyncio.sleep(self._delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self._tracker["active"] -= 1
+        if self._error is not None:
+            raise self._error
+        return _build_agent_action().model_copy(update={"agent_id": agent_id})
+
+
+def _concurrent_engine(**kwargs):
+    engine_cls = _build_simulation_engine_class()
+    world_master = Mock()
+    world_master.arbitrate = AsyncMock(return_value=_build_dm_arbitration())
+    world_master.inject_sensory_seeds = AsyncMock(return_value=[])
+    engine = engine_cls(
+        character_engine=object(), world_master=world_master, storage=Mock(), llm=Mock(), **kwargs
+    )
+    engine.calculate_info_gain = AsyncMock(return_value=0.3)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_run_round_decides_concurrently_in_order():
+    tracker = {"active": 0, "peak": 0}
+    agents = [_TimedAgent(f"a{idx}", delay, tracker) for idx, delay in enumerate([0.03, 0.01, 0.02])]
+    engine = _concurrent_engine(max_concurrent_agents=2)
+
+    result = await engine.run_round({"scene": "ctx"}, agents, AttrDict(round_id="r1"))
+
+    assert [action.agent_id for action in result.agent_actions] == ["a0", "a1", "a2"]
+    assert tracker["peak"] == 2
+    payloads = engine.world_master.arbitrate.await_args.args[1]
+    assert [item["action_id"] for item in payloads] == ["r1-0", "r1-1", "r1-2"]
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_agent_failure_policies():
+    tracker = {"active": 0, "peak": 0}
+
+    def _agents():
+        return [
+            _TimedAgent("slow", 1.0, tracker),
+            _TimedAgent("ok", 0.0, tracker),
+            _TimedAgent("boom", 0.0, tracker, error=RuntimeError("llm down")),
+        ]
+
+    wait_engine = _concurrent_engine(agent_timeout_seconds=0.05, agent_failure_policy="wait")
+    result = await wait_engine.run_round({}, _agents(), AttrDict(round_id="r1"))
+    assert [(a.agent_id, a.action_type) for a in result.agent_actions] == [
+        ("slow", "wait"),
+        ("ok", "wait"),
+        ("boom", "wait"),
+    ]
+    assert [a.action_description for a in result.agent_actions] == ["wait", "desc", "wait"]
+
+    skip_engine = _concurrent_engine(agent_timeout_seconds=0.05, agent_failure_policy="skip")
+    result = await skip_engine.run_round({}, _agents(), AttrDict(round_id="r1"))
+    assert [action.agent_id for action in result.agent_actions] == ["ok"]
+
+    abort_engine = _concurrent_engine()
+    agents = _agents()
+    with pytest.raises(RuntimeError, match="llm down"):
+        await abort_engine.run_round({}, agents, AttrDict(round_id="r1"))
+    assert agents[0].cancelled
+    abort_engine.world_master.arbitrate.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_simulation_engine_run_scene_triggers_inject_incident():
     engine_cls = _build_simulation_engine_class()
@@ -293,6 +401,195 @@ async def test_simulation_engine_run_scene_triggers_inject_incident():
     engine.inject_breaking_incident.assert_awaited_once()
 
 
+def _scene_engine(**kwargs):
+    engine_cls = _build_simulation_engine_class()
+    engine = engine_cls(
+        character_engine=Mock(), world_master=Mock(), storage=Mock(), llm=Mock(), **kwargs
+    )
+    engine.world_master.monitor_pacing = AsyncMock(return_value=SimpleNamespace(type="none"))
+    engine.smart_render = AsyncMock(return_value="rendered")
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_run_scene_skips_rounds_when_anchor_already_met():
+    metrics_cls = load_module("app.services.simulation_engine").SimulationMetrics
+    metrics = metrics_cls()
+    engine = _scene_engine(early_termination=True, metrics=metrics)
+    engine.run_round = AsyncMock(return_value=_build_round())
+    engine.storage.mark_anchor_achieved = Mock(return_value={"id": "anchor-1"})
+    engine.storage.get_next_unachieved_anchor = Mock(
+        side_effect=KeyError("no unachieved anchors found")
+    )
+    scene = {
+        "scene_id": "scene-1",
+        "scene_version_id": "sv-1",
+        "root_id": "root-1",
+        "branch_id": "main",
+        "world_state": {"door_open": True},
+        "next_anchor": {"id": "anchor-1", "required_conditions": '["door_open"]'},
+    }
+
+    assert await engine.run_scene(scene, AttrDict(max_rounds=4)) == ""
+
+    engine.run_round.assert_not_awaited()
+    engine.smart_render.assert_not_awaited()
+    engine.storage.mark_anchor_achieved.assert_called_once_with(
+        anchor_id="anchor-1", scene_version_id="sv-1"
+    )
+    stats = engine.last_scene_stats
+    assert (stats.end_reason, stats.rounds_run, stats.rounds_saved) == ("anchor_satisfied", 0, 4)
+    assert metrics.snapshot()["end_reasons"] == {"anchor_satisfied": 1}
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_early_termination_surfaces_lookup_errors():
+    engine = _scene_engine(early_termination=True)
+    engine.run_round = AsyncMock(return_value=_build_round())
+    engine.storage.mark_anchor_achieved = Mock(return_value={"id": "anchor-1"})
+    scene = {
+        "scene_id": "scene-1",
+        "scene_version_id": "sv-1",
+        "world_state": {"door_open": True},
+        "next_anchor": {"id": "anchor-1", "required_conditions": ["door_open"]},
+    }
+
+    with pytest.raises(ValueError, match="root_id and branch_id"):
+        await engine.run_scene(dict(scene), AttrDict(max_rounds=2))
+
+    engine.storage.require_root = Mock(side_effect=KeyError("root not found: root-1"))
+    with pytest.raises(KeyError, match="root not found"):
+        await engine.run_scene(
+            {**scene, "root_id": "root-1", "branch_id": "main"}, AttrDict(max_rounds=2)
+        )
+    assert engine.last_scene_stats.end_reason == "error"
+
+    engine.storage.require_root = Mock()
+    engine.storage.get_next_unachieved_anchor = Mock(return_value={"id": "anchor-2"})
+    with pytest.raises(KeyError, match="required_conditions"):
+        await engine.run_scene(
+            {**scene, "root_id": "root-1", "branch_id": "main"}, AttrDict(max_rounds=2)
+        )
+    engine.run_round.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_run_scene_moves_to_next_anchor_when_met():
+    engine = _scene_engine(early_termination=True)
+    engine.run_round = AsyncMock(return_value=_build_round())
+    engine.should_end_scene = Mock(return_value=True)
+    engine.storage.mark_anchor_achieved = Mock(return_value={"id": "anchor-1"})
+    engine.storage.get_next_unachieved_anchor = Mock(
+        return_value={"id": "anchor-2", "required_conditions": ["bridge_built"]}
+    )
+    engine.world_master.check_convergence = AsyncMock(
+        return_value=SimpleNamespace(distance=0.5)
+    )
+    engine.world_master.generate_convergence_action = AsyncMock(return_value={"type": "hint"})
+    scene = {
+        "scene_id": "scene-1",
+        "scene_version_id": "sv-1",
+        "root_id": "root-1",
+        "branch_id": "main",
+        "world_state": {"door_open": True},
+        "next_anchor": {"id": "anchor-1", "required_conditions": ["door_open"]},
+    }
+
+    assert await engine.run_scene(scene, AttrDict(max_rounds=4)) == "rendered"
+
+    engine.storage.get_next_unachieved_anchor.assert_called_once_with(
+        root_id="root-1", branch_id="main"
+    )
+    engine.run_round.assert_awaited_once()
+    assert scene["next_anchor"]["id"] == "anchor-2"
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_run_scene_records_wasted_rounds():
+    engine = _scene_engine()
+    engine.run_round = AsyncMock(
+        side_effect=[_build_round(gain) for gain in (0.05, 0.5, 0.05, 0.05, 0.05)]
+    )
+
+    await engine.run_scene({"scene": "ctx"}, AttrDict(max_rounds=6))
+
+    stats = engine.last_scene_stats
+    assert engine.run_round.await_count == 5
+    assert (stats.rounds_run, stats.wasted_rounds, stats.rounds_saved) == (5, 4, 1)
+    assert stats.end_reason == "stagnated"
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_speculative_perception_reuses_matching_prefetch():
+    character_cls = _build_character_engine_class()
+    llm = Mock()
+    llm.generate_agent_perception = AsyncMock(return_value={"beliefs_patch": {}})
+    character_engine = character_cls(storage=Mock(spec=[]), llm=llm)
+    character_engine._apply_beliefs = Mock(return_value={})
+
+    class Agent:
+        agent_id = "a1"
+
+        async def decide(self, agent_id, scene_context):
+            await character_engine.perceive(agent_id, scene_context)
+            return _build_agent_action()
+
+    engine = _concurrent_engine(speculative_perception=True)
+    engine.character_engine = character_engine
+    engine.world_master.monitor_pacing = AsyncMock(return_value=SimpleNamespace(type="none"))
+    engine.smart_render = AsyncMock(return_value="rendered")
+    scene = {"scene": "ctx"}
+
+    await engine.run_scene(scene, {"max_rounds": 3, "agents": [Agent()]})
+
+    stats = engine.last_scene_stats
+    assert llm.generate_agent_perception.await_count == 3
+    assert (stats.speculative_hits, stats.speculative_misses) == (2, 0)
+
+    prefetcher = character_engine.perception_prefetcher()
+    prefetcher.prefetch("a1", {"scene": "old"})
+    with load_module("app.services.character_agent").use_prefetcher(prefetcher):
+        await character_engine.perceive("a1", {"scene": "new"})
+    assert (prefetcher.hits, prefetcher.misses) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_prefetch_state_is_scoped_per_scene():
+    character_cls = _build_character_engine_class()
+    llm = Mock()
+    llm.generate_agent_perception = AsyncMock(return_value={"beliefs_patch": {}})
+    character_engine = character_cls(storage=Mock(spec=[]), llm=llm)
+    character_engine._apply_beliefs = Mock(return_value={})
+
+    class Agent:
+        agent_id = "a1"
+
+        async def decide(self, agent_id, scene_context):
+            await asyncio.sleep(0)
+            await character_engine.perceive(agent_id, scene_context)
+            return _build_agent_action()
+
+    def _engine():
+        engine = _concurrent_engine(speculative_perception=True)
+        engine.character_engine = character_engine
+        engine.world_master.monitor_pacing = AsyncMock(
+            return_value=SimpleNamespace(type="none")
+        )
+        engine.smart_render = AsyncMock(return_value="rendered")
+        return engine
+
+    # 同一个角色引擎上并发两个场景、同名角色：预取与统计互不干扰。
+    first, second = _engine(), _engine()
+    await asyncio.gather(
+        first.run_scene({"scene": "one"}, {"max_rounds": 3, "agents": [Agent()]}),
+        second.run_scene({"scene": "two"}, {"max_rounds": 2, "agents": [Agent()]}),
+    )
+
+    for engine, expected in ((first, (2, 0)), (second, (1, 0))):
+        stats = engine.last_scene_stats
+        assert (stats.speculative_hits, stats.speculative_misses) == expected
+
+
 @pytest.mark.asyncio
 async def test_smart_renderer_filters_low_info_gain_rounds():
     renderer_cls = _build_smart_renderer_class()
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import threading
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 
-from app.models import ActionResult, AgentAction, DMArbitration
+from app.models import ActionResult, AgentAction, DMArbitration, SimulationRoundResult
 from app.services.simulation_engine import SimulationEngine
+from app.services.simulation_log_writer import SimulationLogWriter
 
 
 def _build_action_result() -> ActionResult:
@@ -37,8 +39,10 @@ def _build_agent_action() -> AgentAction:
 class LogStorage:
     def __init__(self) -> None:
         self.logs: list[object] = []
+        self.threads: set[int] = set()
 
     def create_simulation_log(self, log: object) -> object:
+        self.threads.add(threading.get_ident())
         self.logs.append(log)
         return log
 
@@ -70,9 +74,96 @@ async def test_run_scene_creates_simulation_logs():
 
     assert result == "rendered content"
     assert len(storage.logs) == 2
+    assert storage.threads == {threading.get_ident()}
 
     first, second = storage.logs
     assert first.scene_version_id == "scene-ver-1"
     assert first.round_number == 1
     assert first.id == "sim:scene-alpha:round:1"
     assert second.round_number == 2
+
+
+class BatchLogStorage:
+    def __init__(self, fail_on_batch: int | None = None) -> None:
+        self.batches: list[list[object]] = []
+        self.threads: set[int] = set()
+        self._fail_on_batch = fail_on_batch
+
+    def create_simulation_logs(self, logs: list[object]) -> list[object]:
+        self.threads.add(threading.get_ident())
+        if self._fail_on_batch == len(self.batches):
+            raise KeyError("scene version not found: scene-ver-1")
+        self.batches.append(list(logs))
+        return logs
+
+
+def _build_engine(storage: object, **kwargs) -> SimulationEngine:
+    world_master = SimpleNamespace(
+        arbitrate=AsyncMock(return_value=_build_dm_arbitration()),
+        inject_sensory_seeds=AsyncMock(return_value=[]),
+        monitor_pacing=AsyncMock(return_value=SimpleNamespace(type="none")),
+    )
+    renderer = SimpleNamespace(render=AsyncMock(return_value="rendered content"))
+    engine = SimulationEngine(
+        character_engine=None,
+        world_master=world_master,
+        storage=storage,
+        llm=None,
+        smart_renderer=renderer,
+        **kwargs,
+    )
+    engine.calculate_info_gain = AsyncMock(return_value=0.5)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_run_scene_batches_simulation_logs_off_loop():
+    storage = BatchLogStorage()
+    engine = _build_engine(storage, log_flush_rounds=2)
+    agent = SimpleNamespace(agent_id="agent-1", decide=AsyncMock(return_value=_build_agent_action()))
+
+    scene_context = {"scene_id": "scene-alpha", "scene_version_id": "scene-ver-1"}
+    await engine.run_scene(scene_context, {"max_rounds": 5, "agents": [agent]})
+
+    assert [[log.round_number for log in batch] for batch in storage.batches] == [
+        [1, 2],
+        [3, 4],
+        [5],
+    ]
+    assert threading.get_ident() not in storage.threads
+
+
+@pytest.mark.asyncio
+async def test_simulation_log_writer_flushes_before_reraising():
+    storage = BatchLogStorage()
+    engine = _build_engine(storage, log_flush_rounds=10)
+    agent = SimpleNamespace(
+        agent_id="agent-1",
+        decide=AsyncMock(side_effect=[_build_agent_action(), RuntimeError("llm down")]),
+    )
+
+    scene_context = {"scene_id": "scene-alpha", "scene_version_id": "scene-ver-1"}
+    with pytest.raises(RuntimeError, match="llm down"):
+        await engine.run_scene(scene_context, {"max_rounds": 3, "agents": [agent]})
+    assert [[log.round_number for log in batch] for batch in storage.batches] == [[1]]
+
+    failing = SimulationLogWriter(
+        BatchLogStorage(fail_on_batch=0),
+        scene_id="scene-alpha",
+        scene_version_id="scene-ver-1",
+        flush_every=1,
+    )
+    round_result = SimulationRoundResult(
+        round_id="r1",
+        agent_actions=[_build_agent_action()],
+        dm_arbitration=_build_dm_arbitration(),
+        narrative_events=[],
+        sensory_seeds=[],
+        convergence_score=0.0,
+        drama_score=0.0,
+        info_gain=0.5,
+        stagnation_count=0,
+    )
+    failing.add(1, round_result)
+    with pytest.raises(KeyError):
+        await failing.flush()
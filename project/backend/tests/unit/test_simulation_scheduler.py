@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app
+from app.models import SimulationBatchScene
+from app.services.simulation_scheduler import SimulationScheduler
+from app.services.upstream_limiter import LLMPriority, current_llm_priority
+
+
+class RecordingEngine:
+    def __init__(self, *, delay: float = 0.01, fail: set[str] | None = None) -> None:
+        self.delay = delay
+        self.fail = fail or set()
+        self.active = 0
+        self.peak = 0
+        self.order: list[str] = []
+        self.priorities: list[LLMPriority] = []
+        self.world_states: dict[str, dict | None] = {}
+
+    async def run_scene(self, scene_skeleton, config):
+        key = config.round_id
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.priorities.append(current_llm_priority())
+        world_state = scene_skeleton.get("world_state")
+        self.world_states[key] = dict(world_state) if world_state is not None else None
+        try:
+            await asyncio.sleep(self.delay)
+            if key in self.fail:
+                raise ValueError(f"{key} exploded")
+            self.order.append(key)
+            return f"content:{key}"
+        finally:
+            self.active -= 1
+
+
+def _scene(key: str, *depends_on: str, world_state=None) -> SimulationBatchScene:
+    context = {"scene_id": key}
+    if world_state is not None:
+        context["world_state"] = world_state
+    return SimulationBatchScene(
+        key=key, scene_context=context, max_rounds=1, depends_on=list(depends_on)
+    )
+
+
+async def _finish(scheduler: SimulationScheduler, engine: RecordingEngine, scenes):
+    job = scheduler.submit(engine, scenes)
+    events = [item async for item in job.stream()]
+    return job, events
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_independent_scenes_concurrently_within_budget():
+    engine = RecordingEngine()
+    scheduler = SimulationScheduler(max_concurrent_scenes=2)
+
+    job, events = await _finish(scheduler, engine, [_scene(f"s{i}") for i in range(5)])
+
+    assert job.status == "completed"
+    assert engine.peak == 2
+    assert set(engine.priorities) == {LLMPriority.BACKGROUND}
+    assert [item["event"] for item in events][0] == "job_started"
+    assert events[-1]["event"] == "job_finished"
+    assert events[-1]["data"]["progress"] == {"total": 5, "completed": 5}
+    assert scheduler.get(job.job_id) is job
+
+
+@pytest.mark.asyncio
+async def test_scheduler_orders_dependencies_and_copies_input_world_state():
+    engine = RecordingEngine()
+    scheduler = SimulationScheduler(max_concurrent_scenes=4)
+    scenes = [
+        _scene("c", "b"),
+        _scene("b", "a"),
+        _scene("a", world_state={"seed": 1}),
+        _scene("x"),
+    ]
+
+    job, _ = await _finish(scheduler, engine, scenes)
+
+    assert job.status == "completed"
+    assert engine.order.index("a") < engine.order.index("b") < engine.order.index("c")
+    assert engine.world_states["b"] == {"seed": 1}
+    assert engine.world_states["c"] == {"seed": 1}
+    assert engine.world_states["x"] is None
+    # 依赖场景拿到的是独立副本，不与前序场景共享同一个 dict。
+    assert job.scenes["c"].scene_context["world_state"] is not job.scenes["a"].scene_context[
+        "world_state"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_skips_dependents_of_failed_scene():
+    engine = RecordingEngine(fail={"a"})
+    scheduler = SimulationScheduler()
+
+    job, events = await _finish(
+        scheduler, engine, [_scene("a"), _scene("b", "a"), _scene("c")]
+    )
+
+    snapshot = job.snapshot()
+    assert job.status == "failed"
+    assert [scene["status"] for scene in snapshot["scenes"]] == ["failed", "skipped", "completed"]
+    assert snapshot["scenes"][0]["error"] == "a exploded"
+    assert {"scene_failed", "scene_skipped"} <= {item["event"] for item in events}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "scenes, message",
+    [
+        ([_scene("a"), _scene("a")], "duplicate"),
+        ([_scene("a", "missing")], "unknown"),
+        ([_scene("a", "b"), _scene("b", "a")], "cycle"),
+        ([], "empty"),
+    ],
+)
+async def test_scheduler_rejects_invalid_batches(scenes, message):
+    with pytest.raises(ValueError, match=message):
+        SimulationScheduler().submit(RecordingEngine(), scenes)
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "local")
+    engine = RecordingEngine()
+    scheduler = SimulationScheduler(max_concurrent_scenes=2)
+    app.dependency_overrides = {
+        main.get_simulation_engine: lambda: engine,
+        main.get_simulation_scheduler: lambda: scheduler,
+    }
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides = {}
+
+
+def test_simulation_job_endpoints_report_progress(client):
+    response = client.post(
+        "/api/v1/simulation/jobs",
+        json={
+            "scenes": [
+                {"key": "a", "scene_context": {"world_state": {}}, "max_rounds": 1},
+                {"key": "b", "scene_context": {}, "max_rounds": 1, "depends_on": ["a"]},
+            ]
+        },
+    )
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 5
+    status = client.get(f"/api/v1/simulation/jobs/{job_id}").json()
+    while status["status"] not in {"completed", "failed"} and time.monotonic() < deadline:
+        time.sleep(0.01)
+        status = client.get(f"/api/v1/simulation/jobs/{job_id}").json()
+    assert status["status"] == "completed"
+    assert [scene["content"] for scene in status["scenes"]] == ["content:a", "content:b"]
+
+    events = client.get(f"/api/v1/simulation/jobs/{job_id}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.count("event: scene_completed") == 2
+    assert events.text.rstrip().split("\n\n")[-1].startswith("event: job_finished")
+
+
+def test_simulation_job_endpoints_validate_input(client):
+    cyclic = client.post(
+        "/api/v1/simulation/jobs",
+        json={
+            "scenes": [
+                {"key": "a", "scene_context": {}, "max_rounds": 1, "depends_on": ["b"]},
+                {"key": "b", "scene_context": {}, "max_rounds": 1, "depends_on": ["a"]},
+            ]
+        },
+    )
+    assert cyclic.status_code == 422
+    assert client.post("/api/v1/simulation/jobs", json={"scenes": []}).status_code == 422
+    assert client.get("/api/v1/simulation/jobs/missing").status_code == 404
+    assert client.get("/api/v1/simulation/jobs/missing/events").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_scheduler_scene_budget_is_shared_across_jobs():
+    engine = RecordingEngine()
+    scheduler = SimulationScheduler(max_concurrent_scenes=2)
+
+    first = scheduler.submit(engine, [_scene(f"a{i}") for i in range(3)])
+    second = scheduler.submit(engine, [_scene(f"b{i}") for i in range(3)])
+    for job in (first, second):
+        async for _ in job.stream():
+            pass
+
+    assert first.status == second.status == "completed"
+    assert engine.peak == 2
@@ -1,9 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from app.constants import DEFAULT_BRANCH_ID
 from app.main import app, get_graph_storage
-from app.models import Entity, Root
+from app.models import Root
 
 
 class DummyStorage:
@@ -22,7 +21,27 @@ class DummyStorage:
                 "arc_status": "active",
             }
         ]
-        self.updated_entities: list[Entity] = []
+        self.scene_origins = {
+            "scene-1": {"id": "scene-1", "title": "Opening", "sequence_index": 1},
+            "scene-2": {"id": "scene-2", "title": "Turn", "sequence_index": 2},
+        }
+        self.scene_versions = {
+            "scene-1": {
+                "id": "scene-1:v2",
+                "pov_character_id": "char-alpha",
+                "expected_outcome": "Win",
+                "conflict_type": "internal",
+                "actual_outcome": "",
+            },
+            "scene-2": {
+                "id": "scene-2:v1",
+                "pov_character_id": "char-alpha",
+                "expected_outcome": "Lose",
+                "conflict_type": "external",
+                "actual_outcome": "",
+            },
+        }
+        self.patch_calls: list[dict] = []
 
     def get_root_snapshot(self, *, root_id: str, branch_id: str):
         return {
@@ -43,9 +62,24 @@ class DummyStorage:
         _ = (root_id, branch_id)
         return list(self.entities)
 
-    def update_entity(self, entity: Entity):
-        self.updated_entities.append(entity)
-        return entity
+    def get_node_props_by_ids(self, *, label: str, ids):
+        assert label == "SceneOrigin"
+        return {
+            node_id: self.scene_origins[node_id]
+            for node_id in ids
+            if node_id in self.scene_origins
+        }
+
+    def get_latest_scene_version_props(self, *, scene_origin_ids):
+        return {
+            node_id: self.scene_versions[node_id]
+            for node_id in scene_origin_ids
+            if node_id in self.scene_versions
+        }
+
+    def apply_node_patches(self, *, patches):
+        self.patch_calls.append({label: list(rows) for label, rows in patches.items()})
+        return sum(len(rows) for rows in patches.values())
 
     def create_entity(self, **kwargs):
         raise AssertionError(f"unexpected create_entity: {kwargs}")
@@ -104,16 +138,91 @@ def test_save_snowflake_step_updates_characters():
     )
 
     assert response.status_code == 200
-    assert len(storage.updated_entities) == 1
-    updated = storage.updated_entities[0]
-    assert updated.id == "char-alpha"
-    assert updated.name == "Nova"
-    assert updated.semantic_states["ambition"] == "Find the signal"
-    assert updated.semantic_states["conflict"] == "Memory decay"
-    assert updated.semantic_states["epiphany"] == "Trust the crew"
-    assert updated.semantic_states["voice_dna"] == "calm"
-    assert updated.arc_status == "active"
-    assert updated.root_id == storage.root.id
-    assert updated.branch_id == DEFAULT_BRANCH_ID
+    assert storage.patch_calls == [
+        {
+            "Entity": [
+                {
+                    "id": "char-alpha",
+                    "props": {
+                        "name": "Nova",
+                        "semantic_states": {
+                            "ambition": "Find the signal",
+                            "conflict": "Memory decay",
+                            "epiphany": "Trust the crew",
+                            "voice_dna": "calm",
+                        },
+                    },
+                }
+            ]
+        }
+    ]
 
     app.dependency_overrides.clear()
+
+
+def test_save_snowflake_step4_writes_only_changed_fields():
+    storage = DummyStorage()
+    app.dependency_overrides[get_graph_storage] = lambda: storage
+    client = TestClient(app)
+
+    scenes = [
+        {
+            "id": "scene-1",
+            "title": "Opening",
+            "sequence_index": 1,
+            "pov_character_id": "char-alpha",
+            "expected_outcome": "Win big",
+            "conflict_type": "internal",
+        },
+        {
+            "id": "scene-2",
+            "title": "Turn",
+            "sequence_index": 2,
+            "pov_character_id": "char-alpha",
+            "expected_outcome": "Lose",
+            "conflict_type": "external",
+            "actual_outcome": "",
+        },
+    ]
+    try:
+        response = client.post(
+            f"/api/v1/roots/{storage.root.id}/snowflake/steps",
+            json={"step": "step4", "data": {"scenes": scenes}},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert storage.patch_calls == [
+        {
+            "SceneOrigin": [],
+            "SceneVersion": [
+                {"id": "scene-1:v2", "props": {"expected_outcome": "Win big"}}
+            ],
+        }
+    ]
+
+
+def test_save_snowflake_step4_missing_scene_returns_404_without_writes():
+    storage = DummyStorage()
+    app.dependency_overrides[get_graph_storage] = lambda: storage
+    client = TestClient(app)
+
+    scene = {
+        "id": "scene-missing",
+        "title": "Ghost",
+        "sequence_index": 9,
+        "pov_character_id": "char-alpha",
+        "expected_outcome": "None",
+        "conflict_type": "none",
+    }
+    try:
+        response = client.post(
+            f"/api/v1/roots/{storage.root.id}/snowflake/steps",
+            json={"step": "step4", "data": {"scenes": [scene]}},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert storage.patch_calls == []
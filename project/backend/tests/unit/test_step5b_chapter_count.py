@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi.testclient import TestClient
 import pytest
 
@@ -26,6 +28,7 @@ class DummyStorage:
     def __init__(self, acts: list[dict]) -> None:
         self._acts = acts
         self.created: list[dict] = []
+        self.batch_calls = 0
 
     def list_acts(self, *, root_id: str):
         return self._acts
@@ -54,6 +57,10 @@ class DummyStorage:
         self.created.append(chapter)
         return chapter
 
+    def create_chapters(self, *, chapters):
+        self.batch_calls += 1
+        return [self.create_chapter(**chapter) for chapter in chapters]
+
 
 def _payload() -> dict:
     return {
@@ -108,3 +115,37 @@ def test_step5b_returns_422_when_total_greater_than_10(monkeypatch):
     response, _ = _call_step5b(monkeypatch, {"act-1": 11}, acts)
 
     assert response.status_code == 422
+
+
+def test_step5b_generates_acts_concurrently_and_persists_in_one_batch(monkeypatch):
+    class ConcurrentEngine(DummyEngine):
+        def __init__(self, counts_by_act: dict[str, int]) -> None:
+            super().__init__(counts_by_act)
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+        async def generate_chapter_list(self, root, act, characters):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return await super().generate_chapter_list(root, act, characters)
+
+    monkeypatch.setenv("SNOWFLAKE_ENGINE", "local")
+    acts = [{"id": "act-1"}, {"id": "act-2"}, {"id": "act-3"}]
+    engine = ConcurrentEngine({"act-1": 3, "act-2": 4, "act-3": 3})
+    storage = DummyStorage(acts)
+    app.dependency_overrides[get_llm_engine] = lambda: engine
+    app.dependency_overrides[get_graph_storage] = lambda: storage
+    try:
+        with TestClient(app) as client:
+            response = client.post("/api/v1/snowflake/step5b", json=_payload())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert engine.max_in_flight == 3
+    assert storage.batch_calls == 1
+    assert [item["act_id"] for item in response.json()] == (
+        ["act-1"] * 3 + ["act-2"] * 4 + ["act-3"] * 3
+    )
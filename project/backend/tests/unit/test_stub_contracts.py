@@ -56,13 +56,17 @@ def test_graph_storage_stub_covers_port_protocol():
         acceptable_gaps = {
             "list_roots", "update_entity", "delete_entity",
             "get_act", "update_act", "delete_act", "list_acts",
-            "create_act", "create_chapter", "get_chapter", "update_chapter",
+            "create_act", "create_chapter", "create_chapters", "get_chapter", "update_chapter",
             "delete_chapter", "list_chapters", "link_scene_to_chapter",
+            "get_node_props_by_ids", "get_latest_scene_version_props",
+            "apply_node_patches",
             "create_anchor", "get_anchor", "update_anchor", "delete_anchor",
             "mark_anchor_achieved", "list_anchors", "get_next_unachieved_anchor",
             "init_character_agent", "get_agent_state", "delete_agent_state",
             "update_agent_desires", "update_agent_beliefs", "add_agent_memory",
-            "create_simulation_log", "get_simulation_log", "list_simulation_logs",
+            "save_agent_round_state",
+            "create_simulation_log", "create_simulation_logs", "get_simulation_log",
+            "list_simulation_logs", "list_simulation_log_fields",
             "update_simulation_log", "delete_simulation_log",
             "create_subplot", "get_subplot", "update_subplot",
             "list_subplots", "delete_subplot",
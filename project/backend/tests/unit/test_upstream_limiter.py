@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import _llm_priority_for_path
+from app.services.topone_client import ToponeClient
+from app.services.upstream_limiter import (
+    AIMDWindow,
+    LLMPriority,
+    ModelLimiter,
+    TokenBucket,
+    UpstreamLimiter,
+    llm_priority,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(**overrides) -> ModelLimiter:
+    config = dict(
+        requests_per_minute=600,
+        tokens_per_minute=60_000,
+        initial_concurrency=1,
+        max_concurrency=4,
+    )
+    config.update(overrides)
+    return ModelLimiter(**config)
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(60, 1.0, clock=clock)
+    bucket.consume(60)
+
+    assert bucket.delay_for(10) == pytest.approx(10.0)
+    clock.now += 4
+    assert bucket.delay_for(10) == pytest.approx(6.0)
+    assert bucket.delay_for(1000) == pytest.approx(56.0)
+
+
+def test_aimd_window_grows_additively_and_shrinks_multiplicatively():
+    window = AIMDWindow(initial=4, minimum=1, maximum=8)
+    window.on_overload()
+    assert window.limit == 2
+    for _ in range(3):
+        window.on_success()
+    assert window.limit == 3
+    for _ in range(5):
+        window.on_overload()
+    assert window.limit == 1
+
+
+@pytest.mark.asyncio
+async def test_model_limiter_admits_by_priority_and_records_wait():
+    limiter = _limiter()
+    await limiter.acquire(priority=LLMPriority.DEFAULT, tokens=1)
+    order: list[str] = []
+
+    async def worker(name: str, priority: LLMPriority) -> None:
+        await limiter.acquire(priority=priority, tokens=1)
+        order.append(name)
+        limiter.release(overloaded=False)
+
+    background = asyncio.create_task(worker("background", LLMPriority.BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(worker("interactive", LLMPriority.INTERACTIVE))
+    await asyncio.sleep(0)
+    assert limiter.queued == 2
+
+    limiter.release(overloaded=False)
+    await asyncio.gather(background, interactive)
+
+    assert order == ["interactive", "background"]
+    waits = limiter.snapshot()["queue_wait"]
+    assert waits["interactive"]["count"] == 1
+    assert waits["background"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_model_limiter_cancelled_waiter_leaves_queue():
+    limiter = _limiter()
+    await limiter.acquire(priority=LLMPriority.DEFAULT, tokens=1)
+    waiter = asyncio.create_task(limiter.acquire(priority=LLMPriority.DEFAULT, tokens=1))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert limiter.queued == 0
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_client_shrinks_window_on_429_and_reconciles_tokens():
+    statuses = [429, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(
+            200, json={"candidates": [], "usageMetadata": {"totalTokenCount": 500}}
+        )
+
+    upstream = UpstreamLimiter(
+        requests_per_minute=600,
+        tokens_per_minute=60_000,
+        initial_concurrency=4,
+        max_concurrency=8,
+    )
+    client = ToponeClient(api_key="test-key", limiter=upstream, http2=False)
+    transport = httpx.MockTransport(handler)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.generate_content(
+            messages=[{"role": "user", "text": "hi"}], transport=transport
+        )
+    model_limiter = upstream.for_model(client.default_model)
+    assert model_limiter.window.limit == 2
+    assert model_limiter.in_flight == 0
+
+    tokens_before = model_limiter.tokens.level
+    with llm_priority(LLMPriority.INTERACTIVE):
+        await client.generate_content(
+            messages=[{"role": "user", "text": "hi"}], transport=transport
+        )
+    assert model_limiter.tokens.level < tokens_before - 400
+    snapshot = upstream.snapshot()[client.default_model]
+    assert snapshot["overloads"] == 1
+    assert snapshot["queue_wait"]["interactive"]["count"] == 1
+
+
+def test_priority_for_path_classifies_endpoints():
+    assert _llm_priority_for_path("/api/v1/scenes/s1/render/stream") == LLMPriority.INTERACTIVE
+    assert _llm_priority_for_path("/api/v1/chapters/c1/render") == LLMPriority.INTERACTIVE
+    assert _llm_priority_for_path("/api/v1/simulation/round") == LLMPriority.BACKGROUND
+    assert _llm_priority_for_path("/api/v1/logic/check") == LLMPriority.DEFAULT